@@ -2,29 +2,35 @@
 
 import sys
 from pathlib import Path
-import tempfile
+import time
 import uuid
 
 _project_root = Path(__file__).resolve().parent.parent
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
-import base64
-import io
+import os
 
 import streamlit as st
 from dotenv import load_dotenv
-from gtts import gTTS
 
 load_dotenv()
 
-from src.services.chunker import chunk_documents
-from src.services.document_loader import DocumentChunk, load_document
-from src.services.vector_store import add_chunks_to_store, get_vector_store
-from src.agents.coordinator import classify_domain
-from src.agents.specialists.registry import get_specialist_response
-from src.agents.vision_analysis import analyze_image
-from src.evaluation.eval_agent import log_interaction
+# Only light modules here so the page paints quickly; the agent and vector store
+# stacks are imported on first use or by the warm-up thread (see src/services/warmup.py)
+from src.api.client import FixPalClient
+from src.ingestion.jobs import cancel_job, ensure_worker, list_jobs, resume_jobs, submit_job
+from src.services.resources import get_shared_vector_store, resource_status, vector_store_ready
+from src.agents.memory import ConversationMemory
+from src.services.scheduler import scheduler_metrics
+from src.services.tts import cached_speech_file, iter_speech, join_speech, presynthesize
+from src.services.warmup import start_warmup, warmup_status
+
+PROGRESS_LABELS = {
+    "vision": "📷 Analyzing uploaded image...",
+    "classification": "🔍 Classifying issue domain...",
+    "generation": "📚 Searching knowledge base and generating response...",
+}
 
 DOMAIN_META = {
     "plumbing":   {"emoji": "💧", "color": "#2563EB"},
@@ -72,38 +78,90 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def get_all_sources(vs) -> list[dict]:
-    """Get unique sources from the vector store with chunk counts."""
+# With FIXPAL_API_URL set, the app is a thin client of the HTTP API (src/api/server.py)
+API_URL = os.getenv("FIXPAL_API_URL", "").strip()
+api = FixPalClient(API_URL) if API_URL else None
+JOB_POLL_SECONDS = 2
+
+if api is None:
+    start_warmup()
+    resume_jobs()
+
+
+def list_sources() -> list[dict] | None:
+    """Sources in the knowledge base, or None if it is not reachable."""
+    if api is not None:
+        try:
+            return api.sources()
+        except Exception as e:
+            st.session_state.vector_store_error = str(e)
+            return None
+    from src.services.vector_store import get_all_sources
+
+    vs = ensure_vector_store()
+    return get_all_sources(vs) if vs is not None else None
+
+
+def submit_ingest(files: list[tuple[str, bytes]]) -> str:
+    """Queue a background ingestion job; returns its id."""
+    if api is not None:
+        return api.submit_ingest_job(files)
+    job_id = submit_job(files)
+    ensure_worker()
+    return job_id
+
+
+def cancel_ingest(job_id: str) -> None:
     try:
-        collection = vs._collection
-        results = collection.get(include=["metadatas"])
-        source_map: dict[str, dict] = {}
-        for meta in (results.get("metadatas") or []):
-            if not meta or "source" not in meta:
-                continue
-            src = meta["source"]
-            if src not in source_map:
-                source_map[src] = {
-                    "name": src,
-                    "type": meta.get("source_type", "unknown"),
-                    "domain": meta.get("domain", ""),
-                    "chunks": 0,
-                }
-            source_map[src]["chunks"] += 1
-        return sorted(source_map.values(), key=lambda x: x["name"])
-    except Exception:
-        return []
-
-
-def delete_source(vs, source_name: str) -> int:
-    """Delete all chunks belonging to a source. Returns count deleted."""
+        api.cancel_ingest_job(job_id) if api is not None else cancel_job(job_id)
+    except Exception as e:
+        st.toast(f"Could not cancel: {e}", icon="⚠️")
+
+
+def ingest_jobs_panel():
+    """Progress of this session's ingestion jobs (run as a polling fragment while any is active)."""
     try:
-        collection = vs._collection
-        results = collection.get(where={"source": source_name}, include=[])
-        ids = results.get("ids", [])
-        if ids:
-            collection.delete(ids=ids)
-        return len(ids)
+        if api is not None:
+            jobs = [api.get_ingest_job(job_id) for job_id in st.session_state.ingest_jobs[:5]]
+        else:
+            jobs = list_jobs(st.session_state.ingest_jobs[:5])
+    except Exception as e:
+        st.caption(f"⚠️ Could not load ingestion status: {e}")
+        return
+    active = False
+    for job in jobs:
+        total, done = job["total_files"], job["done_files"]
+        status = job["status"]
+        if status in ("queued", "running"):
+            active = True
+            label = "Queued" if status == "queued" else f"Ingesting {done}/{total} file(s)"
+            if job["cancel_requested"]:
+                label += " · cancelling"
+            st.progress(done / total if total else 0.0, text=f"{label} · {job['chunks']} chunks")
+            if not job["cancel_requested"]:
+                st.button("Cancel", key=f"cancel_job_{job['id']}", on_click=cancel_ingest, args=(job["id"],))
+        elif status == "done":
+            st.caption(f"✅ Indexed {job['chunks']} chunks from {total} file(s)")
+        elif status == "cancelled":
+            processed = sum(f["status"] in ("done", "failed") for f in job["files"])
+            st.caption(f"⏹️ Cancelled after {processed}/{total} file(s)")
+        else:
+            st.caption(f"❌ Ingestion failed: {job['error']}")
+        for f in job["files"]:
+            if f["status"] == "failed":
+                st.caption(f"⚠️ Could not ingest {f['name']}")
+    if st.session_state.ingest_jobs_active and not active:
+        # Finished: stop polling and refresh the rest of the page (source counts etc.)
+        st.session_state.ingest_jobs_active = False
+        st.rerun()
+    st.session_state.ingest_jobs_active = active
+
+
+def remove_source(name: str) -> int:
+    from src.services.vector_store import delete_source
+
+    try:
+        return api.delete_source(name) if api is not None else delete_source(ensure_vector_store(), name)
     except Exception as e:
         st.error(f"Failed to remove source: {e}")
         return 0
@@ -111,12 +169,10 @@ def delete_source(vs, source_name: str) -> int:
 
 @st.dialog("📚 Manage Knowledge Sources", width="large")
 def manage_sources_dialog():
-    vs = st.session_state.get("vector_store")
-    if vs is None:
+    sources = list_sources()
+    if sources is None:
         st.warning("⚠️ No knowledge base connected. Upload and ingest documents first.")
         return
-
-    sources = get_all_sources(vs)
     if not sources:
         st.info("📭 No sources ingested yet. Use the Upload Materials section to add repair manuals.")
         return
@@ -155,43 +211,54 @@ def manage_sources_dialog():
             st.caption(f"{src_type} · {chunks} chunk{'s' if chunks != 1 else ''}")
         with col_btn:
             if st.button("Remove", key=f"remove_{name}", use_container_width=True):
-                removed = delete_source(vs, name)
+                removed = remove_source(name)
                 if removed > 0:
                     st.toast(f"Removed '{name}' ({removed} chunks)", icon="✅")
                     st.rerun()
 
 
-def text_to_speech(text: str, max_chars: int = 4000) -> bytes | None:
-    if not (text or text.strip()):
-        return None
-    clean = text.strip()
-    if len(clean) > max_chars:
-        clean = clean[: max_chars - 3] + "..."
-    try:
-        tts = gTTS(text=clean, lang="en")
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        return buf.getvalue()
-    except Exception:
-        return None
+def read_aloud(text: str, placeholder) -> str | None:
+    """Play the first chunk as soon as it is synthesized; return the cached full-answer MP3 path."""
+    paths = []
+    started = 0.0
+    for path in iter_speech(text):
+        if path is not None and not started:
+            placeholder.audio(str(path), format="audio/mp3", autoplay=True)
+            started = time.monotonic()
+        paths.append(path)
+    full = join_speech(paths, text)
+    if full and len(paths) > 1:
+        # Swap in the full answer, resuming about where the first chunk has got to
+        # (gTTS encodes at 32 kbit/s, so the first chunk lasts ~size/4000 seconds)
+        first_seconds = paths[0].stat().st_size / 4000
+        resume_at = int(min(time.monotonic() - started, first_seconds))
+        placeholder.audio(str(full), format="audio/mp3", autoplay=True, start_time=resume_at)
+    return str(full) if full else None
 
 
 def ensure_vector_store():
-    if "vector_store" not in st.session_state:
-        try:
-            vs, _ = get_vector_store(namespace="manuals")
-            st.session_state.vector_store = vs
-        except Exception as e:
-            st.session_state.vector_store = None
-            st.session_state.vector_store_error = str(e)
-    return st.session_state.get("vector_store")
+    """The process-wide store (shared by every session; reconnects if its health check fails)."""
+    try:
+        vs = get_shared_vector_store("manuals")
+        st.session_state.pop("vector_store_error", None)
+        return vs
+    except Exception as e:
+        st.session_state.vector_store_error = str(e)
+        return None
 
 
 # Session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory()
 if "user_input" not in st.session_state:
     st.session_state.user_input = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "ingest_jobs" not in st.session_state:
+    st.session_state.ingest_jobs = []
+    st.session_state.ingest_jobs_active = False
 
 # Handle clearing input before widget creation
 if st.session_state.get("should_clear_input"):
@@ -201,7 +268,9 @@ if st.session_state.get("should_clear_input"):
 # ---- Sidebar ----
 with st.sidebar:
     st.markdown("### 📚 Knowledge Base")
-    if st.session_state.get("vector_store") is not None:
+    if api is not None:
+        st.caption(f"Backend API: {API_URL}")
+    elif vector_store_ready("manuals"):
         st.markdown('<span class="status-badge status-connected">✓ Connected</span>', unsafe_allow_html=True)
     else:
         st.caption("Upload & ingest below to connect")
@@ -218,39 +287,15 @@ with st.sidebar:
         label_visibility="collapsed",
     )
     if st.button("Ingest uploaded files", use_container_width=True) and uploaded:
-        vs = ensure_vector_store()
-        if vs is None:
-            st.error("Could not connect to vector store. Check API key and setup.")
-        else:
-            with st.spinner("Processing..."):
-                all_chunks = []
-                for f in uploaded:
-                    ext = Path(f.name).suffix.lower()
-                    data = f.read()
-                    tmp_dir = Path(tempfile.gettempdir())
-                    path = tmp_dir / f"{uuid.uuid4().hex}_{f.name}"
-                    path.write_bytes(data)
-                    if ext == ".pdf":
-                        docs = list(load_document(path, source_type="user"))
-                    elif ext in (".txt", ".text"):
-                        docs = list(load_document(path, source_type="user"))
-                    elif ext in (".jpg", ".jpeg", ".png", ".gif", ".webp"):
-                        try:
-                            desc = analyze_image(
-                                data,
-                                user_query="Describe this image for home repair context. Extract any visible text, labels, or repair-relevant details.",
-                            )
-                            docs = [DocumentChunk(content=desc, source=f.name, source_type="user")] if desc else []
-                        except Exception:
-                            docs = []
-                    else:
-                        docs = []
-                    all_chunks.extend(chunk_documents(docs))
-                if all_chunks:
-                    add_chunks_to_store(vs, all_chunks)
-                    st.success(f"Indexed {len(all_chunks)} chunks from {len(uploaded)} file(s).")
-                else:
-                    st.warning("No content extracted.")
+        try:
+            job_id = submit_ingest([(f.name, f.getvalue()) for f in uploaded])
+            st.session_state.ingest_jobs.insert(0, job_id)
+            st.session_state.ingest_jobs_active = True
+        except Exception as e:
+            st.error(f"Could not queue ingestion: {e}")
+    if st.session_state.ingest_jobs:
+        # Poll job progress without rerunning the whole page
+        st.fragment(ingest_jobs_panel, run_every=JOB_POLL_SECONDS if st.session_state.ingest_jobs_active else None)()
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
@@ -264,8 +309,43 @@ with st.sidebar:
                 break
     st.markdown('</div>', unsafe_allow_html=True)
 
+    metrics = scheduler_metrics()
+    if metrics:
+        with st.expander("⏱️ Model call queue"):
+            for provider, m in metrics.items():
+                st.caption(
+                    f"**{provider}** · queued {m['queue_depth']} · calls {m['calls']} · "
+                    f"coalesced {m['coalesced']} · wait p95 {m['wait_ms_p95']:.0f} ms"
+                )
+
+    resources = resource_status()
+    warmup = warmup_status()
+    if resources or warmup["state"] != "off":
+        with st.expander("🔌 Shared resources"):
+            if warmup["state"] != "off":
+                failed = [name for name, step in warmup["steps"].items() if step["error"]]
+                st.caption(
+                    f"Warm-up {warmup['state']} · {warmup['ms'] / 1000:.1f} s"
+                    + (f" · failed: {', '.join(failed)}" if failed else "")
+                )
+            for r in resources:
+                state = "✓" if r["healthy"] else ("✗" if r["healthy"] is False else "–")
+                st.caption(
+                    f"{state} **{r['name']}** · builds {r['builds']}"
+                    + (f" · age {r['age_s']:.0f} s" if r["age_s"] is not None else "")
+                    + (f" · last error: {r['last_error']}" if r["last_error"] else "")
+                )
+
+    st.checkbox(
+        "🧪 Profile requests",
+        key="profile_requests",
+        help="Record a cProfile dump for each request (also enabled for all sessions by PROFILE_REQUESTS=1)",
+    )
+
     if st.button("🗑️ Clear Chat History", use_container_width=True):
         st.session_state.messages = []
+        st.session_state.memory = ConversationMemory()
+        st.session_state.session_id = uuid.uuid4().hex
         st.session_state.should_clear_input = True
         st.rerun()
 
@@ -311,52 +391,51 @@ with col_send:
                 "content": prompt,
                 "image": None,
             })
-            vs = ensure_vector_store()
-            if vs is None:
+            image_bytes = uploaded_image.read() if uploaded_image else None
+            profile = st.session_state.get("profile_requests", False)
+            if api is not None:
+                events = api.stream_query(prompt, image=image_bytes, session_id=st.session_state.session_id, profile=profile)
+            else:
+                from src.agents.coordinator import coordinator_stream
+
+                vs = ensure_vector_store()
+                events = None if vs is None else coordinator_stream(
+                    prompt, vector_store=vs, image_bytes=image_bytes, memory=st.session_state.memory, profile=profile,
+                )
+            if events is None:
                 err = st.session_state.get("vector_store_error", "Could not connect to vector store.")
                 st.error(err)
                 st.session_state.messages.append({"role": "assistant", "content": f"Error: {err}", "domain": "error"})
             else:
+                result = None
                 try:
                     with st.status("🔧 Working on your repair guide...", expanded=True) as status:
-                        # Step 1: Vision analysis
-                        image_context = None
-                        if uploaded_image:
-                            st.write("📷 Analyzing uploaded image...")
-                            data = uploaded_image.read()
-                            try:
-                                image_context = analyze_image(
-                                    data,
-                                    user_query=f"User asks: {prompt}. Describe what you see for home repair diagnosis.",
-                                )
-                                st.write("✓ Image analyzed")
-                            except Exception as e:
-                                st.write(f"⚠️ Could not analyze image ({e}), continuing without it")
-
-                        # Step 2: Domain classification
-                        st.write("🔍 Classifying issue domain...")
-                        context_for_domain = prompt
-                        if image_context:
-                            context_for_domain += f"\nImage context: {image_context}"
-                        domain = classify_domain(context_for_domain)
-                        dm = DOMAIN_META.get(domain, DOMAIN_META["general"])
-                        st.write(f"✓ Routed to **{dm['emoji']} {domain.title()} Specialist**")
-
-                        # Step 3: RAG + specialist response
-                        st.write("📚 Searching knowledge base and generating response...")
-                        answer, meta = get_specialist_response(
-                            domain=domain,
-                            user_query=prompt,
-                            vector_store=vs,
-                            image_context=image_context,
-                        )
+                        for event in events:
+                            kind = event["event"]
+                            if kind == "progress":
+                                st.write(PROGRESS_LABELS[event["stage"]])
+                            elif kind == "vision":
+                                st.write("✓ Image analyzed" if event["ok"]
+                                         else f"⚠️ Could not analyze image ({event['error']}), continuing without it")
+                            elif kind == "domain":
+                                dm = DOMAIN_META.get(event["domain"], DOMAIN_META["general"])
+                                st.write(f"✓ Routed to **{dm['emoji']} {event['domain'].title()} Specialist**")
+                            elif kind in ("answer", "error"):
+                                result = event
+                        if result is None or result["event"] == "error":
+                            raise RuntimeError(result["error"] if result else "No answer received")
+
+                        meta = result["meta"]
                         rag_count = meta.get("rag_docs_found", 0)
-                        if rag_count:
+                        if meta.get("precomputed"):
+                            st.write("⚡ Answered from precomputed answers for frequent questions")
+                        if rag_count and meta.get("retrieval_reused"):
+                            st.write(f"✓ Follow-up: reusing **{rag_count}** source(s) from the previous answer")
+                        elif rag_count:
                             st.write(f"✓ Found **{rag_count}** relevant source(s) in knowledge base")
                         else:
                             st.write("ℹ️ No matching documents found — using general knowledge")
 
-                        # Step 4: Safety
                         warnings = meta.get("safety_warnings", [])
                         if warnings:
                             st.write(f"⚠️ **{len(warnings)} safety warning(s)** added to response")
@@ -367,16 +446,16 @@ with col_send:
 
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": answer,
-                        "domain": domain,
+                        "content": result["answer"],
+                        "domain": result["domain"],
                         "meta": meta,
                     })
-                    log_interaction(prompt=prompt, response=answer, domain=domain, image_provided=bool(uploaded_image))
+                    if os.getenv("TTS_PRESYNTHESIZE", "").strip() in ("1", "true", "True", "yes"):
+                        presynthesize(result["answer"])
                 except Exception as e:
                     err = str(e)
                     st.error(err)
                     st.session_state.messages.append({"role": "assistant", "content": f"Error: {err}", "domain": "error", "meta": {}})
-                    log_interaction(prompt=prompt, response=f"Error: {err}", domain="error", image_provided=bool(uploaded_image))
             st.session_state.should_clear_input = True
             st.rerun()
 with col_clear:
@@ -412,27 +491,58 @@ if st.session_state.messages:
             if msg.get("content"):
                 col_tts, col_trace = st.columns([1, 3])
                 with col_tts:
-                    if st.button("🔊 Read aloud", key=f"tts_ui_{i}"):
-                        audio_bytes = text_to_speech(msg["content"])
-                        if audio_bytes:
-                            st.session_state[f"tts_audio_ui_{i}"] = audio_bytes
+                    read_clicked = st.button("🔊 Read aloud", key=f"tts_ui_{i}")
                 if meta:
                     with col_trace:
                         with st.expander("🔍 Processing trace"):
                             st.markdown(f"- **Domain:** {domain.title()}")
                             st.markdown(f"- **Sources retrieved:** {meta.get('rag_docs_found', 0)}")
+                            tokens = meta.get("context_tokens")
+                            if tokens:
+                                st.markdown(
+                                    f"- **Prompt tokens:** {tokens['total']} / {tokens['budget']} "
+                                    f"(knowledge base {tokens['knowledge_base']}, history {tokens.get('history', 0)}, "
+                                    f"image {tokens['image']}, question {tokens['question']})"
+                                )
                             warnings = meta.get("safety_warnings", [])
                             if warnings:
                                 for w in warnings:
                                     st.markdown(f"- ⚠️ {w}")
                             else:
                                 st.markdown("- 🛡️ No safety warnings")
-                if f"tts_audio_ui_{i}" in st.session_state:
-                    b64 = base64.b64encode(st.session_state[f"tts_audio_ui_{i}"]).decode("utf-8")
-                    st.markdown(
-                        f'<audio src="data:audio/mp3;base64,{b64}" autoplay controls playsinline></audio>',
-                        unsafe_allow_html=True,
-                    )
+                            stages = meta.get("stages")
+                            if stages:
+                                st.markdown(f"- **Timing:** {meta.get('total_ms', 0):.0f} ms total")
+                                for stage in stages:
+                                    details = [f"{stage['duration_ms']:.0f} ms"]
+                                    if stage.get("provider"):
+                                        details.append(stage["provider"])
+                                    if stage.get("cache_hit"):
+                                        details.append("cache hit")
+                                    if stage.get("tokens_in") is not None:
+                                        details.append(f"{stage['tokens_in']} → {stage.get('tokens_out') or 0} tokens")
+                                    if stage.get("error"):
+                                        details.append(f"failed: {stage['error']}")
+                                    indent = "    " if stage.get("parent") else "  "
+                                    st.markdown(f"{indent}- `{stage['stage']}` " + " · ".join(details))
+                            profile = meta.get("profile")
+                            if profile:
+                                st.markdown(f"- **Profile:** `{profile['path']}` — top self time:")
+                                for row in profile["top"]:
+                                    st.markdown(f"  - `{row['function']}` {row['self_ms']:.1f} ms ({row['calls']} calls)")
+                if read_clicked:
+                    # Pre-synthesized answers play immediately; otherwise start with the first chunk
+                    cached = cached_speech_file(msg["content"])
+                    if cached:
+                        st.audio(str(cached), format="audio/mp3", autoplay=True)
+                        st.session_state[f"tts_audio_ui_{i}"] = str(cached)
+                    else:
+                        audio_path = read_aloud(msg["content"], st.empty())
+                        if audio_path:
+                            st.session_state[f"tts_audio_ui_{i}"] = audio_path
+                elif f"tts_audio_ui_{i}" in st.session_state:
+                    # Served from the disk cache by path; nothing is re-encoded per rerun
+                    st.audio(st.session_state[f"tts_audio_ui_{i}"], format="audio/mp3")
 else:
     st.markdown("<br><br>", unsafe_allow_html=True)
     st.info("👆 Describe your issue above then click **Get Repair Guide**.")
@@ -1,6 +1,20 @@
 """FixPalAI agents."""
 
-from src.agents.coordinator import coordinator_invoke, classify_domain
-from src.agents.rag_agent import rag_query
+import importlib
 
-__all__ = ["coordinator_invoke", "classify_domain", "rag_query"]
+__all__ = ["coordinator_invoke", "coordinator_stream", "classify_domain", "rag_query"]
+
+# Resolved on first access so importing a light submodule (e.g. src.agents.memory)
+# does not pull in the coordinator and its LLM stack
+_EXPORTS = {
+    "coordinator_invoke": "src.agents.coordinator",
+    "coordinator_stream": "src.agents.coordinator",
+    "classify_domain": "src.agents.coordinator",
+    "rag_query": "src.agents.rag_agent",
+}
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
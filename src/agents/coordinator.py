@@ -1,53 +1,150 @@
 """Coordinator - routes queries to specialists, with optional Dedalus support."""
 
 import os
+from typing import Iterator
+
 from langchain_core.vectorstores import VectorStore
 
+from src.agents.memory import ConversationMemory
+from src.services.profiling import profile_request
+from src.services.telemetry import current_trace, span, start_trace
+
 
 def classify_domain(query: str) -> str:
     """Classify query into domain, with optional Dedalus support."""
     use_dedalus = os.getenv("USE_DEDALUS", "false").lower() == "true"
     
-    if use_dedalus:
-        return _classify_with_dedalus(query)
-    else:
-        return _classify_with_gemini(query)
+    with span("classification") as s:
+        if use_dedalus:
+            domain = _classify_with_dedalus(query)
+        else:
+            domain = _classify_with_gemini(query)
+        s.set(domain=domain)
+    return domain
 
 
 def coordinator_invoke(
     user_query: str,
     vector_store: VectorStore | None = None,
     image_context: str | None = None,
+    memory: ConversationMemory | None = None,
+    profile: bool = False,
 ) -> tuple[str, str]:
     """
     Main coordinator function: classify domain and route to specialist.
+    Follow-up questions classified as general stay with the previous turn's domain when memory is given.
+    With PROFILE_REQUESTS=1 (or profile=True) the call is profiled, see src/services/profiling.py.
     Returns: (answer, domain)
     """
     from src.agents.specialists.registry import get_specialist_response
     
-    # Build context for classification
-    context = user_query
-    if image_context:
-        context += f"\nImage context: {image_context}"
-    
-    # Classify domain
-    domain = classify_domain(context)
-    
-    # Get specialist response
-    answer = get_specialist_response(
-        domain=domain,
-        user_query=user_query,
-        vector_store=vector_store,
-        image_context=image_context,
-    )
+    trace = current_trace()
+    with profile_request(trace.request_id if trace else None, force=profile):
+        # Build context for classification
+        context = user_query
+        if image_context:
+            context += f"\nImage context: {image_context}"
+        
+        # Classify domain
+        domain = route_with_memory(context, user_query, memory)
+        
+        # Get specialist response
+        answer, _ = get_specialist_response(
+            domain=domain,
+            user_query=user_query,
+            vector_store=vector_store,
+            image_context=image_context,
+            memory=memory,
+        )
     
     return answer, domain
 
 
+def coordinator_stream(
+    user_query: str,
+    vector_store: VectorStore | None = None,
+    image_bytes: bytes | None = None,
+    memory: ConversationMemory | None = None,
+    profile: bool = False,
+    log: bool = True,
+) -> Iterator[dict]:
+    """
+    Full request pipeline (vision -> routing -> specialist), yielding progress events.
+
+    Used by the Streamlit app and the HTTP API (src/api/server.py) so both
+    render the same steps. Events, in order:
+        {"event": "progress", "stage": "vision" | "classification" | "generation"}
+        {"event": "vision", "ok": bool, "error": str | None}
+        {"event": "domain", "domain": str}
+        {"event": "answer", "answer": str, "domain": str, "meta": dict, "request_id": str}
+    or {"event": "error", "error": str, "request_id": str} if the request fails.
+    The whole generator must be consumed on one thread (it holds the trace and profiler).
+    """
+    from src.agents.specialists.registry import get_specialist_response
+    from src.agents.vision_analysis import analyze_image
+    from src.evaluation.eval_agent import log_interaction
+
+    with start_trace() as trace:
+        try:
+            with profile_request(trace.request_id, force=profile) as report:
+                image_context = None
+                if image_bytes:
+                    yield {"event": "progress", "stage": "vision"}
+                    try:
+                        image_context = analyze_image(
+                            image_bytes,
+                            user_query=f"User asks: {user_query}. Describe what you see for home repair diagnosis.",
+                        )
+                        yield {"event": "vision", "ok": True, "error": None}
+                    except Exception as e:
+                        yield {"event": "vision", "ok": False, "error": str(e)}
+
+                yield {"event": "progress", "stage": "classification"}
+                context = user_query
+                if image_context:
+                    context += f"\nImage context: {image_context}"
+                domain = route_with_memory(context, user_query, memory)
+                yield {"event": "domain", "domain": domain}
+
+                yield {"event": "progress", "stage": "generation"}
+                answer, meta = get_specialist_response(
+                    domain=domain,
+                    user_query=user_query,
+                    vector_store=vector_store,
+                    image_context=image_context,
+                    memory=memory,
+                )
+        except Exception as e:
+            if log:
+                log_interaction(
+                    prompt=user_query, response=f"Error: {e}", domain="error",
+                    image_provided=bool(image_bytes), trace=trace,
+                )
+            yield {"event": "error", "error": str(e), "request_id": trace.request_id}
+            return
+
+        meta = {**meta, "stages": trace.summary(), "total_ms": round(trace.elapsed_ms(), 1)}
+        if report is not None and report.path:
+            meta["profile"] = {"path": report.path, "top": report.top[:8]}
+        if log:
+            log_interaction(prompt=user_query, response=answer, domain=domain, image_provided=bool(image_bytes), trace=trace)
+    yield {"event": "answer", "answer": answer, "domain": domain, "meta": meta, "request_id": trace.request_id}
+
+
+def route_with_memory(context: str, user_query: str, memory: ConversationMemory | None = None) -> str:
+    """Classify; a follow-up the classifier can't place ("what if that doesn't work?") keeps the previous domain."""
+    domain = classify_domain(context)
+    if domain == "general" and memory is not None and memory.last_domain and memory.is_follow_up(user_query):
+        return memory.last_domain
+    return domain
+
+
 def _classify_with_dedalus(query: str) -> str:
     """Use Dedalus for classification."""
     try:
         from src.services.dedalus_wrapper import get_dedalus_agent
+        from src.services.resilience import run_with_deadline, stage_timeout
+        from src.services.resources import shared
         
         prompt = f"""Classify this home repair query into ONE domain:
 - plumbing: pipes, leaks, faucets, drains, toilets, water heaters
@@ -60,11 +157,16 @@ Respond with ONLY the domain name.
 
 Query: {query}"""
         
-        agent = get_dedalus_agent()
-        domain = agent.run(prompt).strip().lower()
+        agent = shared("dedalus_agent", get_dedalus_agent).get()
+        domain = run_with_deadline(
+            lambda: agent.run(prompt), stage_timeout("classification"), stage="classification"
+        ).strip().lower()
         
         valid = ["plumbing", "electrical", "carpentry", "hvac", "general"]
         return domain if domain in valid else "general"
+    except TimeoutError as e:
+        print(f"{e}, using keyword fallback")
+        return _keyword_route(query)
     except Exception as e:
         print(f"Dedalus classification failed: {e}, using fallback")
         return _keyword_route(query)
@@ -74,7 +176,7 @@ def _classify_with_gemini(query: str) -> str:
     """Use Gemini for classification (fallback)."""
     try:
         from langchain_core.messages import HumanMessage
-        from src.services.llm_utils import get_llm
+        from src.services.llm_utils import invoke_llm
         
         prompt = f"""Classify this query into ONE domain:
 plumbing, electrical, carpentry, hvac, or general
@@ -83,12 +185,15 @@ Query: {query}
 
 Respond with only the domain name."""
         
-        llm = get_llm(temperature=0.1)
-        response = llm.invoke([HumanMessage(content=prompt)])
-        domain = response.content.strip().lower()
+        # Deadline expiry raises TimeoutError and drops straight to the keyword route
+        response = invoke_llm([HumanMessage(content=prompt)], temperature=0.1, stage="classification")
+        domain = response.strip().lower()
         
         valid = ["plumbing", "electrical", "carpentry", "hvac", "general"]
         return domain if domain in valid else "general"
+    except TimeoutError as e:
+        print(f"{e}, using keyword fallback")
+        return _keyword_route(query)
     except Exception as e:
         print(f"Gemini classification failed: {e}, using keyword fallback")
         return _keyword_route(query)
@@ -0,0 +1,173 @@
+"""Conversation memory: rolling token window plus an incrementally updated summary."""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from src.services.answer_store import question_tokens
+from src.services.chunker import count_tokens, truncate_to_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Recent turns kept verbatim
+HISTORY_WINDOW_TOKENS = int(os.getenv("HISTORY_WINDOW_TOKENS", "600"))
+# Running summary of everything older than the window
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "250"))
+# Long answers are stored as their opening; the full text is still in the chat UI
+TURN_MAX_TOKENS = 200
+
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|that|this|those|these|them|they|still|again|instead|also|same|else|then|"
+    r"what if|what about|how about|didn'?t|doesn'?t|won'?t|step \d+)\b",
+    re.IGNORECASE,
+)
+# Share of a question's content words that must appear in the previous question or its
+# retrieved documents for the question to count as continuing that topic
+TOPIC_OVERLAP = 0.5
+# Words that say nothing about the topic ("what if that doesn't work?")
+_GENERIC_WORDS = frozenset("work fix try happen next now first last one other done wrong right ok okay".split())
+# Fresh results plus the previous turn's documents, when a question refers back without overlap
+FOLLOW_UP_MAX_DOCS = 6
+
+SUMMARY_PROMPT = """Update the running summary of a home repair conversation.
+Keep the equipment, symptoms, steps already tried and their outcomes, and any safety concerns.
+Stay under {max_words} words. Reply with the updated summary only.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}"""
+
+def _stems(words: frozenset[str]) -> frozenset[str]:
+    """Crude stems, so "drips", "dripping" and "dripped" count as the same topic word."""
+    stems = set()
+    for w in words:
+        for suffix in ("ing", "ed", "es", "s", "y"):
+            if w.endswith(suffix) and len(w) - len(suffix) >= 3:
+                w = w[: -len(suffix)]
+                if len(w) > 3 and w[-1] == w[-2]:
+                    w = w[:-1]
+                break
+        stems.add(w)
+    return frozenset(stems)
+
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+class ConversationMemory:
+    """Per-conversation memory whose prompt footprint is bounded regardless of length."""
+
+    def __init__(self, window_tokens: int = HISTORY_WINDOW_TOKENS, summary_tokens: int = SUMMARY_MAX_TOKENS):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.turns: list[dict] = []
+        self.summary = ""
+        self.last_docs: list["Document"] = []
+        self.last_domain: str | None = None
+        self._topic_words: frozenset[str] = frozenset()
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+    def is_empty(self) -> bool:
+        return not self.turns and not self.summary
+
+    def refers_back(self, query: str) -> bool:
+        """Heuristic: short question with a word that points at earlier turns ("it", "that", "still")."""
+        if self.is_empty():
+            return False
+        return len(query.split()) <= 15 and bool(_FOLLOW_UP_PATTERN.search(query))
+
+    def on_topic(self, query: str) -> bool:
+        """Whether the question's content words mostly occur in the previous question or its documents."""
+        words = _stems(question_tokens(_FOLLOW_UP_PATTERN.sub(" ", query))) - _GENERIC_WORDS
+        if not words:
+            return True  # nothing but references, e.g. "what if that doesn't work?"
+        return len(words & self._topic_words) / len(words) >= TOPIC_OVERLAP
+
+    def is_follow_up(self, query: str) -> bool:
+        """A question that refers back to the previous turn and stays on its topic."""
+        return self.refers_back(query) and self.on_topic(query)
+
+    def reusable_docs(self, query: str, domain: str) -> list["Document"] | None:
+        """Previous retrieval results if this turn follows up on the same topic in the same domain."""
+        if self.last_docs and domain == self.last_domain and self.is_follow_up(query):
+            return list(self.last_docs)
+        return None
+
+    def with_previous_docs(self, query: str, domain: str, docs: list["Document"]) -> list["Document"]:
+        """Fresh results, followed by the previous turn's documents if the question refers back to it."""
+        if not self.last_docs or domain != self.last_domain or not self.refers_back(query):
+            return docs
+        seen = {(d.metadata.get("source"), d.page_content) for d in docs}
+        merged = list(docs)
+        for d in self.last_docs:
+            if (d.metadata.get("source"), d.page_content) not in seen:
+                merged.append(d)
+        return merged[: max(FOLLOW_UP_MAX_DOCS, len(docs))]
+
+    def remember_retrieval(self, domain: str, docs: list["Document"], query: str = "") -> None:
+        """Domain, question and retrieval results of the turn being answered (docs may be empty)."""
+        self.last_domain = domain
+        self.last_docs = list(docs)
+        self._topic_words = _stems(question_tokens(" ".join([query, *(d.page_content for d in docs)])))
+
+    def context_text(self) -> str:
+        """Summary plus recent turns, ready to put in the prompt."""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Earlier in this conversation: {self.summary}")
+            # Turns evicted but not yet folded into the summary are kept until they are
+            parts.extend(f"{t['role'].title()}: {t['content']}" for t in self._pending + self.turns)
+        return "\n".join(parts)
+
+    def record_exchange(self, user_query: str, answer: str) -> None:
+        """Add a question/answer pair; turns leaving the window are summarized in the background."""
+        with self._lock:
+            for role, content in (("user", user_query), ("assistant", answer)):
+                content = truncate_to_tokens(content.strip(), TURN_MAX_TOKENS)
+                self.turns.append({"role": role, "content": content, "tokens": count_tokens(content)})
+            while len(self.turns) > 2 and sum(t["tokens"] for t in self.turns) > self.window_tokens:
+                self._pending.append(self.turns.pop(0))
+            start = bool(self._pending) and not self._summarizing
+            if start:
+                self._summarizing = True
+        if start:
+            _summary_executor.submit(self._fold_pending)
+
+    def _fold_pending(self) -> None:
+        """Fold evicted turns into the summary, one LLM call per batch of evictions."""
+        from langchain_core.messages import HumanMessage
+
+        from src.services.llm_utils import invoke_llm
+
+        while True:
+            with self._lock:
+                batch = list(self._pending)
+                summary = self.summary
+                if not batch:
+                    self._summarizing = False
+                    return
+            turns = "\n".join(f"{t['role'].title()}: {t['content']}" for t in batch)
+            try:
+                updated = invoke_llm(
+                    [HumanMessage(content=SUMMARY_PROMPT.format(
+                        max_words=int(self.summary_tokens * 0.7),
+                        summary=summary or "(none)",
+                        turns=turns,
+                    ))],
+                    temperature=0.1,
+                    stage="summary",
+                ).strip()
+            except Exception:
+                # Keep the gist extractively rather than losing the turns
+                updated = f"{summary} {turns}".strip()
+            with self._lock:
+                self.summary = truncate_to_tokens(updated, self.summary_tokens)
+                del self._pending[: len(batch)]
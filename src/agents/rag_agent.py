@@ -3,6 +3,7 @@
 from langchain_core.vectorstores import VectorStore
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from src.services.context_builder import assemble_context
 from src.services.llm_utils import invoke_llm
 from src.services.vector_store import search_multiple_namespaces
 
@@ -31,17 +32,16 @@ def rag_query(
         query=query,
         namespaces=["manuals"],
         k_per_namespace=k // 2,
-        filter_domain=domain
+        filter_domain=domain,
+        vector_store=vector_store,
     )
     
     if not docs:
         return "I couldn't find relevant information in the knowledge base. Please upload manuals or ask a more specific question."
     
-    # Build context from retrieved docs
-    context = "\n\n".join([
-        f"**Source: {doc.metadata.get('source', 'Unknown')}**\n{doc.page_content}"
-        for doc in docs
-    ])
+    # Build context from retrieved docs, within the token budget
+    assembled = assemble_context(query, docs=docs, doc_template="**Source: {source}**\n{content}")
+    context = assembled.rag_context
     
     # Generate answer using LLM
     system_prompt = """You are a helpful home repair assistant. The user is a technician who is on ground, fixing home repair problems such as plumbing, electrical, carpentry, hvac, etc.
@@ -0,0 +1,172 @@
+"""Hazard keyword matcher used by safety validation.
+
+All domains' critical keywords are merged once into a table of distinct
+keywords, so every hazard is found regardless of which domain the question
+was routed to. Each text is lowercased once and searched keyword by keyword
+with str.find; keywords that do not occur cost one substring test. A keyword
+must start a word but may run on into it, like the substring check it
+replaced ("furnaces", "structurally", "furnace-room"), while "unstructured"
+or "1220v" are not hazards. keywords() stops at the first occurrence of each
+keyword and is what validation decides on; locate() adds positions for the
+keywords found, and scan() for all of them. Timings against the per-domain
+loop it replaced: src/evaluation/benchmarks/safety.py.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Critical safety keywords by domain
+CRITICAL_KEYWORDS = {
+    "electrical": ["live wire", "high voltage", "circuit breaker", "electrical panel", "220v", "240v"],
+    "plumbing": ["gas line", "main water line", "sewer", "asbestos", "lead pipe"],
+    "hvac": ["gas line", "refrigerant", "carbon monoxide", "furnace"],
+    "carpentry": ["load-bearing", "structural", "asbestos", "foundation"],
+}
+
+
+@dataclass(frozen=True)
+class HazardMatch:
+    """One hazard keyword occurrence."""
+
+    keyword: str
+    domains: tuple[str, ...]
+    source: str  # which scanned text it was found in, e.g. "query" or "response"
+    start: int
+    end: int
+
+
+class SafetyMatcher:
+    """Case-insensitive matcher for a fixed set of keywords at the start of a word."""
+
+    def __init__(self, keywords_by_domain: dict[str, list[str]]):
+        domains_by_keyword: dict[str, list[str]] = {}
+        for domain, keywords in keywords_by_domain.items():
+            for kw in keywords:
+                domains_by_keyword.setdefault(kw.lower(), []).append(domain)
+        self.domains_by_keyword = {kw: tuple(d) for kw, d in domains_by_keyword.items()}
+        # Longest first so "gas line" wins over any shorter keyword it contains
+        self._keywords = sorted(self.domains_by_keyword, key=len, reverse=True)
+
+    @staticmethod
+    def _is_word_char(ch: str) -> bool:
+        return ch.isalnum() or ch == "_"
+
+    def _word_end(self, text: str, end: int) -> int:
+        """End of the word a match runs into, so "furnaces" and "structurally" are matched whole."""
+        while end < len(text) and self._is_word_char(text[end]):
+            end += 1
+        return end
+
+    def _occurrences(self, lower: str, kw: str):
+        """(start, end) of each occurrence of kw at a word start in lowercased text."""
+        i = lower.find(kw)
+        while i != -1:
+            if i == 0 or not self._is_word_char(lower[i - 1]):
+                end = self._word_end(lower, i + len(kw))
+                yield i, end
+                i = lower.find(kw, end)
+            else:
+                i = lower.find(kw, i + 1)
+
+    def _occurs(self, lower: str, kw: str) -> bool:
+        """Whether kw occurs at a word start; stops at the first such occurrence."""
+        i = lower.find(kw)
+        while i != -1:
+            if i == 0 or not self._is_word_char(lower[i - 1]):
+                return True
+            i = lower.find(kw, i + 1)
+        return False
+
+    def keywords(self, **texts: str) -> list[str]:
+        """Distinct matched keywords, longest first (presence only, no positions)."""
+        lowered = [text.lower() for text in texts.values() if text]
+        found = []
+        for kw in self._keywords:
+            for lower in lowered:
+                if kw in lower and self._occurs(lower, kw):
+                    found.append(kw)
+                    break
+        return found
+
+    def locate(self, keywords: list[str], **texts: str) -> list[HazardMatch]:
+        """Every occurrence of the given keywords (e.g. those keywords() found) in the named texts."""
+        ordered = sorted(keywords, key=len, reverse=True)
+        matches: list[HazardMatch] = []
+        for source, text in texts.items():
+            if not text:
+                continue
+            lower = text.lower()
+            taken: list[tuple[int, int]] = []
+            found: list[HazardMatch] = []
+            for kw in ordered:
+                if kw not in lower:
+                    continue
+                for start, end in self._occurrences(lower, kw):
+                    if not any(s <= start < e for s, e in taken):
+                        taken.append((start, end))
+                        found.append(HazardMatch(kw, self.domains_by_keyword[kw], source, start, end))
+            matches.extend(sorted(found, key=lambda m: m.start))
+        return matches
+
+    def scan(self, **texts: str) -> list[HazardMatch]:
+        """Find all hazards in the given named texts, e.g. scan(query=..., response=...)."""
+        return self.locate(self._keywords, **texts)
+
+    def stream(self, source: str = "response") -> "StreamingScanner":
+        """Incremental scanner for text that arrives in batches (e.g. streamed tokens)."""
+        return StreamingScanner(self, source)
+
+
+class StreamingScanner:
+    """Scan appended text batches, re-reading only a short tail of earlier text.
+
+    Cost per batch depends on the batch size, not on how long the answer has grown.
+    """
+
+    def __init__(self, matcher: SafetyMatcher, source: str = "response"):
+        self.matcher = matcher
+        self.source = source
+        # Enough context to catch a keyword split across batches
+        self._tail_size = max(map(len, matcher._keywords))
+        self._tail = ""
+        self._tail_at_word_start = True
+        self._offset = 0
+        self._seen: set[tuple[str, int]] = set()
+        self.matches: list[HazardMatch] = []
+
+    def feed(self, batch: str) -> list[HazardMatch]:
+        """Add a batch of text; return hazards that became visible with it."""
+        window = self._tail + batch
+        base = self._offset - len(self._tail)
+        new: list[HazardMatch] = []
+        held = len(window)
+        for m in self.matcher.scan(**{self.source: window}):
+            # A match touching the end of the window may still grow (e.g. "furnace" -> "furnaces")
+            if m.end == len(window) and batch:
+                held = min(held, m.start)
+                continue
+            # A tail that starts mid-word could fake a word start; real matches there were reported already
+            if m.start == 0 and not self._tail_at_word_start:
+                continue
+            key = (m.keyword, base + m.start)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            new.append(HazardMatch(m.keyword, m.domains, m.source, base + m.start, base + m.end))
+        self._offset += len(batch)
+        # Keep a held-back match whole, however long its word has become
+        cut = max(min(len(window) - self._tail_size, held), 0)
+        self._tail = window[cut:]
+        self._tail_at_word_start = base + cut == 0 or cut == held or not self.matcher._is_word_char(window[cut - 1])
+        self.matches.extend(new)
+        return new
+
+    def close(self) -> list[HazardMatch]:
+        """Flush matches that were held back at the end of the text."""
+        return self.feed("")
+
+
+@lru_cache(maxsize=1)
+def get_safety_matcher() -> SafetyMatcher:
+    """Return the process-wide matcher."""
+    return SafetyMatcher(CRITICAL_KEYWORDS)
@@ -1,10 +1,165 @@
 """Safety validation for home repair responses."""
 
+import contextvars
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from langchain_core.messages import SystemMessage, HumanMessage
+
 from src.services.llm_utils import invoke_llm
+from src.services.resilience import stage_timeout
+from src.services.resources import get_shared_safety_matcher
+from src.services.telemetry import span
+
+VERDICT_CACHE_SIZE = 512
+# Share of a hazard sentence's words that must appear in the question or context
+# for a clean precheck to vouch for it; below that the answer is validated itself
+PRECHECK_COVERAGE = 0.6
+
+_verdict_cache: OrderedDict[tuple, dict] = OrderedDict()
+_cache_lock = threading.Lock()
+# Dedicated pool: prechecks call invoke_llm, which uses the shared LLM call pool itself
+_precheck_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="safety-precheck")
+
+
+class SafetyPrecheck:
+    """A safety assessment of the question and its context, running while the answer is generated."""
+
+    def __init__(self, domain: str, hazards: list[str], future: Future, covered_text: str = ""):
+        self.domain = domain
+        self.hazards = hazards
+        self.future = future
+        self.started = time.monotonic()
+        self.covered_words = frozenset(_words(covered_text))
+
+    def verdict(self) -> dict | None:
+        """Wait (within the safety deadline) for the parsed verdict; None if it failed."""
+        remaining = stage_timeout("safety") - (time.monotonic() - self.started)
+        try:
+            return self.future.result(timeout=max(remaining, 0.1))
+        except Exception:
+            return None
+
+
+def _cache_get(key: tuple) -> dict | None:
+    with _cache_lock:
+        value = _verdict_cache.get(key)
+        if value is not None:
+            _verdict_cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: tuple, value: dict) -> None:
+    with _cache_lock:
+        _verdict_cache[key] = value
+        _verdict_cache.move_to_end(key)
+        while len(_verdict_cache) > VERDICT_CACHE_SIZE:
+            _verdict_cache.popitem(last=False)
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _adds_hazard_instructions(response: str, hazards: list[str], covered_words: frozenset[str]) -> bool:
+    """True if a sentence of the answer mentioning a hazard is mostly not in the assessed question and context."""
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", response):
+        lower = sentence.lower()
+        if not any(kw in lower for kw in hazards):
+            continue
+        words = set(_words(lower))
+        if words and len(words & covered_words) / len(words) < PRECHECK_COVERAGE:
+            return True
+    return False
 
 
-def validate_safety(user_query: str, response: str, domain: str) -> dict:
+def _text_hash(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def _parse_verdict(content: str) -> dict:
+    """Parse the validator's JSON reply (tolerates code fences and surrounding prose)."""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in safety verdict")
+    data = json.loads(match.group(0))
+    warnings = data.get("warnings") or []
+    if isinstance(warnings, str):
+        warnings = [warnings]
+    return {
+        "is_safe": bool(data.get("is_safe", False)),
+        "warnings": [str(w) for w in warnings if str(w).strip()],
+        "requires_professional": bool(data.get("requires_professional", False)),
+        "reason": str(data.get("reason", "")),
+    }
+
+
+def _verdict_to_result(verdict: dict, domain: str, critical_keywords: list[str]) -> dict:
+    """Turn a parsed verdict into the validate_safety result."""
+    warnings = list(verdict["warnings"][:3])
+    if verdict["requires_professional"]:
+        warnings.append("This work may require a licensed professional. Consider consulting an expert.")
+
+    # Electrical hazards get the breaker warning even when the question was routed elsewhere
+    domains_by_keyword = get_shared_safety_matcher().domains_by_keyword
+    hazard_domains = {d for kw in critical_keywords for d in domains_by_keyword.get(kw, ())}
+    if ("electrical" in domain or "electrical" in hazard_domains) and not verdict["is_safe"]:
+        warnings.append("ELECTRICAL HAZARD: Turn off power at the circuit breaker before attempting any work.")
+
+    if "gas" in ' '.join(critical_keywords):
+        warnings.append("GAS HAZARD: Contact a licensed professional for any gas-related work.")
+
+    return {
+        "is_safe": verdict["is_safe"] or len(warnings) == 0,
+        "warnings": warnings,
+        "recommendations": ["Always follow local building codes", "Wear appropriate safety equipment"]
+    }
+
+
+def _conservative_result(domain: str) -> dict:
+    # If LLM fails, be conservative
+    return {
+        "is_safe": False,
+        "warnings": [f"This involves {domain} work. Please consult a licensed professional for safety."],
+        "recommendations": ["Safety first - when in doubt, call a professional"]
+    }
+
+
+def start_safety_precheck(user_query: str, context: str, domain: str) -> SafetyPrecheck | None:
+    """
+    Begin the LLM safety assessment on the question plus retrieved context.
+
+    Call this before generating the answer so the assessment overlaps generation.
+    Returns None when no hazard keywords are present (no LLM call needed).
+    """
+    hazards = get_shared_safety_matcher().keywords(query=user_query, context=context)
+    if not hazards:
+        return None
+
+    key = ("precheck", domain, frozenset(hazards), _text_hash(user_query, context))
+    cached = _cache_get(key)
+    future: Future = Future()
+    if cached is not None:
+        future.set_result(cached)
+        return SafetyPrecheck(domain, hazards, future, user_query + "\n" + context)
+
+    def _run() -> dict:
+        with span("safety.precheck", cache_hit=False):
+            verdict = _parse_verdict(_assess(user_query, context, domain, hazards, subject="context"))
+        _cache_put(key, verdict)
+        return verdict
+
+    # Copy the context so the precheck's spans land in the caller's trace
+    future = _precheck_executor.submit(contextvars.copy_context().run, _run)
+    return SafetyPrecheck(domain, hazards, future, user_query + "\n" + context)
+
+
+def validate_safety(user_query: str, response: str, domain: str, precheck: SafetyPrecheck | None = None) -> dict:
     """
     Validate that a repair response is safe.
     
@@ -12,56 +167,75 @@ def validate_safety(user_query: str, response: str, domain: str) -> dict:
         user_query: Original user question
         response: AI-generated response
         domain: plumbing, electrical, carpentry, hvac, or general
+        precheck: Optional assessment started with start_safety_precheck; when it
+            covers every hazard found in the answer its verdict is reused instead of
+            validating the answer, unless it was clean and the answer adds hazard
+            instructions that the question and context do not contain
     
     Returns:
         dict with:
             - is_safe: bool
             - warnings: list[str]
             - recommendations: list[str]
+            - hazards: list of {keyword, domains}, longest keyword first
     """
     
-    # Critical safety keywords by domain
-    CRITICAL_KEYWORDS = {
-        "electrical": ["live wire", "high voltage", "circuit breaker", "electrical panel", "220v", "240v"],
-        "plumbing": ["gas line", "main water line", "sewer", "asbestos", "lead pipe"],
-        "hvac": ["gas line", "refrigerant", "carbon monoxide", "furnace"],
-        "carpentry": ["load-bearing", "structural", "asbestos", "foundation"],
-    }
-    
-    # Check for critical keywords
-    critical_detected = []
-    if domain in CRITICAL_KEYWORDS:
-        query_lower = user_query.lower()
-        response_lower = response.lower()
-        for keyword in CRITICAL_KEYWORDS[domain]:
-            if keyword in query_lower or keyword in response_lower:
-                critical_detected.append(keyword)
-    
-    # If critical work detected, use LLM to validate
-    if critical_detected:
-        return _llm_safety_check(user_query, response, domain, critical_detected)
-    
-    # Default: safe
-    return {
-        "is_safe": True,
-        "warnings": [],
-        "recommendations": []
-    }
+    with span("safety") as s:
+        # Check for critical keywords across all domains (a misrouted question is still caught)
+        matcher = get_shared_safety_matcher()
+        critical_detected = matcher.keywords(query=user_query, response=response)
+        s.set(hazards=len(critical_detected))
 
+        # If critical work detected, validate (cached per domain, hazard set and answer)
+        if critical_detected:
+            key = ("verdict", domain, frozenset(critical_detected), _text_hash(user_query, response))
+            result = _cache_get(key)
+            s.set(cache_hit=result is not None)
+            if result is None:
+                verdict = None
+                if precheck is not None and set(critical_detected) <= set(precheck.hazards):
+                    verdict = precheck.verdict()
+                # A flagged verdict stands; a clean one only vouches for what it assessed
+                if (
+                    verdict is not None
+                    and verdict["is_safe"]
+                    and not verdict["requires_professional"]
+                    and _adds_hazard_instructions(response, critical_detected, precheck.covered_words)
+                ):
+                    verdict = None
+                s.set(precheck_used=verdict is not None)
+                if verdict is not None:
+                    result = _verdict_to_result(verdict, domain, critical_detected)
+                else:
+                    result = _llm_safety_check(user_query, response, domain, critical_detected)
+                _cache_put(key, result)
+            result = dict(result)
+        else:
+            # Default: safe
+            result = {
+                "is_safe": True,
+                "warnings": [],
+                "recommendations": []
+            }
+    # Presence is enough here; positions come from matcher.locate() for callers that need them
+    result["hazards"] = [
+        {"keyword": kw, "domains": list(matcher.domains_by_keyword[kw])} for kw in critical_detected
+    ]
+    return result
 
-def _llm_safety_check(user_query: str, response: str, domain: str, critical_keywords: list[str]) -> dict:
-    """Use LLM to perform deeper safety analysis."""
-    
+
+def _assess(user_query: str, text: str, domain: str, critical_keywords: list[str], subject: str) -> str:
+    """Ask the validator LLM for a JSON verdict on an answer or on the question's context."""
     system_prompt = f"""You are a safety validator for home repair instructions in the {domain} domain.
 
 Critical elements detected: {', '.join(critical_keywords)}
 
-Analyze the repair instructions and determine:
+Analyze the repair {"instructions" if subject == "response" else "situation"} and determine:
 1. Is this safe for a DIY homeowner?
 2. What safety warnings should be emphasized?
 3. Should this require a licensed professional?
 
-Respond in JSON format:
+Respond with ONLY a JSON object, no other text:
 {{
     "is_safe": true/false,
     "warnings": ["warning 1", "warning 2"],
@@ -69,45 +243,32 @@ Respond in JSON format:
     "reason": "brief explanation"
 }}"""
 
-    user_prompt = f"""User Query: {user_query}
+    if subject == "response":
+        user_prompt = f"""User Query: {user_query}
 
 Response to Validate:
-{response}
+{text}
 
 Is this response safe? What warnings should be added?"""
-    
+    else:
+        user_prompt = f"""User Query: {user_query}
+
+Context the answer will be based on:
+{text}
+
+Is this safe to do yourself? What warnings should the answer include?"""
+
     messages = [
         SystemMessage(content=system_prompt),
         HumanMessage(content=user_prompt)
     ]
-    
+    return invoke_llm(messages, temperature=0.1, stage="safety")  # Low temperature for safety checks
+
+
+def _llm_safety_check(user_query: str, response: str, domain: str, critical_keywords: list[str]) -> dict:
+    """Use LLM to perform deeper safety analysis."""
     try:
-        content = invoke_llm(messages, temperature=0.1).lower()  # Low temperature for safety checks
-        
-        # Parse response (simple string parsing since model might not always return perfect JSON)
-        
-        warnings = []
-        if "requires_professional" in content or "call a professional" in content:
-            warnings.append("This work may require a licensed professional. Consider consulting an expert.")
-        
-        if "electrical" in domain and any(kw in content for kw in ["danger", "hazard", "risk"]):
-            warnings.append("ELECTRICAL HAZARD: Turn off power at the circuit breaker before attempting any work.")
-        
-        if "gas" in ' '.join(critical_keywords):
-            warnings.append("GAS HAZARD: Contact a licensed professional for any gas-related work.")
-        
-        is_safe = "is_safe\": true" in content or len(warnings) == 0
-        
-        return {
-            "is_safe": is_safe,
-            "warnings": warnings,
-            "recommendations": ["Always follow local building codes", "Wear appropriate safety equipment"]
-        }
-        
+        verdict = _parse_verdict(_assess(user_query, response, domain, critical_keywords, subject="response"))
+        return _verdict_to_result(verdict, domain, critical_keywords)
     except Exception:
-        # If LLM fails, be conservative
-        return {
-            "is_safe": False,
-            "warnings": [f"This involves {domain} work. Please consult a licensed professional for safety."],
-            "recommendations": ["Safety first - when in doubt, call a professional"]
-        }
\ No newline at end of file
+        return _conservative_result(domain)
@@ -1,11 +1,17 @@
 """Specialist agent registry and domain-specific prompts."""
 
+from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.vectorstores import VectorStore
 
+from src.agents.memory import ConversationMemory
+
+from src.services.answer_store import lookup_answer, set_answer_generator
+from src.services.context_builder import assemble_context
 from src.services.llm_utils import invoke_llm
-from src.services.vector_store import search_multiple_namespaces
-from src.agents.safety_validation import validate_safety
+from src.services.telemetry import span
+from src.services.vector_store import kb_version, search_multiple_namespaces
+from src.agents.safety_validation import start_safety_precheck, validate_safety
 
 
 # Ordered list of domains for routing (used by router.py)
@@ -39,39 +45,87 @@ def get_specialist_response(
     user_query: str,
     vector_store: VectorStore | None = None,
     image_context: str | None = None,
+    use_precomputed: bool = True,
+    memory: ConversationMemory | None = None,
+    docs: list[Document] | None = None,
 ) -> tuple[str, dict]:
     """
     Get response from domain specialist using RAG.
 
+    Frequent text-only questions are served from the precomputed answer store
+    (see src/ingestion/precompute_answers.py) when an entry for the current
+    knowledge base version exists.
+
+    With a ConversationMemory, earlier turns are added to the prompt (bounded by
+    the memory's window and summary sizes), follow-up questions on the same topic
+    reuse the previous retrieval results (other questions that refer back get fresh
+    results merged with them), and the exchange is recorded in the memory.
+
+    docs, if given, are retrieval results fetched by the caller (e.g. the batch
+    query CLI searches for many questions at once); the search is skipped.
+
     Returns:
-        (answer, meta) where meta contains rag_docs_found, safety_warnings, is_safe
+        (answer, meta) where meta contains rag_docs_found, safety_warnings, is_safe,
+        context_tokens (tokens used per prompt section) and sources (retrieved, in rank
+        order); precomputed is True for stored answers
     """
-    # Get RAG context
-    rag_context = ""
-    rag_docs_found = 0
-    if vector_store:
-        try:
-            docs = search_multiple_namespaces(
-                query=user_query,
-                namespaces=["manuals"],
-                k_per_namespace=3,
-                filter_domain=domain if domain != "general" else None
-            )
-            if docs:
-                rag_docs_found = len(docs)
-                rag_context = "\n\n".join([
-                    f"[Source: {doc.metadata.get('source', 'unknown')}]\n{doc.page_content}"
-                    for doc in docs
-                ])
-        except Exception:
-            rag_context = ""
+    # Only an on-topic follow-up within the same domain is answered from the conversation instead of the store
+    follow_up = memory is not None and domain == memory.last_domain and memory.is_follow_up(user_query)
+    if use_precomputed and not image_context and not follow_up:
+        with span("precomputed_lookup") as s:
+            try:
+                hit = lookup_answer(domain, user_query, kb_version())
+            except Exception:
+                hit = None
+            s.set(cache_hit=hit is not None)
+        if hit:
+            answer, meta = hit
+            meta["precomputed"] = True
+            if memory is not None:
+                memory.remember_retrieval(domain, [], user_query)
+                memory.record_exchange(user_query, answer)
+            return answer, meta
+
+    # Get RAG context (follow-ups reuse the previous turn's retrieval; callers may pass their own)
+    retrieval_reused = False
+    if docs is None and memory is not None:
+        docs = memory.reusable_docs(user_query, domain)
+        retrieval_reused = docs is not None
+    if retrieval_reused:
+        with span("retrieval", cache_hit=True) as s:
+            s.set(docs=len(docs))
+    elif docs is None:
+        docs = []
+        if vector_store:
+            try:
+                docs = search_multiple_namespaces(
+                    query=user_query,
+                    namespaces=["manuals"],
+                    k_per_namespace=3,
+                    filter_domain=domain if domain != "general" else None,
+                    vector_store=vector_store,
+                )
+            except Exception:
+                docs = []
+        if memory is not None:
+            # "Is it safe to reset a GFCI?" after a faucet question: new results first, earlier ones kept
+            docs = memory.with_previous_docs(user_query, domain, docs)
+    if memory is not None and not retrieval_reused:
+        memory.remember_retrieval(domain, docs, user_query)
+
+    # Fit history, retrieved docs, vision description and question into the token budget
+    history = memory.context_text() if memory is not None else None
+    assembled = assemble_context(user_query, docs=docs, image_context=image_context, history=history)
+    rag_docs_found = assembled.docs_used
 
     # Build context
     context_parts = []
-    if rag_context:
-        context_parts.append(f"**Knowledge Base Context:**\n{rag_context}")
-    if image_context:
-        context_parts.append(f"**Visual Analysis:**\n{image_context}")
+    if assembled.history:
+        context_parts.append(f"**Conversation So Far:**\n{assembled.history}")
+    if assembled.rag_context:
+        context_parts.append(f"**Knowledge Base Context:**\n{assembled.rag_context}")
+    if assembled.image_context:
+        context_parts.append(f"**Visual Analysis:**\n{assembled.image_context}")
     context_parts.append(f"**User Question:**\n{user_query}")
 
     full_context = "\n\n".join(context_parts)
@@ -98,10 +152,12 @@ Be concise but thorough. Prioritize safety above all else."""
         SystemMessage(content=system_prompt),
         HumanMessage(content=full_context)
     ]
+    # Safety assessment of the question and context runs while the answer is generated
+    precheck = start_safety_precheck(user_query, full_context, domain)
     answer = invoke_llm(messages, temperature=0.7)
 
     # Safety validation
-    safety_check = validate_safety(user_query, answer, domain)
+    safety_check = validate_safety(user_query, answer, domain, precheck=precheck)
 
     if not safety_check["is_safe"]:
         warnings = "\n".join([f"⚠️ {w}" for w in safety_check["warnings"]])
@@ -111,5 +167,20 @@ Be concise but thorough. Prioritize safety above all else."""
         "rag_docs_found": rag_docs_found,
         "safety_warnings": safety_check.get("warnings", []),
         "is_safe": safety_check["is_safe"],
+        "context_tokens": assembled.tokens,
+        "precomputed": False,
+        "retrieval_reused": retrieval_reused,
+        # Retrieved sources in rank order (for retrieval evaluation)
+        "sources": list(dict.fromkeys(d.metadata.get("source", "unknown") for d in docs)),
     }
-    return answer, meta
\ No newline at end of file
+    if memory is not None:
+        memory.record_exchange(user_query, answer)
+    return answer, meta
+
+
+def _regenerate(domain: str, question: str, vector_store: VectorStore | None) -> tuple[str, dict]:
+    return get_specialist_response(domain=domain, user_query=question, vector_store=vector_store, use_precomputed=False)
+
+
+# Stored answers are regenerated with the same pipeline after the knowledge base changes
+set_answer_generator(_regenerate)
@@ -34,7 +34,7 @@ def route_query(query: str, image_context: str | None = None) -> Domain:
         messages = [
             HumanMessage(content=ROUTER_PROMPT.format(query=full_query)),
         ]
-        text = invoke_llm(messages, temperature=0.0).strip().lower()
+        text = invoke_llm(messages, temperature=0.0, stage="classification").strip().lower()
         for d in DOMAINS:
             if d in text or text == d:
                 return d
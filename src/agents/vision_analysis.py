@@ -2,26 +2,138 @@
 
 import asyncio
 import base64
+import contextvars
+import json
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
 
+from src.services.disk_cache import cache_key, read_cache, write_cache
+from src.services.image_preprocess import PreparedImage, prepare_image
+from src.services.resilience import run_with_deadline, stage_timeout
+from src.services.scheduler import get_scheduler, request_key
+from src.services.telemetry import span
 
-def _detect_mime_type(image_bytes: bytes) -> str:
-    """Detect image MIME type from magic bytes."""
-    if image_bytes[:3] == b"\xff\xd8\xff":
-        return "image/jpeg"
-    if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
-        return "image/png"
-    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
-        return "image/gif"
-    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
-        return "image/webp"
-    return "image/jpeg"
+DEFAULT_PROMPT = "Describe this image in detail for home repair diagnosis. Identify any visible issues, components, or relevant details."
+# Concurrent vision requests for batch analysis
+VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", "4"))
+
+_MULTI_IMAGE_INSTRUCTIONS = """You are given {count} images, numbered 1 to {count} in the order shown.
+Answer the request below separately for each image. Start each answer with a line "### Image <number>" and nothing else on that line.
+
+Request: {prompt}"""
+_SECTION_PATTERN = re.compile(r"^#{2,4}\s*Image\s+(\d+)\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def _vision_provider() -> tuple[str, str]:
+    """Return (provider, model) used for vision analysis."""
+    if os.getenv("USE_DEDALUS") and os.getenv("DEDALUS_API_KEY") and os.getenv("DEDALUS_MODEL"):
+        return "dedalus", os.getenv("DEDALUS_MODEL")
+    return "gemini", os.getenv("VISION_MODEL", "gemini-2.5-flash")
+
+
+class _VisionClients:
+    """Process-wide vision clients, created on first use and shared by all calls.
+
+    The Dedalus client is async, so it lives on one background event loop that
+    worker threads submit requests to, instead of a new loop and client per call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gemini = None
+        self._dedalus = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def gemini(self):
+        with self._lock:
+            if self._gemini is None:
+                from src.services.llm_utils import get_vision_llm
+                from src.services.resources import shared
+                self._gemini = shared("llm:vision", get_vision_llm)
+            return self._gemini.get()
+
+    def dedalus(self):
+        with self._lock:
+            if self._dedalus is None:
+                from dedalus_labs import AsyncDedalus
+
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="vision-dedalus-loop", daemon=True).start()
+
+                async def _make():
+                    return AsyncDedalus(api_key=os.getenv("DEDALUS_API_KEY"))
+
+                self._dedalus = asyncio.run_coroutine_threadsafe(_make(), self._loop).result()
+            return self._dedalus, self._loop
+
+
+_clients = _VisionClients()
+
+
+def _image_part(image: PreparedImage) -> dict:
+    b64_image = base64.b64encode(image.data).decode("utf-8")
+    return {"type": "image_url", "image_url": {"url": f"data:{image.mime_type};base64,{b64_image}"}}
+
+
+def _request(content: list[dict], provider: str, model: str, key: str) -> str:
+    """Send one vision request through the scheduler, under the vision deadline."""
+    if provider == "dedalus":
+        client, loop = _clients.dedalus()
+
+        async def _run():
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": content}],
+                max_tokens=4096,
+            )
+            return response.choices[0].message.content or ""
+
+        def _call() -> str:
+            return asyncio.run_coroutine_threadsafe(_run(), loop).result()
+    else:
+        # Fallback: Gemini via LangChain
+        from langchain_core.messages import HumanMessage
+
+        def _call() -> str:
+            response = _clients.gemini().invoke([HumanMessage(content=content)])
+            return getattr(response, "content", None) or str(response)
+
+    return run_with_deadline(
+        lambda: get_scheduler().call(provider, _call, key=key),
+        stage_timeout("vision"),
+        stage="vision",
+    )
+
+
+def _analysis_cache_key(image: PreparedImage, prompt: str, model: str) -> str:
+    """Cache key by image hash, prompt and model (perceptual hash if VISION_CACHE_PERCEPTUAL=1)."""
+    use_perceptual = os.getenv("VISION_CACHE_PERCEPTUAL", "").strip() in ("1", "true", "True", "yes")
+    image_id = image.perceptual_hash if use_perceptual and image.perceptual_hash else image.content_hash
+    return cache_key(image_id, prompt, model)
+
+
+def _cached(image: PreparedImage, prompt: str, model: str) -> str | None:
+    cached = read_cache("vision", _analysis_cache_key(image, prompt, model), ".json")
+    return json.loads(cached)["analysis"] if cached is not None else None
+
+
+def _store(image: PreparedImage, prompt: str, model: str, analysis: str) -> None:
+    if analysis:
+        payload = json.dumps({"analysis": analysis, "model": model}).encode("utf-8")
+        write_cache("vision", _analysis_cache_key(image, prompt, model), payload, ".json")
 
 
 def analyze_image(image_bytes: bytes, user_query: str = "") -> str:
     """
     Analyze an image using Dedalus (if configured) or Gemini vision model.
 
+    The image is downsized and re-encoded before upload (see image_preprocess),
+    and analyses are cached on disk by (image hash, prompt, model), so a photo
+    that is sent again returns immediately.
+
     Args:
         image_bytes: Raw image bytes
         user_query: Optional context/question about the image
@@ -29,42 +141,125 @@ def analyze_image(image_bytes: bytes, user_query: str = "") -> str:
     Returns:
         Description/analysis from vision model
     """
-    b64_image = base64.b64encode(image_bytes).decode("utf-8")
-    mime_type = _detect_mime_type(image_bytes)
-    prompt = (
-        user_query
-        or "Describe this image in detail for home repair diagnosis. Identify any visible issues, components, or relevant details."
-    )
+    prompt = user_query or DEFAULT_PROMPT
+    provider, model = _vision_provider()
+    with span("vision", provider=provider) as s:
+        image = prepare_image(image_bytes)
+        s.set(bytes_in=len(image_bytes), bytes_sent=len(image.data))
 
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{b64_image}"}},
-            ],
-        }
-    ]
+        cached = _cached(image, prompt, model)
+        s.set(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
 
-    if os.getenv("USE_DEDALUS") and os.getenv("DEDALUS_API_KEY") and os.getenv("DEDALUS_MODEL"):
-        from dedalus_labs import AsyncDedalus
+        analysis = _request(
+            [{"type": "text", "text": prompt}, _image_part(image)],
+            provider,
+            model,
+            key=request_key("vision", provider, model, image.content_hash, prompt),
+        )
+        _store(image, prompt, model, analysis)
+        return analysis
 
-        async def _run():
-            client = AsyncDedalus(api_key=os.getenv("DEDALUS_API_KEY"))
-            response = await client.chat.completions.create(
-                model=os.getenv("DEDALUS_MODEL"),
-                messages=messages,
-                max_tokens=4096,
-            )
-            return response.choices[0].message.content or ""
 
-        return asyncio.run(_run())
+def _analyze_group(images: list[PreparedImage], prompt: str, provider: str, model: str) -> list[str]:
+    """Analyze several images in one model request; falls back to one request per image."""
+    if len(images) == 1:
+        content = [{"type": "text", "text": prompt}, _image_part(images[0])]
+        key = request_key("vision", provider, model, images[0].content_hash, prompt)
+        return [_request(content, provider, model, key)]
+
+    content = [{"type": "text", "text": _MULTI_IMAGE_INSTRUCTIONS.format(count=len(images), prompt=prompt)}]
+    content.extend(_image_part(img) for img in images)
+    key = request_key("vision-multi", provider, model, [img.content_hash for img in images], prompt)
+    text = _request(content, provider, model, key)
+
+    sections: dict[int, str] = {}
+    parts = _SECTION_PATTERN.split(text)
+    for number, body in zip(parts[1::2], parts[2::2]):
+        sections[int(number)] = body.strip()
+    if sorted(sections) == list(range(1, len(images) + 1)) and all(sections.values()):
+        return [sections[i + 1] for i in range(len(images))]
+    # The model did not follow the numbering; analyze separately rather than guess
+    return [_analyze_group([img], prompt, provider, model)[0] for img in images]
+
+
+def iter_analyze_images(
+    images: list[bytes],
+    user_query: str = "",
+    concurrency: int | None = None,
+    images_per_request: int = 1,
+) -> Iterator[tuple[int, str | None, Exception | None]]:
+    """
+    Analyze many images concurrently, yielding results as each finishes.
+
+    Args:
+        images: Raw image bytes
+        user_query: Prompt applied to every image
+        concurrency: Max concurrent model requests (default VISION_CONCURRENCY)
+        images_per_request: Images sent together in one request (both providers accept several)
+
+    Yields:
+        (index, analysis, error) in completion order; a failing image yields its
+        error without affecting the others.
+    """
+    prompt = user_query or DEFAULT_PROMPT
+    provider, model = _vision_provider()
+
+    pending: list[tuple[int, PreparedImage]] = []
+    for index, data in enumerate(images):
+        try:
+            image = prepare_image(data)
+        except Exception as e:
+            yield index, None, e
+            continue
+        cached = _cached(image, prompt, model)
+        if cached is not None:
+            yield index, cached, None
+        else:
+            pending.append((index, image))
+    if not pending:
+        return
+
+    size = max(images_per_request, 1)
+    groups = [pending[i:i + size] for i in range(0, len(pending), size)]
+    with ThreadPoolExecutor(max_workers=concurrency or VISION_CONCURRENCY, thread_name_prefix="vision") as pool:
+        # Each task runs in a copy of the caller's context, so call_priority("ingest") applies to it
+        futures = {
+            pool.submit(contextvars.copy_context().run, _analyze_group, [img for _, img in group], prompt, provider, model): group
+            for group in groups
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                analyses = future.result()
+            except Exception as e:
+                if len(group) == 1:
+                    yield group[0][0], None, e
+                    continue
+                # Isolate the failure: retry the group's images one by one
+                analyses = []
+                for _, img in group:
+                    try:
+                        analyses.append(_analyze_group([img], prompt, provider, model)[0])
+                    except Exception as single_error:
+                        analyses.append(single_error)
+            for (index, image), analysis in zip(group, analyses):
+                if isinstance(analysis, Exception):
+                    yield index, None, analysis
+                else:
+                    _store(image, prompt, model, analysis)
+                    yield index, analysis, None
 
-    # Fallback: Gemini via LangChain
-    from langchain_core.messages import HumanMessage
-    from src.services.llm_utils import get_vision_llm
 
-    message = HumanMessage(content=messages[0]["content"])
-    llm = get_vision_llm()
-    response = llm.invoke([message])
-    return getattr(response, "content", None) or str(response)
\ No newline at end of file
+def analyze_images(
+    images: list[bytes],
+    user_query: str = "",
+    concurrency: int | None = None,
+    images_per_request: int = 1,
+) -> list[str | Exception]:
+    """Batch version of analyze_image; returns one analysis (or the error) per image, in input order."""
+    results: list[str | Exception] = [None] * len(images)
+    for index, analysis, error in iter_analyze_images(images, user_query, concurrency, images_per_request):
+        results[index] = error if error is not None else analysis
+    return results
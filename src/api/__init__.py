@@ -0,0 +1 @@
+"""FixPalAI HTTP API: headless service and client."""
@@ -0,0 +1,115 @@
+"""Client for the FixPalAI HTTP API (standard library only).
+
+    client = FixPalClient("http://localhost:8000")
+    for event in client.stream_query("My faucet drips", session_id="abc"):
+        print(event)
+"""
+
+import base64
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Iterator
+
+
+class APIError(Exception):
+    """Non-2xx response from the API; status 503 means it is overloaded (see retry_after)."""
+
+    def __init__(self, status: int, detail: str, retry_after: int | None = None):
+        super().__init__(f"API error {status}: {detail}")
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class FixPalClient:
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, method: str, path: str, body: dict | None = None, timeout: float | None = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"} if data is not None else {},
+        )
+        try:
+            return urllib.request.urlopen(req, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read().decode("utf-8")).get("detail", e.reason)
+            except Exception:
+                detail = e.reason
+            retry_after = e.headers.get("Retry-After")
+            raise APIError(e.code, str(detail), int(retry_after) if retry_after and retry_after.isdigit() else None)
+
+    def _json(self, method: str, path: str, body: dict | None = None, timeout: float | None = None) -> dict:
+        with self._open(method, path, body, timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    @staticmethod
+    def _query_body(prompt: str, image: bytes | None, session_id: str | None, profile: bool) -> dict:
+        return {
+            "prompt": prompt,
+            "image_b64": base64.b64encode(image).decode("ascii") if image else None,
+            "session_id": session_id,
+            "profile": profile,
+        }
+
+    def query(self, prompt: str, image: bytes | None = None, session_id: str | None = None, profile: bool = False) -> dict:
+        """Answer a question; returns {"answer", "domain", "meta", "request_id"}."""
+        return self._json("POST", "/v1/query", self._query_body(prompt, image, session_id, profile))
+
+    def stream_query(
+        self, prompt: str, image: bytes | None = None, session_id: str | None = None, profile: bool = False
+    ) -> Iterator[dict]:
+        """Yield progress events as they arrive, ending with an "answer" or "error" event."""
+        with self._open("POST", "/v1/query/stream", self._query_body(prompt, image, session_id, profile)) as resp:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+
+    def ingest(self, files: list[tuple[str, bytes]], namespace: str = "manuals") -> dict:
+        """Index (name, data) files; returns {"chunks", "files": [{"name", "chunks", "error"}]}."""
+        body = {
+            "files": [{"name": name, "content_b64": base64.b64encode(data).decode("ascii")} for name, data in files],
+            "namespace": namespace,
+        }
+        return self._json("POST", "/v1/ingest", body, timeout=max(self.timeout, 600.0))
+
+    def submit_ingest_job(self, files: list[tuple[str, bytes]], namespace: str = "manuals") -> str:
+        """Queue files for background ingestion; returns the job id."""
+        body = {
+            "files": [{"name": name, "content_b64": base64.b64encode(data).decode("ascii")} for name, data in files],
+            "namespace": namespace,
+        }
+        return self._json("POST", "/v1/ingest/jobs", body)["job_id"]
+
+    def get_ingest_job(self, job_id: str) -> dict:
+        return self._json("GET", f"/v1/ingest/jobs/{urllib.parse.quote(job_id)}")
+
+    def cancel_ingest_job(self, job_id: str) -> bool:
+        try:
+            return self._json("POST", f"/v1/ingest/jobs/{urllib.parse.quote(job_id)}/cancel")["cancelled"]
+        except APIError as e:
+            if e.status == 409:
+                return False
+            raise
+
+    def sources(self, namespace: str = "manuals") -> list[dict]:
+        return self._json("GET", f"/v1/sources?namespace={urllib.parse.quote(namespace)}")["sources"]
+
+    def delete_source(self, name: str, namespace: str = "manuals") -> int:
+        path = f"/v1/sources/{urllib.parse.quote(name)}?namespace={urllib.parse.quote(namespace)}"
+        try:
+            return self._json("DELETE", path)["deleted"]
+        except APIError as e:
+            if e.status == 404:
+                return 0
+            raise
+
+    def health(self, timeout: float = 3.0) -> dict:
+        return self._json("GET", "/health", timeout=timeout)
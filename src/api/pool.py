@@ -0,0 +1,89 @@
+"""Bounded worker pool with admission control for the API.
+
+Requests run on a fixed number of worker threads. Up to max_queue more wait
+for a free worker; beyond that, submit() raises Overloaded at once instead of
+letting work pile up, and the API answers 503 with Retry-After. A request
+that waited longer than queue_timeout is dropped before it starts (its client
+has most likely given up).
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """The pool and its queue are full, or a request waited too long to start."""
+
+
+class WorkerPool:
+    def __init__(self, name: str, workers: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"api-{name}")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Queue fn(*args, **kwargs); raises Overloaded if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"{self.name} queue is full ({self.workers} workers, {self.max_queue} queued)")
+        queued_at = time.monotonic()
+        with self._lock:
+            self.pending += 1
+
+        def _run() -> T:
+            with self._lock:
+                self.pending -= 1
+                self.active += 1
+            try:
+                if time.monotonic() - queued_at > self.queue_timeout:
+                    with self._lock:
+                        self.expired += 1
+                    raise Overloaded(f"{self.name} request waited more than {self.queue_timeout:.0f} s to start")
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        try:
+            future = self._executor.submit(_run)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up, for the Retry-After header."""
+        return max(1, min(30, self.pending // max(self.workers, 1) + 1))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,331 @@
+"""Headless HTTP API for FixPalAI (ASGI, FastAPI).
+
+    uvicorn src.api.server:app --port 8000
+    python -m src.api.server --port 8000 --replicas 4
+
+Endpoints:
+    POST   /v1/query            {"prompt", "image_b64"?, "session_id"?, "profile"?} -> answer, domain, meta
+    POST   /v1/query/stream     same body; NDJSON progress events, then the answer (see coordinator_stream)
+    POST   /v1/ingest           {"files": [{"name", "content_b64"}], "namespace"?} -> chunks per file
+    POST   /v1/ingest/jobs      same body; queues a background job -> job_id
+    GET    /v1/ingest/jobs/{id} job status with per-file progress
+    POST   /v1/ingest/jobs/{id}/cancel
+    GET    /v1/sources          ?namespace=manuals
+    DELETE /v1/sources/{name}   ?namespace=manuals
+    GET    /health              worker pools and shared resources
+
+Queries run on a pool of API_WORKERS threads with up to API_QUEUE_SIZE
+waiting; when that is full the API answers 503 with Retry-After instead of
+queueing without bound. Ingestion has its own smaller pool so uploads cannot
+starve queries. Conversation memory is kept per session_id in this process:
+replicas started with --replicas share one port and balance per connection,
+so for multi-turn sessions run replicas on separate ports behind a load
+balancer with sticky sessions.
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+load_dotenv()
+
+from src.agents.memory import ConversationMemory
+from src.api.pool import Overloaded, WorkerPool
+from src.evaluation.eval_agent import flush_interactions
+from src.services.resources import get_shared_vector_store, resource_status
+from src.services.scheduler import scheduler_metrics
+from src.services.warmup import start_warmup, warmup_status
+
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "32"))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+API_INGEST_WORKERS = int(os.getenv("API_INGEST_WORKERS", "1"))
+API_MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+
+
+class VectorStoreUnavailable(RuntimeError):
+    """The shared vector store could not be created (answered with 503)."""
+
+
+_query_pool = WorkerPool("query", API_WORKERS, API_QUEUE_SIZE, API_QUEUE_TIMEOUT)
+_ingest_pool = WorkerPool("ingest", API_INGEST_WORKERS, max(API_QUEUE_SIZE // 4, 1), API_QUEUE_TIMEOUT * 10)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # /health answers right away; the agent stack loads in the background
+    start_warmup()
+    # Jobs queued or running before a restart would otherwise wait for the next upload
+    from src.ingestion.jobs import resume_jobs
+
+    await asyncio.to_thread(resume_jobs)
+    yield
+    _query_pool.shutdown()
+    _ingest_pool.shutdown()
+    flush_interactions()
+
+
+app = FastAPI(title="FixPalAI API", version="0.1.0", lifespan=_lifespan)
+
+
+class QueryRequest(BaseModel):
+    prompt: str = ""
+    image_b64: str | None = None
+    session_id: str | None = None
+    profile: bool = False
+
+
+class UploadedFile(BaseModel):
+    name: str
+    content_b64: str
+
+
+class IngestRequest(BaseModel):
+    files: list[UploadedFile]
+    namespace: str = "manuals"
+
+
+# Conversation memory per session, least recently used evicted first
+_sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _memory_for(session_id: str | None) -> ConversationMemory | None:
+    if not session_id:
+        return None
+    with _sessions_lock:
+        memory = _sessions.pop(session_id, None) or ConversationMemory()
+        _sessions[session_id] = memory
+        while len(_sessions) > API_MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return memory
+
+
+def _decode(data: str, what: str) -> bytes:
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail=f"{what} is not valid base64")
+
+
+def _overloaded(pool: WorkerPool, e: Overloaded) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(e)}, headers={"Retry-After": str(pool.retry_after())})
+
+
+def _query_args(req: QueryRequest) -> dict:
+    prompt = req.prompt.strip()
+    image = _decode(req.image_b64, "image_b64") if req.image_b64 else None
+    if not prompt and not image:
+        raise HTTPException(status_code=400, detail="Provide a prompt or an image")
+    return {
+        "user_query": prompt or "What do you see in this image? Please suggest repair steps.",
+        "image_bytes": image,
+        "memory": _memory_for(req.session_id),
+        "profile": req.profile,
+    }
+
+
+def _run_query(args: dict, emit=None, cancelled: threading.Event | None = None) -> dict:
+    """Run the pipeline on a worker thread; returns the final answer or error event."""
+    from src.agents.coordinator import coordinator_stream
+
+    try:
+        vector_store = get_shared_vector_store("manuals")
+    except Exception as e:
+        raise VectorStoreUnavailable(f"Vector store unavailable: {e}") from e
+    events = coordinator_stream(vector_store=vector_store, **args)
+    final = None
+    try:
+        for event in events:
+            if cancelled is not None and cancelled.is_set():
+                break
+            if emit is not None:
+                emit(event)
+            if event["event"] in ("answer", "error"):
+                final = event
+    finally:
+        events.close()
+    return final or {"event": "error", "error": "Request cancelled"}
+
+
+@app.post("/v1/query")
+async def query(req: QueryRequest):
+    args = _query_args(req)
+    try:
+        future = _query_pool.submit(_run_query, args)
+    except Overloaded as e:
+        return _overloaded(_query_pool, e)
+    try:
+        result = await asyncio.wrap_future(future)
+    except Overloaded as e:
+        return _overloaded(_query_pool, e)
+    except VectorStoreUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+    if result["event"] == "error":
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {k: v for k, v in result.items() if k != "event"}
+
+
+@app.post("/v1/query/stream")
+async def query_stream(req: QueryRequest):
+    args = _query_args(req)
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(event: dict) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    try:
+        future = _query_pool.submit(_run_query, args, emit, cancelled)
+    except Overloaded as e:
+        return _overloaded(_query_pool, e)
+    # Mark the end of the stream whatever happens on the worker
+    future.add_done_callback(lambda f: loop.call_soon_threadsafe(events.put_nowait, f))
+
+    async def body():
+        try:
+            while True:
+                item = await events.get()
+                if isinstance(item, dict):
+                    yield json.dumps(item, default=str) + "\n"
+                    continue
+                error = item.exception()
+                if error is not None:
+                    yield json.dumps({"event": "error", "error": str(error)}) + "\n"
+                return
+        finally:
+            # Client went away (or we are done): stop the pipeline at its next step
+            cancelled.set()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+def _ingest(files: list[tuple[str, bytes]], namespace: str) -> list[dict]:
+    from src.ingestion.uploads import ingest_uploads
+
+    vs = get_shared_vector_store(namespace)
+    return [
+        {"name": name, "chunks": chunks, "error": error}
+        for name, chunks, error in ingest_uploads(vs, files)
+    ]
+
+
+@app.post("/v1/ingest")
+async def ingest(req: IngestRequest):
+    files = [(f.name, _decode(f.content_b64, f.name)) for f in req.files]
+    if not files:
+        raise HTTPException(status_code=400, detail="No files")
+    try:
+        future = _ingest_pool.submit(_ingest, files, req.namespace)
+    except Overloaded as e:
+        return _overloaded(_ingest_pool, e)
+    try:
+        results = await asyncio.wrap_future(future)
+    except Overloaded as e:
+        return _overloaded(_ingest_pool, e)
+    return {"chunks": sum(r["chunks"] for r in results), "files": results}
+
+
+@app.post("/v1/ingest/jobs")
+async def submit_ingest_job(req: IngestRequest):
+    """Queue a background ingestion job (see src/ingestion/jobs.py); poll it with GET."""
+    from src.ingestion.jobs import ensure_worker, submit_job
+
+    files = [(f.name, _decode(f.content_b64, f.name)) for f in req.files]
+    if not files:
+        raise HTTPException(status_code=400, detail="No files")
+    job_id = await asyncio.to_thread(submit_job, files, req.namespace)
+    await asyncio.to_thread(ensure_worker)
+    return {"job_id": job_id}
+
+
+@app.get("/v1/ingest/jobs/{job_id}")
+async def ingest_job(job_id: str):
+    from src.ingestion.jobs import get_job
+
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+
+@app.post("/v1/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str):
+    from src.ingestion.jobs import cancel_job
+
+    if not await asyncio.to_thread(cancel_job, job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is not queued or running")
+    return {"cancelled": True}
+
+
+@app.get("/v1/sources")
+async def sources(namespace: str = "manuals"):
+    from src.services.vector_store import get_all_sources
+
+    vs = await asyncio.to_thread(get_shared_vector_store, namespace)
+    return {"sources": await asyncio.to_thread(get_all_sources, vs)}
+
+
+@app.delete("/v1/sources/{name:path}")
+async def remove_source(name: str, namespace: str = "manuals"):
+    from src.services.vector_store import delete_source
+
+    vs = await asyncio.to_thread(get_shared_vector_store, namespace)
+    try:
+        deleted = await asyncio.to_thread(delete_source, vs, name)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No source named {name}")
+    return {"deleted": deleted}
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "pools": {"query": _query_pool.metrics(), "ingest": _ingest_pool.metrics()},
+        "resources": resource_status(),
+        "warmup": warmup_status(),
+        "providers": scheduler_metrics(),
+        "sessions": len(_sessions),
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the FixPalAI HTTP API.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument(
+        "--replicas", type=int, default=1,
+        help="Worker processes sharing the port (session memory is per process, see module docstring)",
+    )
+    args = parser.parse_args()
+    uvicorn.run("src.api.server:app", host=args.host, port=args.port, workers=args.replicas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Per-chunk memory and CPU overhead of the ingestion chunk representations.
+
+    python -m src.evaluation.benchmarks.chunks --chunks 200000
+
+Compares the two ways chunks travel from the chunker to the vector store:
+
+  objects  list[DocumentChunk] (pydantic, one per chunk), converted to
+           LangChain Documents with a metadata dict each for add_documents
+  batch    ChunkBatch (parallel lists, interned sources), converted to
+           texts + metadata dicts for add_texts
+
+Chunk texts are created up front and shared by both, so the numbers are the
+overhead on top of the text itself: bytes retained per chunk (tracemalloc)
+while the chunks are held, extra bytes while the provider input is built,
+and microseconds per chunk for each step.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.services.document_loader import ChunkBatch, DocumentChunk
+from src.services.vector_store import _doc_chunk_to_langchain
+
+PAGES_PER_FILE = 100
+CHUNKS_PER_PAGE = 2
+
+
+def _rows(texts: list[str], n: int):
+    """(text, source, page) like the chunker produces; a new source string per page, as the loader makes."""
+    for i in range(n):
+        if i % CHUNKS_PER_PAGE == 0:
+            page = i // CHUNKS_PER_PAGE
+            source = f"manual-{page // PAGES_PER_FILE:05d}.pdf"
+        yield texts[i % len(texts)], source, page % PAGES_PER_FILE + 1
+
+
+def _build_objects(texts, n):
+    return [
+        DocumentChunk(content=text, source=source, source_type="manual", page=page)
+        for text, source, page in _rows(texts, n)
+    ]
+
+
+def _build_batch(texts, n):
+    batch = ChunkBatch()
+    for text, source, page in _rows(texts, n):
+        batch.append(text, source, "manual", page=page)
+    return batch
+
+
+def _objects_to_provider(chunks):
+    return [_doc_chunk_to_langchain(c) for c in chunks]
+
+
+def _batch_to_provider(batch):
+    return batch.texts, batch.metadatas()
+
+
+def _measure(name: str, build, to_provider, texts: list[str], n: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    chunks = build(texts, n)
+    build_s = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0] - base
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    provider_input = to_provider(chunks)
+    convert_s = time.perf_counter() - start
+    convert_peak = tracemalloc.get_traced_memory()[1] - base - held
+    tracemalloc.stop()
+    del provider_input, chunks
+    gc.collect()
+    return {
+        "representation": name,
+        "chunks": n,
+        "held_bytes_per_chunk": round(held / n, 1),
+        "convert_bytes_per_chunk": round(convert_peak / n, 1),
+        "build_us_per_chunk": round(build_s / n * 1e6, 2),
+        "convert_us_per_chunk": round(convert_s / n * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-chunk overhead of DocumentChunk lists vs ChunkBatch.")
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--text-chars", type=int, default=2000, help="Characters per chunk (512 tokens is about 2000)")
+    parser.add_argument("--output", default=None, help="Results JSON (default benchmark_results/chunks-<time>.json)")
+    args = parser.parse_args()
+
+    texts = [(f"Step {i}: check the valve seat and replace the washer. " * 60)[: args.text_chars] for i in range(1000)]
+    results = [
+        _measure("objects", _build_objects, _objects_to_provider, texts, args.chunks),
+        _measure("batch", _build_batch, _batch_to_provider, texts, args.chunks),
+    ]
+
+    print(f"{'':<10}{'held B/chunk':>14}{'convert B/chunk':>17}{'build us/chunk':>16}{'convert us/chunk':>18}")
+    for r in results:
+        print(f"{r['representation']:<10}{r['held_bytes_per_chunk']:>14.0f}{r['convert_bytes_per_chunk']:>17.0f}"
+              f"{r['build_us_per_chunk']:>16.2f}{r['convert_us_per_chunk']:>18.2f}")
+
+    output = Path(args.output or f"benchmark_results/chunks-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"run": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)}, "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Deterministic offline stand-ins for the LLM, vision and embedding providers.
+
+Each fake sleeps for a latency drawn from a configurable distribution and
+returns output derived from its input, so a replay is repeatable and needs
+no network or API keys. install_fakes() swaps them in for the real
+providers for the duration of a with-block.
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.agents.safety_matcher import get_safety_matcher
+
+# (median ms, p95 ms) per call kind; roughly what the hosted models show
+DEFAULT_LATENCIES = {
+    "classification": (300.0, 900.0),
+    "generation": (2500.0, 6000.0),
+    "safety": (900.0, 2500.0),
+    "summary": (800.0, 2000.0),
+    "vision": (2000.0, 5000.0),
+    "embedding": (60.0, 200.0),
+}
+
+
+class LatencyModel:
+    """Log-normal latency with a given median and p95 (a fixed delay if they are equal)."""
+
+    def __init__(self, median_ms: float, p95_ms: float, seed: int = 0):
+        self.median_ms = median_ms
+        self.sigma = math.log(p95_ms / median_ms) / 1.645 if p95_ms > median_ms > 0 else 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0) -> "LatencyModel":
+        """'800' (fixed) or '800:2500' (median:p95), in milliseconds."""
+        median, _, p95 = spec.partition(":")
+        return cls(float(median), float(p95 or median), seed)
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            z = self._rng.gauss(0.0, 1.0)
+        return self.median_ms * math.exp(self.sigma * z)
+
+    def sleep(self, scale: float = 1.0) -> None:
+        if self.median_ms > 0 and scale > 0:
+            time.sleep(self.sample_ms() * scale / 1000)
+
+
+def latency_models(overrides: dict[str, str] | None = None, seed: int = 0) -> dict[str, LatencyModel]:
+    """Default models, with 'kind' -> 'median[:p95]' overrides."""
+    models = {kind: LatencyModel(m, p, seed + i) for i, (kind, (m, p)) in enumerate(DEFAULT_LATENCIES.items())}
+    for kind, spec in (overrides or {}).items():
+        models[kind] = LatencyModel.parse(spec, seed)
+    return models
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _message_text(messages) -> str:
+    parts = []
+    for m in messages:
+        content = getattr(m, "content", m)
+        parts.append(content if isinstance(content, str) else str(content))
+    return "\n".join(parts)
+
+
+_DOMAIN_WORDS = {
+    "plumbing": ("pipe", "drain", "faucet", "toilet", "leak", "water", "plumb", "sink"),
+    "electrical": ("wire", "outlet", "switch", "circuit", "breaker", "electric", "light"),
+    "carpentry": ("door", "cabinet", "trim", "floor", "wood", "hinge", "drawer"),
+    "hvac": ("furnace", "thermostat", "hvac", "heat", "cool", "filter", "vent"),
+}
+
+
+class FakeLLM:
+    """Answers classification, safety, summary and generation prompts deterministically."""
+
+    def __init__(self, latencies: dict[str, LatencyModel], scale: float = 1.0):
+        self.latencies = latencies
+        self.scale = scale
+        self.calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def kind(text: str) -> str:
+        if "Classify" in text:
+            return "classification"
+        if "safety validator" in text:
+            return "safety"
+        if "running summary" in text:
+            return "summary"
+        return "generation"
+
+    def __call__(self, messages, temperature: float = 0.7, model_name: str | None = None) -> str:
+        text = _message_text(messages)
+        kind = self.kind(text)
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+        self.latencies[kind].sleep(self.scale)
+
+        if kind == "classification":
+            query = text.rsplit("Query:", 1)[-1]
+            words = _words(query)
+            scores = {d: sum(w.startswith(k) for w in words for k in kws) for d, kws in _DOMAIN_WORDS.items()}
+            best = max(scores, key=scores.get)
+            return best if scores[best] else "general"
+        if kind == "safety":
+            hazards = get_safety_matcher().keywords(text=text)
+            return json.dumps({
+                "is_safe": not hazards,
+                "warnings": [f"Take care around the {h}." for h in hazards[:2]],
+                "requires_professional": len(hazards) > 1,
+                "reason": "offline verdict",
+            })
+        if kind == "summary":
+            return " ".join(_words(text)[-60:])
+        # Generation: a structured answer whose length depends on the prompt
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        steps = 4 + int(digest[:2], 16) % 5
+        body = "\n".join(f"{i}. Step {i} of the repair ({digest[i:i + 6]})." for i in range(1, steps + 1))
+        return (
+            "1. **Diagnosis**: Likely a worn component.\n2. **Safety First**: Shut off power or water first.\n"
+            f"3. **Tools & Materials**: Screwdriver, wrench.\n4. **Step-by-Step Instructions**:\n{body}\n"
+            "5. **When to Call a Pro**: If unsure, call a licensed professional.\n"
+        )
+
+
+class FakeVision:
+    """Describes an image by its hash."""
+
+    def __init__(self, latency: LatencyModel, scale: float = 1.0):
+        self.latency = latency
+        self.scale = scale
+        self.calls = 0
+
+    def __call__(self, content: list[dict], provider: str, model: str, key: str) -> str:
+        self.calls += 1
+        self.latency.sleep(self.scale)
+        images = sum(1 for part in content if part.get("type") == "image_url")
+        return f"Offline description of {images} image(s) ({key[:8]}): a fixture with visible wear."
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: texts sharing words are close, with no model to load."""
+
+    def __init__(self, latency: LatencyModel | None = None, dims: int = 256, scale: float = 1.0):
+        self.latency = latency
+        self.dims = dims
+        self.scale = scale
+        self._slots: dict[str, tuple[int, float]] = {}  # word -> (dimension, sign), hashed once
+
+    def _slot(self, word: str) -> tuple[int, float]:
+        slot = self._slots.get(word)
+        if slot is None:
+            h = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16)
+            slot = self._slots[word] = (h % self.dims, 1.0 if h & 1 else -1.0)
+        return slot
+
+    def _embed(self, text: str) -> list[float]:
+        vec = [0.0] * self.dims
+        for word in _words(text):
+            index, sign = self._slot(word)
+            vec[index] += sign
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.latency:
+            self.latency.sleep(self.scale)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.latency:
+            self.latency.sleep(self.scale)
+        return self._embed(text)
+
+
+class FakeVectorStore(VectorStore):
+    """In-memory store with the dict metadata filter that Chroma and Pinecone accept."""
+
+    def __init__(self, embedding: Embeddings):
+        self._embedding = embedding
+        self._docs: list[Document] = []
+        self._vectors: list[list[float]] = []
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: list[dict] | None = None, **kwargs: Any) -> list[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        start = len(self._docs)
+        self._vectors.extend(self._embedding.embed_documents(texts))
+        self._docs.extend(Document(page_content=t, metadata=dict(m)) for t, m in zip(texts, metadatas))
+        return [str(i) for i in range(start, len(self._docs))]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs: Any) -> list[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, filter: dict | None = None, **kwargs: Any
+    ) -> list[Document]:
+        q = embedding
+        scored = []
+        for doc, vec in zip(self._docs, self._vectors):
+            if filter and any(doc.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            scored.append((sum(a * b for a, b in zip(q, vec)), doc))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [doc for _, doc in scored[:k]]
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: list[dict] | None = None, **kwargs: Any):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+
+@contextmanager
+def install_fakes(
+    llm: FakeLLM | Callable,
+    vision: FakeVision | Callable | None = None,
+    vector_store: VectorStore | None = None,
+) -> Iterator[None]:
+    """Route provider calls to the fakes (and retrieval to vector_store) inside the block."""
+    import src.agents.vision_analysis as vision_analysis
+    import src.services.llm_utils as llm_utils
+    import src.services.vector_store as vector_store_module
+
+    saved = [
+        (llm_utils, "_call_gemini", llm_utils._call_gemini),
+        (llm_utils, "_dedalus_configured", llm_utils._dedalus_configured),
+        (vision_analysis, "_request", vision_analysis._request),
+        (vision_analysis, "_vision_provider", vision_analysis._vision_provider),
+        (vector_store_module, "get_shared_vector_store", vector_store_module.get_shared_vector_store),
+    ]
+    llm_utils._call_gemini = lambda messages, temperature, model_name: llm(messages, temperature, model_name)
+    llm_utils._dedalus_configured = lambda: False
+    vision_analysis._vision_provider = lambda: ("gemini", "offline-vision")
+    if vision is not None:
+        vision_analysis._request = vision
+    if vector_store is not None:
+        vector_store_module.get_shared_vector_store = lambda namespace="manuals": vector_store
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
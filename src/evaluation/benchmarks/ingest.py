@@ -0,0 +1,214 @@
+"""Ingestion throughput benchmark on synthetic manuals.
+
+    python -m src.evaluation.benchmarks.ingest --sizes 1000,10000,100000 --backends memory,chroma
+
+For each corpus size, synthetic manuals are generated once (see
+synthetic_manuals.py) and ingested into each backend the way the app does
+it: load_document_batch -> chunk_batch -> add_chunks_to_store, one file at a
+time. Embeddings come from the local fake embedder, so the numbers measure
+this code and the vector store rather than the embedding API.
+
+Each (size, backend) run happens in a fresh subprocess so peak RSS is per
+run. Reports pages/s, chunks/s, time per stage, peak RSS and on-disk index
+size, and writes the results to benchmark_results/.
+
+The pinecone backend writes to a throwaway namespace of PINECONE_INDEX_NAME
+and deletes it afterwards; it needs PINECONE_API_KEY.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+BACKENDS = ("memory", "chroma", "pinecone")
+STORE_BATCH = 500
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _dir_size_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1024 / 1024, 2)
+
+
+def _make_store(backend: str, embeddings, work_dir: Path):
+    """Return (vector_store, cleanup) for a backend."""
+    if backend == "memory":
+        from src.evaluation.benchmarks.fakes import FakeVectorStore
+        return FakeVectorStore(embeddings), lambda: None
+
+    if backend == "chroma":
+        import chromadb
+        from langchain_chroma import Chroma
+
+        client = chromadb.PersistentClient(path=str(work_dir / "chroma"))
+        vs = Chroma(client=client, collection_name="fixpalai_bench", embedding_function=embeddings)
+        return vs, lambda: None
+
+    if backend == "pinecone":
+        from langchain_pinecone import PineconeVectorStore
+
+        ns = f"bench-{uuid.uuid4().hex[:8]}"
+        vs = PineconeVectorStore.from_existing_index(os.getenv("PINECONE_INDEX_NAME", "fixpalai"), embeddings, namespace=ns)
+        return vs, lambda: vs.delete(delete_all=True, namespace=ns)
+
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def run_worker(corpus: Path, backend: str, dims: int) -> dict:
+    """Ingest the corpus into one backend (in this process) and measure it."""
+    from src.evaluation.benchmarks.fakes import FakeEmbeddings
+    from src.services.chunker import chunk_batch
+    from src.services.document_loader import load_document_batch
+    from src.services.vector_store import add_chunks_to_store
+
+    work_dir = Path(tempfile.mkdtemp(prefix=f"fixpal-ingest-{backend}-"))
+    # add_chunks_to_store bumps the knowledge base version; keep that out of the real store
+    os.environ["KB_VERSION_PATH"] = str(work_dir / "kb_version")
+
+    class TimedEmbeddings(FakeEmbeddings):
+        seconds = 0.0
+
+        def embed_documents(self, texts):
+            start = time.perf_counter()
+            try:
+                return super().embed_documents(texts)
+            finally:
+                TimedEmbeddings.seconds += time.perf_counter() - start
+
+    embeddings = TimedEmbeddings(dims=dims)
+    vs, cleanup = _make_store(backend, embeddings, work_dir)
+    timings = {"load": 0.0, "chunk": 0.0, "store": 0.0}
+    pages = chunks = 0
+    try:
+        for path in sorted(p for p in corpus.iterdir() if p.suffix in (".pdf", ".txt")):
+            start = time.perf_counter()
+            docs = load_document_batch(path, source_type="manual")
+            timings["load"] += time.perf_counter() - start
+            pages += len(docs) if path.suffix == ".pdf" else sum(text.count("\f") + 1 for text in docs.texts)
+
+            start = time.perf_counter()
+            file_chunks = chunk_batch(docs)
+            timings["chunk"] += time.perf_counter() - start
+            chunks += len(file_chunks)
+
+            start = time.perf_counter()
+            for i in range(0, len(file_chunks), STORE_BATCH):
+                add_chunks_to_store(vs, file_chunks[i:i + STORE_BATCH])
+            timings["store"] += time.perf_counter() - start
+
+        timings["embed"] = TimedEmbeddings.seconds
+        timings["store"] -= TimedEmbeddings.seconds  # store time excluding embedding
+        total = timings["load"] + timings["chunk"] + timings["embed"] + timings["store"]
+        if backend == "chroma":
+            index_mb = _dir_size_mb(work_dir / "chroma")
+        elif backend == "memory":
+            index_mb = round(chunks * dims * 8 / 1024 / 1024, 2)  # vectors only
+        else:
+            index_mb = None
+        return {
+            "backend": backend,
+            "pages": pages,
+            "chunks": chunks,
+            "seconds": round(total, 2),
+            "pages_per_s": round(pages / total, 1) if total else 0.0,
+            "chunks_per_s": round(chunks / total, 1) if total else 0.0,
+            "stage_seconds": {k: round(v, 2) for k, v in timings.items()},
+            "peak_rss_mb": _peak_rss_mb(),
+            "index_mb": index_mb,
+        }
+    finally:
+        try:
+            cleanup()
+        except Exception as e:
+            print(f"Warning: cleanup failed: {e}", file=sys.stderr)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _run_in_subprocess(corpus: Path, backend: str, dims: int, extract_cache: bool) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "src.evaluation.benchmarks.ingest", "--worker",
+         "--corpus", str(corpus), "--backends", backend, "--dims", str(dims)],
+        cwd=_project_root, capture_output=True, text=True,
+        # Without this, every run after the first would load pages from the extraction cache
+        env={**os.environ, "PDF_EXTRACT_CACHE": "1" if extract_cache else "0"},
+    )
+    if proc.returncode != 0:
+        return {"backend": backend, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion throughput on synthetic manuals.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated corpus sizes in pages")
+    parser.add_argument("--backends", default="memory,chroma", help=f"Comma-separated, from {', '.join(BACKENDS)}")
+    parser.add_argument("--format", choices=["pdf", "txt", "mixed"], default="pdf")
+    parser.add_argument("--dims", type=int, default=768, help="Fake embedding size (text-embedding-004 is 768)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extract-cache", action="store_true", help="Use the PDF extraction cache (measures re-indexing)")
+    parser.add_argument("--corpus-dir", default=None, help="Keep generated corpora here instead of a temp dir")
+    parser.add_argument("--output", default=None, help="Results JSON (default benchmark_results/ingest-<time>.json)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(Path(args.corpus), args.backends, args.dims)))
+        return 0
+
+    from src.evaluation.benchmarks.synthetic_manuals import generate_corpus
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    base = Path(args.corpus_dir) if args.corpus_dir else Path(tempfile.mkdtemp(prefix="fixpal-manuals-"))
+    results = []
+    print(f"{'pages':>8} {'backend':<10}{'chunks':>9}{'pages/s':>10}{'chunks/s':>10}"
+          f"{'load':>8}{'chunk':>8}{'embed':>8}{'store':>8}{'RSS MB':>9}{'index MB':>10}")
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            corpus = base / f"{args.format}-{size}"
+            if not corpus.exists():
+                start = time.perf_counter()
+                for _ in generate_corpus(corpus, size, args.format, seed=args.seed):
+                    pass
+                print(f"{size:>8} generated in {time.perf_counter() - start:.1f} s")
+            for backend in backends:
+                row = {"size": size, **_run_in_subprocess(corpus, backend, args.dims, args.extract_cache)}
+                results.append(row)
+                if "error" in row:
+                    print(f"{size:>8} {backend:<10}failed: {row['error']}")
+                    continue
+                st = row["stage_seconds"]
+                index = f"{row['index_mb']:>10.1f}" if row["index_mb"] is not None else f"{'-':>10}"
+                print(f"{size:>8} {backend:<10}{row['chunks']:>9}{row['pages_per_s']:>10.1f}{row['chunks_per_s']:>10.1f}"
+                      f"{st['load']:>8.1f}{st['chunk']:>8.1f}{st['embed']:>8.1f}{st['store']:>8.1f}"
+                      f"{row['peak_rss_mb']:>9.0f}{index}")
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(base, ignore_errors=True)
+
+    output = Path(args.output or f"benchmark_results/ingest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"run": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)}, "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
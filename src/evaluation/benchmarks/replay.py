@@ -0,0 +1,268 @@
+"""Replay benchmark: logged or labelled prompts through the full pipeline, offline.
+
+    python -m src.evaluation.benchmarks.replay --prompts eval.db --corpus data/manuals
+    python -m src.evaluation.benchmarks.replay --prompts prompts.jsonl --corpus corpus.jsonl \\
+        --concurrency 8 --latency generation=2500:6000 --compare benchmark_results/replay-previous.json
+
+Prompts come from eval.db (logged text questions) or a JSONL file with one
+{"prompt": ..., "relevant_sources": [...], "image": "path"} object per line
+(relevant_sources and image optional). Each prompt runs classify_domain ->
+get_specialist_response with the fake providers from fakes.py; the corpus
+(a folder of manuals, or JSONL {"source", "content", "domain"}) is embedded
+with hashed bag-of-words vectors into an in-memory store.
+
+Reports throughput, p50/p95/p99 per stage (from the telemetry spans) and
+retrieval recall@k against relevant_sources, and writes everything to a JSON
+file so runs can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from langchain_core.documents import Document
+
+from src.evaluation.benchmarks.fakes import (
+    FakeEmbeddings,
+    FakeLLM,
+    FakeVectorStore,
+    FakeVision,
+    install_fakes,
+    latency_models,
+)
+
+RECALL_KS = (1, 3)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def load_prompts(source: str, limit: int | None = None) -> list[dict]:
+    """Prompt rows from eval.db or a JSONL file."""
+    if source.endswith(".db"):
+        os.environ["EVAL_DB_PATH"] = source
+        from src.evaluation import eval_agent
+        eval_agent.EVAL_DB_PATH = source
+        rows = [{"prompt": prompt, "logged_domain": domain} for prompt, domain in eval_agent.fetch_logged_prompts()]
+    else:
+        with open(source, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return rows[:limit] if limit else rows
+
+
+def load_corpus(source: str | None) -> list[Document]:
+    """Chunked corpus documents from a folder of manuals or a JSONL file."""
+    if not source:
+        return []
+    path = Path(source)
+    if path.is_file():
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return [
+            Document(
+                page_content=r["content"],
+                metadata={k: v for k, v in (("source", r.get("source", "unknown")), ("domain", r.get("domain"))) if v},
+            )
+            for r in rows
+        ]
+
+    from src.services.chunker import chunk_documents
+    from src.services.document_loader import load_document
+    from src.services.vector_store import _doc_chunk_to_langchain
+
+    docs = []
+    for file in sorted(path.rglob("*")):
+        if file.suffix.lower() in (".pdf", ".txt", ".text"):
+            docs.extend(_doc_chunk_to_langchain(c) for c in chunk_documents(list(load_document(file))))
+    return docs
+
+
+def run_prompt(row: dict, vector_store, use_precomputed: bool) -> dict:
+    """Run one prompt through the pipeline and collect its stage timings."""
+    from src.agents.coordinator import classify_domain
+    from src.agents.specialists.registry import get_specialist_response
+    from src.agents.vision_analysis import analyze_image
+    from src.services.telemetry import start_trace
+
+    prompt = row["prompt"]
+    result = {"prompt": prompt, "relevant_sources": row.get("relevant_sources") or [], "error": None}
+    with start_trace() as trace:
+        try:
+            image_context = None
+            if row.get("image"):
+                image_context = analyze_image(Path(row["image"]).read_bytes(), user_query=prompt)
+            context = prompt + (f"\nImage context: {image_context}" if image_context else "")
+            domain = classify_domain(context)
+            _, meta = get_specialist_response(
+                domain=domain,
+                user_query=prompt,
+                vector_store=vector_store,
+                image_context=image_context,
+                use_precomputed=use_precomputed,
+            )
+            result.update(domain=domain, sources=meta.get("sources", []), safe=meta.get("is_safe"))
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["total_ms"] = round(trace.elapsed_ms(), 1)
+    stages: dict[str, float] = {}
+    for span in trace.summary():
+        stages[span["stage"]] = stages.get(span["stage"], 0.0) + span["duration_ms"]
+    result["stages"] = stages
+    return result
+
+
+def summarize(results: list[dict], wall_seconds: float) -> dict:
+    """Throughput, per-stage latency percentiles and recall@k."""
+    ok = [r for r in results if not r["error"]]
+    by_stage: dict[str, list[float]] = {"total": [r["total_ms"] for r in ok]}
+    for r in ok:
+        for stage, ms in r["stages"].items():
+            by_stage.setdefault(stage, []).append(ms)
+    latency = {
+        stage: {
+            "count": len(values),
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+        }
+        for stage, values in by_stage.items()
+    }
+
+    labelled = [r for r in ok if r["relevant_sources"]]
+    recall = {}
+    for k in RECALL_KS:
+        if labelled:
+            hits = [
+                len(set(r["sources"][:k]) & set(r["relevant_sources"])) / len(set(r["relevant_sources"]))
+                for r in labelled
+            ]
+            recall[f"recall@{k}"] = round(sum(hits) / len(hits), 4)
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_rps": round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_ms": latency,
+        "labelled": len(labelled),
+        **recall,
+    }
+
+
+def print_summary(summary: dict, previous: dict | None = None) -> None:
+    print(f"{summary['requests']} requests, {summary['errors']} errors, "
+          f"{summary['throughput_rps']} req/s over {summary['wall_seconds']} s")
+    print(f"{'stage':<24}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}   (ms)" + ("   p95 vs previous" if previous else ""))
+    old = (previous or {}).get("latency_ms", {})
+    for stage, row in sorted(summary["latency_ms"].items(), key=lambda kv: (kv[0] != "total", kv[0])):
+        line = f"{stage:<24}{row['count']:>6}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}"
+        if stage in old and old[stage]["p95"]:
+            line += f"   {(row['p95'] - old[stage]['p95']) / old[stage]['p95'] * 100:+.1f}%"
+        print(line)
+    for k in RECALL_KS:
+        key = f"recall@{k}"
+        if key in summary:
+            delta = f" (previous {previous[key]})" if previous and key in previous else ""
+            print(f"{key}: {summary[key]} over {summary['labelled']} labelled prompts{delta}")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay prompts through the pipeline with offline fake providers.")
+    parser.add_argument("--prompts", default="eval.db", help="eval.db or a JSONL file of prompts")
+    parser.add_argument("--corpus", default=None, help="Folder of manuals or JSONL of {source, content, domain}")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", action="append", default=[], metavar="KIND=MEDIAN[:P95]",
+                        help="Override a fake latency in ms (classification, generation, safety, summary, vision, embedding)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply all fake latencies (0 = no sleeping)")
+    parser.add_argument("--rate-limit", default="0", help="Outbound rate limit for the fake provider (rps[:burst], 0 = none)")
+    parser.add_argument("--use-precomputed", action="store_true", help="Serve matching questions from answers.db")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Results JSON (default benchmark_results/replay-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    # Offline and repeatable: fresh caches, fake provider not throttled unless asked
+    os.environ["RATE_LIMIT_GEMINI"] = args.rate_limit
+    os.environ.pop("USE_DEDALUS", None)
+    from src.services import disk_cache
+    disk_cache.CACHE_DIR = tempfile.mkdtemp(prefix="fixpal-replay-cache-")
+
+    overrides = dict(spec.split("=", 1) for spec in args.latency)
+    latencies = latency_models(overrides, seed=args.seed)
+    llm = FakeLLM(latencies, scale=args.time_scale)
+    vision = FakeVision(latencies["vision"], scale=args.time_scale)
+    embeddings = FakeEmbeddings(latencies["embedding"], scale=args.time_scale)
+
+    prompts = load_prompts(args.prompts, args.limit)
+    if not prompts:
+        print(f"No prompts found in {args.prompts}")
+        return 1
+    corpus = load_corpus(args.corpus)
+    vector_store = None
+    if corpus:
+        vector_store = FakeVectorStore(embeddings)
+        vector_store.add_documents(corpus)
+    print(f"Replaying {len(prompts)} prompts against {len(corpus)} corpus chunks, concurrency {args.concurrency}")
+
+    with install_fakes(llm, vision, vector_store):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda row: run_prompt(row, vector_store, args.use_precomputed), prompts))
+        wall = time.perf_counter() - started
+
+    summary = summarize(results, wall)
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)["summary"]
+    print_summary(summary, previous)
+    errors = [r["error"] for r in results if r["error"]]
+    if errors:
+        print(f"First error: {errors[0]}")
+
+    output = Path(args.output or f"benchmark_results/replay-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "run": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": _git_commit(),
+                "args": vars(args),
+                "llm_calls": llm.calls,
+                "vision_calls": vision.calls,
+            },
+            "summary": summary,
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
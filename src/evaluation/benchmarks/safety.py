@@ -0,0 +1,122 @@
+"""Benchmark: safety matcher vs. the per-domain substring loop it replaced.
+
+    python -m src.evaluation.benchmarks.safety --iterations 2000
+
+"legacy" only tests whether each keyword occurs in the routed domain (or in
+each domain). "keywords" is the all-domain presence check that validate_safety
+and the precheck decide on; "+ locate" also finds the positions of the
+keywords found, and "scan" collects every occurrence of every keyword.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.agents.safety_matcher import CRITICAL_KEYWORDS, get_safety_matcher
+
+_FILLER = (
+    "turn off the water supply valve and remove the faucet handle with a hex key then inspect "
+    "the cartridge for wear replace the o-rings and apply plumber grease before reassembly check "
+    "the thermostat settings and replace the air filter if it looks clogged tighten the hinge screws"
+).split()
+
+
+def legacy_scan(user_query: str, response: str, domain: str) -> list[str]:
+    """The original validate_safety check: rebuild per call, lowercase, substring per keyword."""
+    keywords = {
+        "electrical": ["live wire", "high voltage", "circuit breaker", "electrical panel", "220v", "240v"],
+        "plumbing": ["gas line", "main water line", "sewer", "asbestos", "lead pipe"],
+        "hvac": ["gas line", "refrigerant", "carbon monoxide", "furnace"],
+        "carpentry": ["load-bearing", "structural", "asbestos", "foundation"],
+    }
+    detected = []
+    if domain in keywords:
+        query_lower = user_query.lower()
+        response_lower = response.lower()
+        for keyword in keywords[domain]:
+            if keyword in query_lower or keyword in response_lower:
+                detected.append(keyword)
+    return detected
+
+
+def combined_regex(keywords: list[str]) -> re.Pattern:
+    """The alternative design: one alternation regex with word boundaries."""
+    alternation = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?:e?s)?(?!\w)", re.IGNORECASE)
+
+
+def make_text(rng: random.Random, words: int, hazard_rate: float = 0.01) -> str:
+    hazards = [kw for kws in CRITICAL_KEYWORDS.values() for kw in kws]
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(hazards) if rng.random() < hazard_rate else rng.choice(_FILLER))
+    return " ".join(out)
+
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark safety keyword matching.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    matcher = get_safety_matcher()
+    domains = list(CRITICAL_KEYWORDS)
+    regex = combined_regex(list(matcher.domains_by_keyword))
+
+    print(f"{'case':<28}{'legacy, 1 domain':>18}{'legacy, all':>14}{'regex, all':>14}{'keywords, all':>16}{'+ locate':>11}{'scan, all':>12}   (us/call)")
+    for label, words in (("stream batch (~30 words)", 30), ("answer (~400 words)", 400), ("long answer (~2000 words)", 2000)):
+        query = make_text(rng, 25)
+        response = make_text(rng, words)
+        legacy_one = _time(lambda: legacy_scan(query, response, "hvac"), args.iterations)
+        legacy_all = _time(lambda: [legacy_scan(query, response, d) for d in domains], args.iterations)
+        regex_all = _time(lambda: (list(regex.finditer(query)), list(regex.finditer(response))), args.iterations)
+        keywords = _time(lambda: matcher.keywords(query=query, response=response), args.iterations)
+        locate = _time(
+            lambda: matcher.locate(matcher.keywords(query=query, response=response), query=query, response=response),
+            args.iterations,
+        )
+        scan = _time(lambda: matcher.scan(query=query, response=response), args.iterations)
+        print(f"{label:<28}{legacy_one:>18.1f}{legacy_all:>14.1f}{regex_all:>14.1f}{keywords:>16.1f}{locate:>11.1f}{scan:>12.1f}")
+
+    # Streaming: check after every ~30-word batch of a 2000-word answer
+    query = make_text(rng, 25)
+    words = make_text(rng, 2000).split()
+    batches = [" ".join(words[i:i + 30]) + " " for i in range(0, len(words), 30)]
+
+    def legacy_stream():
+        text = ""
+        for batch in batches:
+            text += batch
+            legacy_scan(query, text, "hvac")
+
+    def scanner_stream():
+        scanner = matcher.stream()
+        for batch in batches:
+            scanner.feed(batch)
+        scanner.close()
+
+    iterations = max(args.iterations // 20, 1)
+    legacy_batch = _time(legacy_stream, iterations) / len(batches)
+    scanner_batch = _time(scanner_stream, iterations) / len(batches)
+    print(f"{'streamed, per 30-word batch':<28}{legacy_batch:>18.1f}{'':>14}{'':>14}{'':>16}{'':>11}{scanner_batch:>12.1f}")
+    print("(legacy rescans the accumulated answer each batch; the streaming scanner only reads the new batch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Startup import-time benchmark for the app and API entry points.
+
+    python -m src.evaluation.benchmarks.startup
+    python -m src.evaluation.benchmarks.startup --max-ms 800 --repeat 5
+
+Runs the top-level imports of each entry point (app/main.py, src/api/server.py)
+in a fresh interpreter under `python -X importtime` and reports the total
+import time, the slowest modules, and which heavy provider packages were
+loaded. Heavy providers (HEAVY_MODULES) are meant to load on first use or in
+the warm-up thread (src/services/warmup.py), never at startup, so the run
+fails (exit 1) if one shows up, or if an entry point exceeds --max-ms.
+Imports that fail because a package is not installed are listed and skipped.
+
+Writes the results to benchmark_results/.
+"""
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+ENTRY_POINTS = ("app/main.py", "src/api/server.py")
+HEAVY_MODULES = (
+    "chromadb",
+    "langchain_chroma",
+    "langchain_pinecone",
+    "langchain_google_genai",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "torch",
+    "fitz",
+    "tiktoken",
+    "gtts",
+)
+
+# Child: run each import statement, reporting the ones whose package is missing
+_CHILD = """
+import sys
+for stmt in sys.argv[1:]:
+    try:
+        exec(stmt)
+    except ImportError as e:
+        print("missing:" + stmt + ":" + str(e.name), file=sys.stderr)
+"""
+
+
+def top_level_imports(path: Path) -> list[str]:
+    """Source of the module-level import statements of a file (not those inside functions)."""
+    source = path.read_text(encoding="utf-8")
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and getattr(node, "module", None) != "__future__"
+    ]
+
+
+def parse_importtime(stderr: str) -> dict[str, dict]:
+    """{module: {"self_ms", "cumulative_ms", "depth"}} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = {
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        }
+    return modules
+
+
+def _run(statements: list[str]) -> tuple[dict[str, dict], list[str], float]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, *statements],
+        cwd=_project_root, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["import failed"])[-1])
+    missing = [line[len("missing:"):] for line in proc.stderr.splitlines() if line.startswith("missing:")]
+    return parse_importtime(proc.stderr), missing, wall_ms
+
+
+def measure(entry: str, repeat: int, baseline: set[str]) -> dict:
+    """Best of `repeat` runs for one entry point; modules loaded by a bare interpreter are excluded."""
+    statements = top_level_imports(_project_root / entry)
+    best = None
+    for _ in range(repeat):
+        modules, missing, wall_ms = _run(statements)
+        # Top-level entries only, so nested imports are not counted twice
+        total_ms = sum(m["cumulative_ms"] for name, m in modules.items() if m["depth"] == 0 and name not in baseline)
+        if best is None or total_ms < best["import_ms"]:
+            best = {"modules": modules, "missing": missing, "wall_ms": wall_ms, "import_ms": total_ms}
+    modules = {name: m for name, m in best["modules"].items() if name not in baseline}
+    heavy = sorted({name.split(".")[0] for name in modules} & set(HEAVY_MODULES))
+    slowest = sorted(modules.items(), key=lambda item: item[1]["self_ms"], reverse=True)
+    return {
+        "entry": entry,
+        "import_ms": round(best["import_ms"], 1),
+        "process_ms": round(best["wall_ms"], 1),
+        "modules": len(modules),
+        "heavy_modules": heavy,
+        "missing": best["missing"],
+        "slowest": [{"module": name, **{k: round(v, 1) for k, v in m.items() if k != "depth"}} for name, m in slowest[:15]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup import time of the app and API.")
+    parser.add_argument("--entries", default=",".join(ENTRY_POINTS), help="Comma-separated files whose top-level imports are measured")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per entry point (the fastest is reported)")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if an entry point's imports take longer")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to print per entry point")
+    parser.add_argument("--output", default=None, help="Results JSON (default benchmark_results/startup-<time>.json)")
+    args = parser.parse_args()
+
+    baseline = set(_run([])[0])
+    results = []
+    failed = False
+    for entry in (e.strip() for e in args.entries.split(",") if e.strip()):
+        try:
+            row = measure(entry, args.repeat, baseline)
+        except Exception as e:
+            print(f"{entry}: failed: {e}")
+            results.append({"entry": entry, "error": str(e)})
+            failed = True
+            continue
+        results.append(row)
+        print(f"\n{entry}: imports {row['import_ms']:.0f} ms, process {row['process_ms']:.0f} ms, {row['modules']} modules")
+        for m in row["slowest"][: args.top]:
+            print(f"  {m['self_ms']:>8.1f} ms self {m['cumulative_ms']:>9.1f} ms cumulative  {m['module']}")
+        for stmt in row["missing"]:
+            print(f"  not installed, skipped: {stmt}")
+        if row["heavy_modules"]:
+            print(f"  FAIL: heavy providers imported at startup: {', '.join(row['heavy_modules'])}")
+            failed = True
+        if args.max_ms is not None and row["import_ms"] > args.max_ms:
+            print(f"  FAIL: {row['import_ms']:.0f} ms is over the {args.max_ms:.0f} ms budget")
+            failed = True
+
+    output = Path(args.output or f"benchmark_results/startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"run": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)}, "results": results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
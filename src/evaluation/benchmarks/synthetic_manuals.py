@@ -0,0 +1,188 @@
+"""Synthetic repair manuals for ingestion benchmarks.
+
+    python -m src.evaluation.benchmarks.synthetic_manuals /tmp/manuals --pages 1000 --format pdf
+
+Manuals look like the real ones: a cover page, a table of contents,
+numbered section headings, step lists and spec tables, with the same
+safety notice, warranty page and page footer repeated across manuals
+(the duplicated boilerplate real vendor manuals have). Output is
+deterministic for a given seed.
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from typing import Iterator
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+WORDS_PER_PAGE = (320, 480)
+
+_VOCAB = {
+    "plumbing": {
+        "products": ["Kitchen Faucet", "Tankless Water Heater", "Dual-Flush Toilet", "Garbage Disposal", "Sump Pump"],
+        "parts": ["cartridge", "O-ring", "supply line", "aerator", "flapper", "fill valve", "drain trap", "shutoff valve"],
+        "actions": ["shut off the water supply", "loosen the retaining nut", "replace the washer", "flush the line",
+                    "apply plumber's tape", "check for drips", "tighten the compression fitting"],
+    },
+    "electrical": {
+        "products": ["GFCI Outlet", "Smart Dimmer Switch", "Ceiling Fan", "Load Center", "Doorbell Transformer"],
+        "parts": ["terminal screw", "ground wire", "neutral wire", "wire nut", "breaker", "faceplate", "junction box"],
+        "actions": ["turn off the circuit breaker", "verify power is off with a tester", "strip the insulation",
+                    "connect the ground wire", "press the reset button", "secure the faceplate"],
+    },
+    "hvac": {
+        "products": ["Gas Furnace", "Heat Pump", "Programmable Thermostat", "Split Air Conditioner", "HRV Unit"],
+        "parts": ["air filter", "flame sensor", "ignitor", "blower motor", "condensate line", "capacitor", "coil"],
+        "actions": ["replace the air filter", "clean the flame sensor", "reset the thermostat", "clear the condensate line",
+                    "inspect the blower belt", "check the refrigerant lines"],
+    },
+    "carpentry": {
+        "products": ["Pre-Hung Interior Door", "Kitchen Cabinet Set", "Laminate Flooring", "Sliding Patio Door", "Stair Kit"],
+        "parts": ["hinge", "strike plate", "drawer slide", "shim", "casing", "threshold", "subfloor", "joist"],
+        "actions": ["tighten the hinge screws", "shim the jamb", "adjust the drawer slide", "sand the edge",
+                    "pre-drill the pilot holes", "level the base cabinet"],
+    },
+}
+
+_FILLER = (
+    "Before starting make sure the work area is clean and well lit. Keep small parts in a container so they "
+    "are not lost. If the problem persists after these steps refer to the troubleshooting table or contact "
+    "customer support. Use only genuine replacement parts. Record the model and serial number for reference."
+).split()
+
+SAFETY_NOTICE = (
+    "IMPORTANT SAFETY INSTRUCTIONS. READ ALL INSTRUCTIONS BEFORE USE. Failure to follow these instructions "
+    "may result in fire, electric shock, flooding, property damage or serious injury. Installation and service "
+    "must be performed by a qualified person in accordance with all applicable local codes and regulations. "
+    "Disconnect power and shut off water and gas supplies before servicing. Keep children away from the work "
+    "area. Wear safety glasses and gloves. SAVE THESE INSTRUCTIONS."
+)
+
+WARRANTY = (
+    "LIMITED WARRANTY. The manufacturer warrants this product to be free from defects in materials and "
+    "workmanship for a period of one (1) year from the date of original purchase. This warranty does not cover "
+    "damage resulting from improper installation, misuse, neglect, accident, or normal wear and tear. To obtain "
+    "warranty service, contact customer support with proof of purchase. Some states do not allow the exclusion "
+    "or limitation of incidental or consequential damages, so the above limitation may not apply to you. "
+) * 3
+
+
+def _sentence(rng: random.Random, vocab: dict) -> str:
+    part = rng.choice(vocab["parts"])
+    action = rng.choice(vocab["actions"])
+    filler = " ".join(rng.choice(_FILLER) for _ in range(rng.randint(6, 14)))
+    return f"{action.capitalize()} and inspect the {part}; {filler}."
+
+
+def generate_manual(rng: random.Random, pages: int, domain: str | None = None) -> tuple[str, str, list[str]]:
+    """Return (title, domain, page texts) for one synthetic manual."""
+    domain = domain or rng.choice(list(_VOCAB))
+    vocab = _VOCAB[domain]
+    product = rng.choice(vocab["products"])
+    model = f"{rng.choice('ABCDEFGHJKLMNPRSTVWX')}{rng.choice('ABCDEFGHJKLMNPRSTVWX')}-{rng.randint(100, 9999)}"
+    title = f"{product} {model} Installation and Service Manual"
+    footer = f"(c) Acme Home Products | {product} {model}"
+
+    sections = max(pages // 6, 1)
+    headings = [
+        f"{i + 1}. {rng.choice(['Installing', 'Servicing', 'Troubleshooting', 'Replacing', 'Adjusting'])} "
+        f"the {rng.choice(vocab['parts'])}"
+        for i in range(sections)
+    ]
+
+    texts = [f"{title}\n\nModel {model}\n\n{SAFETY_NOTICE}"]
+    if pages > 1:
+        texts.append("Table of Contents\n" + "\n".join(f"{h} ..... {2 + i * 6}" for i, h in enumerate(headings)))
+    body_pages = max(pages - len(texts) - (1 if pages > 3 else 0), 0)
+    for n in range(body_pages):
+        lines = []
+        if n % 6 == 0:
+            lines.append(headings[min(n // 6, len(headings) - 1)])
+        target = rng.randint(*WORDS_PER_PAGE)
+        words = 0
+        step = 1
+        while words < target:
+            if rng.random() < 0.1:
+                row = f"{rng.choice(vocab['parts']).title():<18} {rng.randint(1, 99)} mm   {rng.randint(1, 40)} N.m"
+                lines.append(row)
+                words += 5
+            else:
+                sentence = f"Step {step}. {_sentence(rng, vocab)}"
+                step += 1
+                lines.append(sentence)
+                words += len(sentence.split())
+        if rng.random() < 0.05:
+            lines.append(SAFETY_NOTICE)
+        texts.append("\n".join(lines))
+    if pages > 3:
+        texts.append(WARRANTY)
+    texts = texts[:pages]
+    return title, domain, [f"{text}\n\n{footer} | Page {i + 1}" for i, text in enumerate(texts)]
+
+
+def write_pdf(path: Path, pages: list[str]) -> None:
+    """Write page texts to a PDF (requires PyMuPDF)."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    try:
+        for text in pages:
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=7)
+        doc.save(str(path), garbage=0, deflate=True)
+    finally:
+        doc.close()
+
+
+def write_txt(path: Path, pages: list[str]) -> None:
+    path.write_text("\n\f\n".join(pages), encoding="utf-8")
+
+
+def generate_corpus(
+    out_dir: str | Path,
+    total_pages: int,
+    fmt: str = "txt",
+    pages_per_manual: tuple[int, int] = (20, 120),
+    seed: int = 0,
+) -> Iterator[tuple[Path, str, int]]:
+    """Write manuals totalling total_pages pages; yields (path, domain, pages) per manual."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    written = 0
+    index = 0
+    while written < total_pages:
+        pages = min(rng.randint(*pages_per_manual), total_pages - written)
+        _, domain, texts = generate_manual(rng, pages)
+        kind = fmt if fmt != "mixed" else rng.choice(["pdf", "txt"])
+        path = out / f"{domain}_manual_{index:05d}.{kind}"
+        (write_pdf if kind == "pdf" else write_txt)(path, texts)
+        written += len(texts)
+        index += 1
+        yield path, domain, len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic repair manuals.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, default=1000, help="Total pages across all manuals")
+    parser.add_argument("--format", choices=["pdf", "txt", "mixed"], default="txt")
+    parser.add_argument("--min-pages", type=int, default=20)
+    parser.add_argument("--max-pages", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manuals = pages = 0
+    for _, _, n in generate_corpus(args.out_dir, args.pages, args.format, (args.min_pages, args.max_pages), args.seed):
+        manuals += 1
+        pages += n
+    print(f"Wrote {manuals} manuals ({pages} pages) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,54 @@
 """Evaluation Agent: log interactions to SQLite for analysis."""
 
+import atexit
+import json
 import os
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
+from src.services.telemetry import Trace
+
 EVAL_DB_PATH = os.getenv("EVAL_DB_PATH", "eval.db")
+# Rows waiting to be written; when full, new rows are dropped rather than blocking a request
+EVAL_LOG_QUEUE_SIZE = int(os.getenv("EVAL_LOG_QUEUE_SIZE", "1000"))
+EVAL_LOG_BATCH_SIZE = 100
+# Max seconds a row waits in the queue before its batch is written
+EVAL_LOG_FLUSH_INTERVAL = float(os.getenv("EVAL_LOG_FLUSH_INTERVAL", "1.0"))
 _schema_initialized = False
 
+_INSERT_SQL = """
+    INSERT INTO interactions (created_at, prompt, response, domain, image_provided, rating, notes, request_id, total_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Upper bounds (ms) of the latency histogram bins kept in the rollups; the last bin is open-ended
+LATENCY_BINS_MS = (100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 4000, 5000, 7500, 10000, 15000, 20000, 30000, 60000)
+ROLLUP_PERIODS = {"hour": 13, "day": 10}  # period -> length of the created_at prefix that is its bucket
+
+_UPSERT_ROLLUP_SQL = """
+    INSERT INTO interaction_rollups (period, bucket, domain, interactions, images, rated, rating_sum, timed, total_ms_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (period, bucket, domain) DO UPDATE SET
+        interactions = interactions + excluded.interactions,
+        images = images + excluded.images,
+        rated = rated + excluded.rated,
+        rating_sum = rating_sum + excluded.rating_sum,
+        timed = timed + excluded.timed,
+        total_ms_sum = total_ms_sum + excluded.total_ms_sum
+"""
+_UPSERT_LATENCY_SQL = """
+    INSERT INTO interaction_latency_rollups (period, bucket, domain, bin, count) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (period, bucket, domain, bin) DO UPDATE SET count = count + excluded.count
+"""
+_INSERT_STAGE_SQL = """
+    INSERT INTO interaction_stages
+        (request_id, stage, parent, start_ms, duration_ms, provider, tokens_in, tokens_out, cache_hit, error, attrs)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 def _get_connection() -> sqlite3.Connection:
     """Get SQLite connection and ensure schema exists."""
@@ -15,6 +56,8 @@ def _get_connection() -> sqlite3.Connection:
     path = Path(EVAL_DB_PATH)
     conn = sqlite3.connect(str(path))
     if not _schema_initialized:
+        # WAL lets readers (analysis, precompute) run while the logger writes
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS interactions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,11 +70,184 @@ def _get_connection() -> sqlite3.Connection:
                 notes TEXT
             )
         """)
+        # Columns added after the first release: link to interaction_stages, end-to-end time
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(interactions)")}
+        if "request_id" not in columns:
+            conn.execute("ALTER TABLE interactions ADD COLUMN request_id TEXT")
+        if "total_ms" not in columns:
+            conn.execute("ALTER TABLE interactions ADD COLUMN total_ms REAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS interaction_stages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                parent TEXT,
+                start_ms REAL NOT NULL,
+                duration_ms REAL NOT NULL,
+                provider TEXT,
+                tokens_in INTEGER,
+                tokens_out INTEGER,
+                cache_hit INTEGER,
+                error TEXT,
+                attrs TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interaction_stages_request ON interaction_stages (request_id)")
+        # Time-range and per-domain analytics without full table scans
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_created_at ON interactions (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_domain_created_at ON interactions (domain, created_at)")
+        # Hourly/daily aggregates, updated in the same transaction as the rows they count
+        # and kept when old rows are archived (see src/evaluation/retention.py).
+        # Write-locked so only one process creates and backfills them.
+        conn.execute("BEGIN IMMEDIATE")
+        has_rollups = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'interaction_rollups'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS interaction_rollups (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                interactions INTEGER NOT NULL,
+                images INTEGER NOT NULL,
+                rated INTEGER NOT NULL,
+                rating_sum INTEGER NOT NULL,
+                timed INTEGER NOT NULL,
+                total_ms_sum REAL NOT NULL,
+                PRIMARY KEY (period, bucket, domain)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS interaction_latency_rollups (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                bin INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (period, bucket, domain, bin)
+            )
+        """)
+        if not has_rollups:
+            # Databases from before rollups: aggregate the existing history once
+            _add_to_rollups(conn, conn.execute(
+                "SELECT created_at, domain, image_provided, rating, total_ms FROM interactions"
+            ))
         conn.commit()
         _schema_initialized = True
     return conn
 
 
+def _latency_bin(total_ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BINS_MS):
+        if total_ms <= bound:
+            return i
+    return len(LATENCY_BINS_MS)
+
+
+def _add_to_rollups(conn: sqlite3.Connection, rows) -> None:
+    """Add (created_at, domain, image_provided, rating, total_ms) rows to the hourly and daily rollups."""
+    totals: dict[tuple, list] = {}
+    latency: dict[tuple, int] = {}
+    for created_at, domain, image_provided, rating, total_ms in rows:
+        for period, prefix in ROLLUP_PERIODS.items():
+            key = (period, created_at[:prefix], domain)
+            t = totals.setdefault(key, [0, 0, 0, 0, 0, 0.0])
+            t[0] += 1
+            t[1] += image_provided
+            if rating is not None:
+                t[2] += 1
+                t[3] += rating
+            if total_ms is not None:
+                t[4] += 1
+                t[5] += total_ms
+                bin_key = (*key, _latency_bin(total_ms))
+                latency[bin_key] = latency.get(bin_key, 0) + 1
+    conn.executemany(_UPSERT_ROLLUP_SQL, [(*key, *t) for key, t in totals.items()])
+    conn.executemany(_UPSERT_LATENCY_SQL, [(*key, count) for key, count in latency.items()])
+
+
+class _InteractionWriter:
+    """Background thread that writes queued rows in batches over one long-lived connection."""
+
+    def __init__(self, max_queue: int = EVAL_LOG_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="eval-log-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, row: tuple, stages: list[tuple] = ()) -> None:
+        """Queue an interaction row (and its stage rows) without blocking; dropped if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((row, stages))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is written; False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        conn = None
+        while True:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + EVAL_LOG_FLUSH_INTERVAL
+            while True:
+                (markers if isinstance(item, threading.Event) else batch).append(item)
+                remaining = deadline - time.monotonic()
+                if markers or len(batch) >= EVAL_LOG_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    if conn is None:
+                        conn = _get_connection()
+                        # Commits only need to reach the WAL, not be fsynced each time
+                        conn.execute("PRAGMA synchronous=NORMAL")
+                    rows = [row for row, _ in batch]
+                    conn.executemany(_INSERT_SQL, rows)
+                    conn.executemany(_INSERT_STAGE_SQL, [st for _, stages in batch for st in stages])
+                    # created_at, domain, image_provided, rating, total_ms
+                    _add_to_rollups(conn, [(r[0], r[3], r[4], r[5], r[8]) for r in rows])
+                    conn.commit()
+                    self.written += len(batch)
+                except Exception:
+                    # Silent fail - drop the batch and reconnect next time
+                    if conn is not None:
+                        conn.close()
+                    conn = None
+            for marker in markers:
+                marker.set()
+
+
+_writer = _InteractionWriter()
+atexit.register(_writer.flush)
+
+
+def flush_interactions(timeout: float = 5.0) -> bool:
+    """Wait until all logged interactions are written to the eval database."""
+    return _writer.flush(timeout)
+
+
 def log_interaction(
     prompt: str,
     response: str,
@@ -39,26 +255,139 @@ def log_interaction(
     image_provided: bool = False,
     rating: int | None = None,
     notes: str | None = None,
+    trace: Trace | None = None,
 ) -> None:
-    """Log an interaction (prompt, response, domain) to the eval database."""
+    """
+    Log an interaction (prompt, response, domain) to the eval database.
+
+    With a telemetry Trace, its stage spans are stored in interaction_stages,
+    linked by request_id. The row is queued and written by a background thread
+    in batches, so this returns immediately; call flush_interactions() to wait.
+    """
+    stages = []
+    if trace is not None:
+        stages = [
+            (
+                trace.request_id, s["stage"], s["parent"], s["start_ms"], s["duration_ms"], s["provider"],
+                s["tokens_in"], s["tokens_out"], None if s["cache_hit"] is None else int(s["cache_hit"]),
+                s["error"], json.dumps(s["attrs"], default=str) if s["attrs"] else None,
+            )
+            for s in trace.summary()
+        ]
+    _writer.submit(
+        (
+            datetime.utcnow().isoformat(),
+            prompt,
+            response,
+            domain,
+            1 if image_provided else 0,
+            rating,
+            notes,
+            trace.request_id if trace is not None else None,
+            round(trace.elapsed_ms(), 1) if trace is not None else None,
+        ),
+        stages,
+    )
+
+
+def fetch_logged_prompts(text_only: bool = True) -> list[tuple[str, str]]:
+    """Return (prompt, domain) for every successfully answered logged interaction."""
+    flush_interactions()
     try:
         conn = _get_connection()
-        conn.execute(
-            """
-            INSERT INTO interactions (created_at, prompt, response, domain, image_provided, rating, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                datetime.utcnow().isoformat(),
-                prompt,
-                response,
-                domain,
-                1 if image_provided else 0,
-                rating,
-                notes,
-            ),
-        )
-        conn.commit()
+        sql = "SELECT prompt, domain FROM interactions WHERE domain != 'error'"
+        if text_only:
+            sql += " AND image_provided = 0"
+        rows = conn.execute(sql).fetchall()
+        conn.close()
+        return rows
+    except Exception:
+        return []
+
+
+def fetch_interaction_stages(request_id: str) -> list[dict]:
+    """Return the recorded stage spans of one interaction, in start order."""
+    flush_interactions()
+    try:
+        conn = _get_connection()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT * FROM interaction_stages WHERE request_id = ? ORDER BY start_ms", (request_id,)
+        ).fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+    except Exception:
+        return []
+
+
+def latency_percentile(histogram: dict[int, int], q: float) -> float | None:
+    """Upper bound (ms) of the latency bin holding the q-quantile; None without timed rows."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bin_index in sorted(histogram):
+        seen += histogram[bin_index]
+        if seen >= q * total:
+            # The open-ended last bin reports its lower bound
+            return float(LATENCY_BINS_MS[min(bin_index, len(LATENCY_BINS_MS) - 1)])
+    return float(LATENCY_BINS_MS[-1])
+
+
+def fetch_rollups(
+    period: str = "day",
+    since: str | None = None,
+    until: str | None = None,
+    domain: str | None = None,
+) -> list[dict]:
+    """
+    Aggregated interaction metrics per bucket (and domain), from the rollup tables.
+
+    period is "hour" or "day"; since/until are ISO prefixes (e.g. "2025-06-01")
+    compared against bucket start, until exclusive. Each row has bucket, domain,
+    interactions, image_rate, avg_rating, avg_ms and p50_ms/p95_ms/p99_ms
+    (histogram bin upper bounds). The cost depends on the number of buckets,
+    not on how many interactions were logged.
+    """
+    if period not in ROLLUP_PERIODS:
+        raise ValueError(f"period must be one of {', '.join(ROLLUP_PERIODS)}")
+    flush_interactions()
+    where, params = ["period = ?"], [period]
+    if since:
+        where.append("bucket >= ?")
+        params.append(since[: ROLLUP_PERIODS[period]])
+    if until:
+        where.append("bucket < ?")
+        params.append(until[: ROLLUP_PERIODS[period]])
+    if domain:
+        where.append("domain = ?")
+        params.append(domain)
+    try:
+        conn = _get_connection()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            f"SELECT * FROM interaction_rollups WHERE {' AND '.join(where)} ORDER BY bucket, domain", params
+        ).fetchall()
+        histograms: dict[tuple, dict[int, int]] = {}
+        for bucket, dom, bin_index, count in conn.execute(
+            f"SELECT bucket, domain, bin, count FROM interaction_latency_rollups WHERE {' AND '.join(where)}", params
+        ):
+            histograms.setdefault((bucket, dom), {})[bin_index] = count
         conn.close()
     except Exception:
-        pass  # Silent fail - don't break app if eval DB fails
+        return []
+    result = []
+    for r in rows:
+        hist = histograms.get((r["bucket"], r["domain"]), {})
+        result.append({
+            "bucket": r["bucket"],
+            "domain": r["domain"],
+            "interactions": r["interactions"],
+            "image_rate": r["images"] / r["interactions"] if r["interactions"] else 0.0,
+            "avg_rating": r["rating_sum"] / r["rated"] if r["rated"] else None,
+            "avg_ms": r["total_ms_sum"] / r["timed"] if r["timed"] else None,
+            "p50_ms": latency_percentile(hist, 0.5),
+            "p95_ms": latency_percentile(hist, 0.95),
+            "p99_ms": latency_percentile(hist, 0.99),
+        })
+    return result
@@ -0,0 +1,140 @@
+"""Retention job for the evaluation database: archive old interactions, then vacuum.
+
+    python -m src.evaluation.retention --keep-days 90
+    python -m src.evaluation.retention --keep-days 30 --archive-dir /backups/eval --dry-run
+
+Interactions older than --keep-days (with their interaction_stages rows) are
+written to a gzip-compressed JSONL file in --archive-dir, one interaction per
+line with its stages nested, and only then deleted from eval.db. The hourly
+and daily rollups are kept, so fetch_rollups() still covers the archived
+period. Afterwards the WAL is checkpointed and the file vacuumed to return
+the space; if another process holds the database the vacuum is skipped with
+a warning and can be run again later.
+
+Safe to run while the app and API are logging (e.g. from cron): rows are
+deleted by id up to the last one archived, and new rows are never older than
+the cutoff.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.evaluation.eval_agent import _get_connection
+
+EVAL_ARCHIVE_DIR = os.getenv("EVAL_ARCHIVE_DIR", "eval_archive")
+ARCHIVE_BATCH = 1000
+
+
+def _stages_for(conn: sqlite3.Connection, request_ids: list[str]) -> dict[str, list[dict]]:
+    stages: dict[str, list[dict]] = {}
+    if not request_ids:
+        return stages
+    placeholders = ",".join("?" * len(request_ids))
+    for row in conn.execute(
+        f"SELECT * FROM interaction_stages WHERE request_id IN ({placeholders}) ORDER BY start_ms", request_ids
+    ):
+        stages.setdefault(row["request_id"], []).append({k: row[k] for k in row.keys() if k != "id"})
+    return stages
+
+
+def archive_interactions(conn: sqlite3.Connection, cutoff: str, archive_dir: Path) -> tuple[int, int, Path | None]:
+    """Write interactions older than cutoff to a .jsonl.gz archive; returns (count, last id, path)."""
+    conn.row_factory = sqlite3.Row
+    count, last_id = 0, 0
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"interactions-before-{cutoff[:10]}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        while True:
+            rows = conn.execute(
+                "SELECT * FROM interactions WHERE created_at < ? AND id > ? ORDER BY id LIMIT ?",
+                (cutoff, last_id, ARCHIVE_BATCH),
+            ).fetchall()
+            if not rows:
+                break
+            stages = _stages_for(conn, [r["request_id"] for r in rows if r["request_id"]])
+            for r in rows:
+                record = dict(r)
+                record["stages"] = stages.get(r["request_id"], [])
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += len(rows)
+            last_id = rows[-1]["id"]
+    if not count:
+        tmp.unlink()
+        return 0, 0, None
+    # The archive must be complete on disk before any row is deleted
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return count, last_id, path
+
+
+def delete_archived(conn: sqlite3.Connection, cutoff: str, last_id: int) -> None:
+    """Delete the archived interactions and their stages in one transaction."""
+    archived = "SELECT request_id FROM interactions WHERE created_at < ? AND id <= ? AND request_id IS NOT NULL"
+    with conn:
+        conn.execute(f"DELETE FROM interaction_stages WHERE request_id IN ({archived})", (cutoff, last_id))
+        conn.execute("DELETE FROM interactions WHERE created_at < ? AND id <= ?", (cutoff, last_id))
+
+
+def vacuum(conn: sqlite3.Connection) -> bool:
+    """Checkpoint the WAL and rebuild the file; False if another process is using the database."""
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA optimize")
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"Warning: vacuum skipped ({e}); run again when the database is idle", file=sys.stderr)
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old interactions from the eval database and vacuum it.")
+    parser.add_argument("--keep-days", type=float, default=90, help="Keep interactions newer than this in eval.db")
+    parser.add_argument("--archive-dir", default=EVAL_ARCHIVE_DIR, help="Where .jsonl.gz archives are written")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be archived")
+    parser.add_argument("--no-vacuum", action="store_true", help="Archive and delete without vacuuming")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    # Same clock and format as log_interaction (UTC isoformat)
+    cutoff = (datetime.utcnow() - timedelta(days=args.keep_days)).isoformat()
+    conn = _get_connection()
+    try:
+        if args.dry_run:
+            count = conn.execute("SELECT COUNT(*) FROM interactions WHERE created_at < ?", (cutoff,)).fetchone()[0]
+            print(f"{count} interactions older than {cutoff[:19]} would be archived")
+            return 0
+        size_before = Path(conn.execute("PRAGMA database_list").fetchone()[2]).stat().st_size
+        count, last_id, path = archive_interactions(conn, cutoff, Path(args.archive_dir))
+        if not count:
+            print(f"No interactions older than {cutoff[:19]}")
+        else:
+            delete_archived(conn, cutoff, last_id)
+            print(f"Archived {count} interactions to {path}")
+        if not args.no_vacuum and vacuum(conn):
+            size_after = Path(conn.execute("PRAGMA database_list").fetchone()[2]).stat().st_size
+            print(f"Vacuumed: {size_before / 1024 / 1024:.1f} MB -> {size_after / 1024 / 1024:.1f} MB")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
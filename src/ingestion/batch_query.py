@@ -0,0 +1,280 @@
+"""CLI to answer a file of questions in bulk.
+
+    python -m src.ingestion.batch_query questions.jsonl answers.jsonl --concurrency 16
+
+Input is JSONL, one question per line: {"id"?, "prompt" (or "question"/"body"),
+"image"? (path, relative to the input file), "domain"? (skips classification)}.
+Each question goes through vision (if it has an image), classification,
+retrieval, generation and safety validation, and one line is appended to the
+output per answered question: {"id", "prompt", "domain", "answer", "meta", "error"}.
+
+Questions are processed in batches: images and classifications run
+concurrently, retrieval for the whole batch uses a single embedding request,
+and generation (with its safety checks) runs on a pool of --concurrency
+workers that keeps going while the next batch is prepared. All provider
+calls go through the shared outbound scheduler, so throughput is capped by
+the configured rate limits (RATE_LIMIT_<PROVIDER>) rather than by waiting on
+each question in turn.
+
+The output file is the checkpoint: rerunning the same command skips
+questions that already have an answer there (use --retry-errors to redo the
+failed ones). Questions without an "id" are identified by a hash of their
+text and image, so identical questions are answered once.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.agents.coordinator import classify_domain
+from src.agents.specialists.registry import get_specialist_response
+from src.agents.vision_analysis import iter_analyze_images
+from src.services.resources import get_shared_vector_store
+from src.services.telemetry import start_trace
+from src.services.vector_store import search_vector_store_batch
+
+PROMPT_FIELDS = ("prompt", "question", "body")
+IMAGE_PROMPT = "Describe what you see for home repair diagnosis."
+# Same retrieval as interactive requests (see get_specialist_response)
+RETRIEVAL_K = 3
+
+
+def question_id(row: dict, prompt: str) -> str:
+    if row.get("id") or row.get("request_id"):
+        return str(row.get("id") or row.get("request_id"))
+    return hashlib.sha1(f"{prompt}\0{row.get('image') or ''}".encode("utf-8")).hexdigest()[:16]
+
+
+def load_questions(path: Path, field: str | None = None) -> list[dict]:
+    """Questions from a JSONL file, with ids and absolute image paths."""
+    questions = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            fields = (field,) if field else PROMPT_FIELDS
+            prompt = next((str(row[k]).strip() for k in fields if row.get(k)), "")
+            if not prompt and not row.get("image"):
+                print(f"Warning: line {line_no} has no question, skipped", file=sys.stderr)
+                continue
+            qid = question_id(row, prompt)
+            if qid in seen:
+                continue
+            seen.add(qid)
+            image = row.get("image")
+            questions.append({
+                "id": qid,
+                "prompt": prompt or "What do you see in this image? Please suggest repair steps.",
+                "image": str((path.parent / image).resolve()) if image else None,
+                "domain": row.get("domain"),
+            })
+    return questions
+
+
+def load_checkpoint(path: Path, retry_errors: bool) -> set[str]:
+    """Ids already answered in an existing output file."""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line from an interrupted run
+            if not (retry_errors and row.get("error")):
+                done.add(row["id"])
+    return done
+
+
+class AnswerWriter:
+    """Appends result lines; flushed and fsynced every few lines so a crash loses little."""
+
+    def __init__(self, path: Path, sync_every: int = 10):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Start on a fresh line if the previous run was cut off mid-write
+        if path.exists() and path.stat().st_size and not path.read_bytes().endswith(b"\n"):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._sync_every = sync_every
+        self._unsynced = 0
+        self.written = 0
+        self.errors = 0
+
+    def write(self, row: dict) -> None:
+        line = json.dumps(row, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self.written += 1
+            self.errors += bool(row.get("error"))
+            self._unsynced += 1
+            if self._unsynced >= self._sync_every:
+                self._sync()
+
+    def _sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync()
+            self._f.close()
+
+
+def prepare_batch(batch: list[dict], vector_store, classify_pool: ThreadPoolExecutor) -> None:
+    """Fill in image_context, domain and docs (or error) for each question, batch-wide."""
+    with_images = [q for q in batch if q["image"]]
+    if with_images:
+        images = []
+        for q in with_images:
+            try:
+                images.append(Path(q["image"]).read_bytes())
+            except OSError as e:
+                q["error"] = f"Could not read image: {e}"
+                images.append(b"")
+        for index, analysis, error in iter_analyze_images(images, user_query=IMAGE_PROMPT):
+            q = with_images[index]
+            if error is None:
+                q["image_context"] = analysis
+            elif "error" not in q:
+                # The interactive app continues without the image in this case too
+                q["image_warning"] = str(error)
+
+    pending = [q for q in batch if "error" not in q]
+    to_classify = [q for q in pending if not q.get("domain")]
+    contexts = [
+        q["prompt"] + (f"\nImage context: {q['image_context']}" if q.get("image_context") else "") for q in to_classify
+    ]
+    for q, domain in zip(to_classify, classify_pool.map(classify_domain, contexts)):
+        q["domain"] = domain
+
+    if vector_store is not None and pending:
+        try:
+            results = search_vector_store_batch(
+                vector_store,
+                [q["prompt"] for q in pending],
+                k=RETRIEVAL_K,
+                filter_domains=[q["domain"] if q["domain"] != "general" else None for q in pending],
+            )
+        except Exception as e:
+            print(f"Warning: batch retrieval failed ({e}), answering without knowledge base", file=sys.stderr)
+            results = [[] for _ in pending]
+        for q, docs in zip(pending, results):
+            q["docs"] = docs
+
+
+def answer_question(q: dict, use_precomputed: bool) -> dict:
+    row = {"id": q["id"], "prompt": q["prompt"], "domain": q.get("domain"), "answer": None, "meta": None, "error": q.get("error")}
+    if row["error"]:
+        return row
+    with start_trace() as trace:
+        try:
+            answer, meta = get_specialist_response(
+                domain=q["domain"],
+                user_query=q["prompt"],
+                image_context=q.get("image_context"),
+                use_precomputed=use_precomputed,
+                docs=q.get("docs", []),
+            )
+            meta = {**meta, "stages": trace.summary(), "total_ms": round(trace.elapsed_ms(), 1)}
+            if q.get("image_warning"):
+                meta["image_warning"] = q["image_warning"]
+            row.update(answer=answer, meta=meta)
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help="JSONL questions")
+    parser.add_argument("output", help="JSONL answers (appended to; also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions generated at once")
+    parser.add_argument("--batch-size", type=int, default=32, help="Questions per retrieval/classification batch")
+    parser.add_argument("--field", default=None, help=f"Question field (default: first of {', '.join(PROMPT_FIELDS)})")
+    parser.add_argument("--namespace", default="manuals", help="Vector store namespace")
+    parser.add_argument("--no-retrieval", action="store_true", help="Answer without the knowledge base")
+    parser.add_argument("--use-precomputed", action="store_true", help="Serve matching questions from answers.db")
+    parser.add_argument("--retry-errors", action="store_true", help="Redo questions that failed in an earlier run")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    questions = load_questions(Path(args.input), args.field)
+    done = load_checkpoint(Path(args.output), args.retry_errors)
+    todo = [q for q in questions if q["id"] not in done][: args.limit]
+    answered = sum(q["id"] in done for q in questions)
+    print(f"{len(questions)} questions, {answered} already answered, {len(todo)} to go")
+    if not todo:
+        return 0
+
+    vector_store = None
+    if not args.no_retrieval:
+        try:
+            vector_store = get_shared_vector_store(args.namespace)
+        except Exception as e:
+            print(f"Warning: could not connect to vector store ({e}), answering without knowledge base", file=sys.stderr)
+
+    writer = AnswerWriter(Path(args.output))
+    started = time.perf_counter()
+    classify_pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="batch-classify")
+    generate_pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="batch-generate")
+    # Prepare at most one batch ahead of generation
+    in_flight = threading.BoundedSemaphore(args.batch_size * 2)
+
+    def _done(future: Future) -> None:
+        in_flight.release()
+        if future.cancelled():
+            return
+        try:
+            writer.write(future.result())
+        except Exception as e:
+            print(f"Warning: could not write result: {e}", file=sys.stderr)
+        if writer.written % 25 == 0:
+            rate = writer.written / (time.perf_counter() - started)
+            print(f"  {writer.written}/{len(todo)} answered ({rate:.2f}/s, {writer.errors} errors)")
+
+    try:
+        for start in range(0, len(todo), args.batch_size):
+            batch = todo[start:start + args.batch_size]
+            prepare_batch(batch, vector_store, classify_pool)
+            for q in batch:
+                in_flight.acquire()
+                future = generate_pool.submit(answer_question, q, args.use_precomputed)
+                future.add_done_callback(_done)
+        generate_pool.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("Interrupted; finished answers are saved, rerun the same command to resume", file=sys.stderr)
+        generate_pool.shutdown(wait=True, cancel_futures=True)
+        return 130
+    finally:
+        classify_pool.shutdown(wait=False)
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Answered {writer.written} questions in {elapsed:.1f} s ({writer.written / elapsed:.2f}/s), "
+          f"{writer.errors} errors; written to {args.output}")
+    return 1 if writer.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
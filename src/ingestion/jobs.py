@@ -0,0 +1,434 @@
+"""Persistent background ingestion jobs (SQLite queue + worker processes).
+
+    python -m src.ingestion.jobs worker            # run a worker (several may run at once)
+    python -m src.ingestion.jobs status            # recent jobs
+
+submit_job() copies the uploaded files to INGEST_UPLOAD_DIR and queues a job
+in INGEST_JOBS_DB; a worker process claims it and runs the files through
+ingest_uploads (load_document -> chunk_documents -> add_chunks_to_store, vision
+for images), recording progress per file. Jobs can be cancelled between files.
+Queued jobs survive a restart, and a job whose worker stopped heartbeating is
+put back in the queue with its finished files kept (a file that was half
+indexed when the worker died is indexed again).
+
+ensure_worker() starts a worker in the background if none is alive, so the
+app and the API need no separate process to be started by hand; at startup
+they call resume_jobs(), which does so for jobs a previous run left behind. With
+VECTOR_DB=chroma the worker is a thread in the calling process instead:
+Chroma's persistent client is not safe across processes, and the process
+that serves queries must see the new vectors through its own cached client.
+For the same reason only one process should use a Chroma directory (run the
+app through the API with FIXPAL_API_URL rather than both on their own), and
+separate `worker` processes are only for Pinecone.
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+INGEST_JOBS_DB = os.getenv("INGEST_JOBS_DB", "ingest_jobs.db")
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "./.uploads")
+# Seconds without a heartbeat before a worker (and its running job) is presumed dead
+INGEST_WORKER_STALE = float(os.getenv("INGEST_WORKER_STALE", "60"))
+HEARTBEAT_INTERVAL = 5.0
+
+ACTIVE_STATUSES = ("queued", "running")
+_schema_initialized = False
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Get SQLite connection and ensure schema exists."""
+    global _schema_initialized
+    conn = sqlite3.connect(INGEST_JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if not _schema_initialized:
+        # WAL: the UI polls while workers write
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                status TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                source_type TEXT NOT NULL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                heartbeat REAL,
+                error TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_job_files (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (job_id, position)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                host TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                heartbeat REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status, created_at)")
+        _schema_initialized = True
+    return conn
+
+
+def submit_job(files: list[tuple[str, bytes]], namespace: str = "manuals", source_type: str = "user") -> str:
+    """Store the (name, data) files and queue a job for them; returns the job id."""
+    job_id = uuid.uuid4().hex
+    job_dir = Path(INGEST_UPLOAD_DIR) / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for position, (name, data) in enumerate(files):
+        path = job_dir / f"{position:04d}_{Path(name).name}"
+        path.write_bytes(data)
+        rows.append((job_id, position, name, str(path), "pending"))
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT INTO ingest_jobs (id, created_at, status, namespace, source_type) VALUES (?, ?, 'queued', ?, ?)",
+            (job_id, _now(), namespace, source_type),
+        )
+        conn.executemany("INSERT INTO ingest_job_files (job_id, position, name, path, status) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return job_id
+
+
+def _job_dict(conn: sqlite3.Connection, row: sqlite3.Row) -> dict:
+    files = [
+        dict(f) for f in conn.execute(
+            "SELECT position, name, status, chunks, error FROM ingest_job_files WHERE job_id = ? ORDER BY position",
+            (row["id"],),
+        )
+    ]
+    job = {k: row[k] for k in ("id", "created_at", "started_at", "finished_at", "status", "namespace", "error")}
+    job["cancel_requested"] = bool(row["cancel_requested"])
+    job["files"] = files
+    job["total_files"] = len(files)
+    job["done_files"] = sum(1 for f in files if f["status"] in ("done", "failed", "skipped"))
+    job["chunks"] = sum(f["chunks"] for f in files)
+    return job
+
+
+def get_job(job_id: str) -> dict | None:
+    """Job status with per-file progress, or None if unknown."""
+    conn = _get_connection()
+    try:
+        row = conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_dict(conn, row) if row else None
+    finally:
+        conn.close()
+
+
+def list_jobs(job_ids: list[str] | None = None, limit: int = 20) -> list[dict]:
+    """Most recent jobs first (only job_ids if given)."""
+    conn = _get_connection()
+    try:
+        if job_ids is not None:
+            if not job_ids:
+                return []
+            marks = ",".join("?" * len(job_ids))
+            rows = conn.execute(
+                f"SELECT * FROM ingest_jobs WHERE id IN ({marks}) ORDER BY created_at DESC LIMIT ?", (*job_ids, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM ingest_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_job_dict(conn, row) for row in rows]
+    finally:
+        conn.close()
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel a queued job now, or ask its worker to stop after the current file."""
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            "UPDATE ingest_jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+            "WHERE id = ? AND status = 'queued'",
+            (_now(), job_id),
+        )
+        queued = cur.rowcount > 0
+        if not queued:
+            cur = conn.execute("UPDATE ingest_jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        conn.execute("COMMIT")
+        if queued:
+            shutil.rmtree(Path(INGEST_UPLOAD_DIR) / job_id, ignore_errors=True)
+        return cur.rowcount > 0
+    finally:
+        conn.close()
+
+
+def _requeue_stale(conn: sqlite3.Connection) -> None:
+    """Put running jobs whose worker stopped heartbeating back in the queue."""
+    cutoff = time.time() - INGEST_WORKER_STALE
+    conn.execute(
+        "UPDATE ingest_jobs SET status = 'queued', worker_id = NULL WHERE status = 'running' AND heartbeat < ?",
+        (cutoff,),
+    )
+    conn.execute("DELETE FROM ingest_workers WHERE heartbeat < ?", (cutoff,))
+
+
+def claim_next_job(worker_id: str) -> str | None:
+    """Atomically take the oldest queued job; returns its id."""
+    conn = _get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _requeue_stale(conn)
+        row = conn.execute("SELECT id FROM ingest_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+        if row:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'running', worker_id = ?, heartbeat = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker_id, time.time(), _now(), row["id"]),
+            )
+        conn.execute("COMMIT")
+        return row["id"] if row else None
+    finally:
+        conn.close()
+
+
+def run_job(job_id: str) -> None:
+    """Ingest a claimed job's pending files, recording progress after each file."""
+    from src.ingestion.uploads import ingest_uploads
+    from src.services.resources import get_shared_vector_store
+
+    conn = _get_connection()
+    try:
+        job = conn.execute("SELECT namespace, source_type FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        pending = conn.execute(
+            "SELECT position, name, path FROM ingest_job_files WHERE job_id = ? AND status = 'pending' ORDER BY position",
+            (job_id,),
+        ).fetchall()
+
+        def finish(status: str, error: str | None = None) -> None:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, _now(), job_id),
+            )
+            if status != "failed":
+                shutil.rmtree(Path(INGEST_UPLOAD_DIR) / job_id, ignore_errors=True)
+
+        try:
+            vs = get_shared_vector_store(job["namespace"])
+        except Exception as e:
+            finish("failed", f"Could not connect to vector store: {e}")
+            return
+
+        positions = {row["name"]: [] for row in pending}
+        for row in pending:
+            positions[row["name"]].append(row["position"])
+        files = []
+        for row in pending:
+            try:
+                files.append((row["name"], Path(row["path"]).read_bytes()))
+            except OSError as e:
+                positions[row["name"]].remove(row["position"])
+                conn.execute(
+                    "UPDATE ingest_job_files SET status = 'failed', error = ? WHERE job_id = ? AND position = ?",
+                    (f"Upload missing: {e}", job_id, row["position"]),
+                )
+
+        results = ingest_uploads(vs, files, source_type=job["source_type"])
+        try:
+            for name, chunks, error in results:
+                position = positions[name].pop(0)
+                conn.execute(
+                    "UPDATE ingest_job_files SET status = ?, chunks = ?, error = ? WHERE job_id = ? AND position = ?",
+                    ("failed" if error else "done", chunks, error, job_id, position),
+                )
+                conn.execute("UPDATE ingest_jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+                if conn.execute("SELECT cancel_requested FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()[0]:
+                    conn.execute(
+                        "UPDATE ingest_job_files SET status = 'skipped' WHERE job_id = ? AND status = 'pending'", (job_id,)
+                    )
+                    finish("cancelled")
+                    return
+        except Exception as e:
+            finish("failed", str(e))
+            return
+        finally:
+            results.close()
+        finish("done")
+    finally:
+        conn.close()
+
+
+def _heartbeat(worker_id: str, current: dict, stop: threading.Event) -> None:
+    """Keep the worker (and its running job) marked alive while long files are processed."""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            conn = _get_connection()
+            try:
+                conn.execute("UPDATE ingest_workers SET heartbeat = ? WHERE id = ?", (time.time(), worker_id))
+                if current.get("job_id"):
+                    conn.execute("UPDATE ingest_jobs SET heartbeat = ? WHERE id = ?", (time.time(), current["job_id"]))
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def run_worker(poll_interval: float = 1.0, once: bool = False) -> None:
+    """Claim and run jobs until stopped (or until the queue is empty with once=True)."""
+    worker_id = uuid.uuid4().hex[:12]
+    conn = _get_connection()
+    try:
+        conn.execute(
+            "INSERT INTO ingest_workers (id, pid, host, started_at, heartbeat) VALUES (?, ?, ?, ?, ?)",
+            (worker_id, os.getpid(), socket.gethostname(), _now(), time.time()),
+        )
+    finally:
+        conn.close()
+    current: dict = {}
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(worker_id, current, stop), daemon=True).start()
+    try:
+        while True:
+            job_id = claim_next_job(worker_id)
+            if job_id is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            current["job_id"] = job_id
+            print(f"Ingest worker {worker_id}: running job {job_id}")
+            try:
+                run_job(job_id)
+            except Exception as e:
+                print(f"Warning: ingest job {job_id} failed: {e}", file=sys.stderr)
+            current["job_id"] = None
+    finally:
+        stop.set()
+        conn = _get_connection()
+        try:
+            conn.execute("DELETE FROM ingest_workers WHERE id = ?", (worker_id,))
+        finally:
+            conn.close()
+
+
+_spawn_lock = threading.Lock()
+_local_worker: threading.Thread | None = None
+
+
+def _in_process() -> bool:
+    """Chroma's persistent client must not be shared across processes, so its jobs run in this one."""
+    return os.getenv("VECTOR_DB", "chroma").lower() == "chroma"
+
+
+def ensure_worker() -> None:
+    """Start a background worker (a thread with Chroma, a process on this host otherwise) unless one is alive."""
+    global _local_worker
+    with _spawn_lock:
+        if _in_process():
+            if _local_worker is None or not _local_worker.is_alive():
+                _local_worker = threading.Thread(target=run_worker, name="ingest-worker", daemon=True)
+                _local_worker.start()
+            return
+        conn = _get_connection()
+        try:
+            alive = conn.execute(
+                "SELECT COUNT(*) FROM ingest_workers WHERE host = ? AND heartbeat >= ?",
+                (socket.gethostname(), time.time() - INGEST_WORKER_STALE),
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        if alive:
+            return
+        subprocess.Popen(
+            [sys.executable, "-m", "src.ingestion.jobs", "worker"],
+            cwd=_project_root,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        # Registering takes a moment; don't start a second one on the next poll
+        time.sleep(0.5)
+
+
+_resumed = False
+
+
+def resume_jobs() -> None:
+    """Start a worker if jobs are left queued or running from before a restart (checked once per process)."""
+    global _resumed
+    if _resumed:
+        return
+    _resumed = True
+    try:
+        conn = _get_connection()
+        try:
+            active = conn.execute(
+                "SELECT 1 FROM ingest_jobs WHERE status IN (?, ?) LIMIT 1", ACTIVE_STATUSES
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not check for unfinished ingest jobs: {e}", file=sys.stderr)
+        return
+    if active:
+        # Jobs marked running are requeued by the worker once their heartbeat is stale
+        ensure_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background ingestion jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Run an ingestion worker")
+    worker.add_argument("--poll", type=float, default=1.0, help="Seconds between queue checks when idle")
+    worker.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    sub.add_parser("status", help="Show recent jobs")
+    cancel = sub.add_parser("cancel", help="Cancel a job")
+    cancel.add_argument("job_id")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        if _in_process():
+            print("Warning: VECTOR_DB=chroma; this worker writes to the Chroma directory from a separate process. "
+                  "Stop the app and API first, or let them run jobs in-process.", file=sys.stderr)
+        run_worker(args.poll, args.once)
+    elif args.command == "status":
+        for job in list_jobs():
+            print(f"{job['id']}  {job['status']:<10} {job['done_files']}/{job['total_files']} files  "
+                  f"{job['chunks']} chunks  {job['created_at']}" + (f"  {job['error']}" if job["error"] else ""))
+    elif args.command == "cancel":
+        print("Cancelled" if cancel_job(args.job_id) else "No active job with that id")
+
+
+if __name__ == "__main__":
+    main()
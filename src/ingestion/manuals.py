@@ -9,8 +9,9 @@ _project_root = Path(__file__).resolve().parent.parent.parent
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
-from src.services.chunker import chunk_documents
-from src.services.document_loader import load_document
+from src.services.chunker import chunk_batch
+from src.services.document_loader import ChunkBatch, load_document_batch
+from src.services.scheduler import call_priority
 from src.services.vector_store import add_chunks_to_store, get_vector_store
 
 
@@ -36,17 +37,27 @@ def main():
         sys.exit(1)
 
     vs, ns = get_vector_store(namespace=args.namespace)
-    all_chunks = []
+    all_chunks = ChunkBatch()
     for p in files:
         try:
-            docs = list(load_document(p, source_type="manual"))
-            all_chunks.extend(chunk_documents(docs))
+            all_chunks.extend(chunk_batch(load_document_batch(p, source_type="manual")))
         except Exception as e:
             print(f"Warning: Skipped {p}: {e}", file=sys.stderr)
 
     if all_chunks:
-        add_chunks_to_store(vs, all_chunks)
+        # Bulk ingest yields to interactive traffic on the shared provider quota
+        with call_priority("ingest"):
+            add_chunks_to_store(vs, all_chunks)
         print(f"Indexed {len(all_chunks)} chunks from {len(files)} file(s) to namespace '{ns}'.")
+        # This process exits before the background refresh would run
+        from src.ingestion.precompute_answers import refresh_stale_answers  # registers the answer generator
+        from src.services.answer_store import PRECOMPUTE_ON_KB_CHANGE, cancel_scheduled_refresh
+
+        cancel_scheduled_refresh()
+        if PRECOMPUTE_ON_KB_CHANGE:
+            refreshed = refresh_stale_answers(args.namespace, vector_store=vs)
+            if refreshed:
+                print(f"Refreshed {refreshed} precomputed answer(s).")
     else:
         print("No content extracted.", file=sys.stderr)
         sys.exit(1)
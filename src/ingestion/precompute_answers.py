@@ -0,0 +1,116 @@
+"""CLI job: pre-generate answers for the most frequent logged questions.
+
+Clusters prompts from the eval database's interactions table per domain, picks
+the top-N clusters and generates an answer for each (retrieval and safety
+validation included) against the current knowledge base. Answers already
+generated for the current knowledge base version are kept unless --force is set.
+
+    python -m src.ingestion.precompute_answers --top 20
+    python -m src.ingestion.precompute_answers --refresh
+
+Stored answers go stale whenever sources are ingested or removed. A process
+that answers questions regenerates them in the background after changing the
+knowledge base (see src/services/answer_store.py); --refresh does it now.
+"""
+
+import argparse
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.agents.specialists.registry import get_specialist_response
+from src.evaluation.eval_agent import fetch_logged_prompts
+from src.services.answer_store import (
+    jaccard,
+    list_answers,
+    question_key,
+    question_tokens,
+    refresh_stale_answers,
+    save_answer,
+)
+from src.services.vector_store import get_vector_store, kb_version
+
+
+def cluster_prompts(prompts: list[str], threshold: float = 0.6) -> list[list[str]]:
+    """Greedy single-pass clustering by token-set Jaccard similarity; largest clusters first."""
+    counts = Counter(p.strip() for p in prompts if p.strip())
+    clusters: list[dict] = []
+    # Most frequent phrasings seed clusters first so they become representatives
+    for prompt, count in counts.most_common():
+        tokens = question_tokens(prompt)
+        if not tokens:
+            continue
+        for cluster in clusters:
+            if jaccard(tokens, cluster["tokens"]) >= threshold:
+                cluster["members"].extend([prompt] * count)
+                break
+        else:
+            clusters.append({"tokens": tokens, "members": [prompt] * count})
+    clusters.sort(key=lambda c: len(c["members"]), reverse=True)
+    return [c["members"] for c in clusters]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers for the most frequent questions.")
+    parser.add_argument("--top", type=int, default=20, help="Clusters to precompute per domain")
+    parser.add_argument("--min-count", type=int, default=3, help="Minimum cluster size worth precomputing")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Jaccard similarity for clustering")
+    parser.add_argument("--namespace", default="manuals", help="Vector store namespace")
+    parser.add_argument("--force", action="store_true", help="Regenerate answers even if still current")
+    parser.add_argument("--refresh", action="store_true", help="Only regenerate stored answers that are stale")
+    args = parser.parse_args()
+
+    if args.refresh:
+        refreshed = refresh_stale_answers(args.namespace)
+        print(f"Refreshed {refreshed} answer(s) (knowledge base version '{kb_version()}').")
+        return
+
+    by_domain: dict[str, list[str]] = {}
+    for prompt, domain in fetch_logged_prompts():
+        by_domain.setdefault(domain, []).append(prompt)
+    if not by_domain:
+        print("No logged interactions found.", file=sys.stderr)
+        sys.exit(1)
+
+    vs, _ = get_vector_store(namespace=args.namespace)
+    version = kb_version()
+    current = {
+        (row["domain"], row["question"])
+        for row in list_answers()
+        if row["kb_version"] == version
+    }
+
+    generated = skipped = 0
+    for domain, prompts in sorted(by_domain.items()):
+        for members in cluster_prompts(prompts, threshold=args.threshold)[: args.top]:
+            if len(members) < args.min_count:
+                break
+            question = Counter(members).most_common(1)[0][0]
+            if (domain, question) in current and not args.force:
+                skipped += 1
+                continue
+            try:
+                answer, meta = get_specialist_response(
+                    domain=domain,
+                    user_query=question,
+                    vector_store=vs,
+                    use_precomputed=False,
+                )
+            except Exception as e:
+                print(f"Warning: Skipped '{question[:60]}': {e}", file=sys.stderr)
+                continue
+            variants = sorted({m for m in members if question_key(m)})
+            save_answer(domain, question, variants, answer, meta, version, cluster_size=len(members))
+            generated += 1
+            print(f"[{domain}] {len(members):>4}x  {question[:70]}")
+
+    print(f"Precomputed {generated} answer(s), {skipped} already current (knowledge base version '{version}').")
+
+
+if __name__ == "__main__":
+    main()
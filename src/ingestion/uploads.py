@@ -0,0 +1,71 @@
+"""Ingest uploaded files (documents and photos) into a vector store.
+
+Shared by the Streamlit sidebar upload and the API's ingest endpoint.
+"""
+
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+from langchain_core.vectorstores import VectorStore
+
+from src.services.chunker import chunk_batch
+from src.services.document_loader import ChunkBatch, load_document_batch
+from src.services.scheduler import call_priority
+from src.services.vector_store import add_chunks_to_store
+
+DOCUMENT_EXTENSIONS = (".pdf", ".txt", ".text")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+IMAGE_INGEST_PROMPT = (
+    "Describe this image for home repair context. Extract any visible text, labels, or repair-relevant details."
+)
+
+
+def ingest_uploads(
+    vector_store: VectorStore,
+    files: list[tuple[str, bytes]],
+    source_type: str = "user",
+) -> Iterator[tuple[str, int, str | None]]:
+    """
+    Index (name, data) uploads; yields (name, chunks indexed, error) per file.
+
+    Documents are indexed in upload order; images are then analyzed concurrently
+    and each is indexed as soon as its description arrives. Runs at ingest
+    priority so it yields the provider quota to interactive requests.
+    """
+    from src.agents.vision_analysis import iter_analyze_images
+
+    with call_priority("ingest"):
+        images = []
+        for name, data in files:
+            ext = Path(name).suffix.lower()
+            if ext in IMAGE_EXTENSIONS:
+                images.append((name, data))
+                continue
+            if ext not in DOCUMENT_EXTENSIONS:
+                yield name, 0, f"Unsupported file type: {ext or name}"
+                continue
+            path = Path(tempfile.gettempdir()) / f"{uuid.uuid4().hex}_{Path(name).name}"
+            try:
+                path.write_bytes(data)
+                chunks = chunk_batch(load_document_batch(path, source_type=source_type))
+                if chunks:
+                    add_chunks_to_store(vector_store, chunks)
+                yield name, len(chunks), None
+            except Exception as e:
+                yield name, 0, str(e)
+            finally:
+                path.unlink(missing_ok=True)
+
+        for index, desc, error in iter_analyze_images([data for _, data in images], user_query=IMAGE_INGEST_PROMPT):
+            name = images[index][0]
+            if error is not None or not desc:
+                yield name, 0, str(error) if error else "No description returned"
+                continue
+            description = ChunkBatch()
+            description.append(desc, name, source_type)
+            chunks = chunk_batch(description)
+            add_chunks_to_store(vector_store, chunks)
+            yield name, len(chunks), None
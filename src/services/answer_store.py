@@ -0,0 +1,261 @@
+"""Precomputed answers for frequent questions, looked up before generation.
+
+Stored answers go stale when the knowledge base changes. bump_kb_version()
+calls schedule_refresh(), which regenerates them in the background with the
+generator the agents register through set_answer_generator(), once the
+knowledge base has been quiet for PRECOMPUTE_REFRESH_DELAY seconds.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", "answers.db")
+# Minimum token-set Jaccard similarity for a lookup to count as the same question
+LOOKUP_SIMILARITY = float(os.getenv("ANSWER_STORE_SIMILARITY", "0.85"))
+# Questions with fewer content words than this are too vague to match a stored answer
+LOOKUP_MIN_TOKENS = int(os.getenv("ANSWER_STORE_MIN_TOKENS", "3"))
+
+PRECOMPUTE_ON_KB_CHANGE = os.getenv("PRECOMPUTE_ON_KB_CHANGE", "1").lower() not in ("0", "false", "no")
+# Ingest bumps the version once per batch, so wait for the knowledge base to settle
+PRECOMPUTE_REFRESH_DELAY = float(os.getenv("PRECOMPUTE_REFRESH_DELAY", "30"))
+
+_STOPWORDS = frozenset(
+    "a an the my our your is are was were be been it its this that these those i we you "
+    "to of in on at for with and or but how do does did can could should would what why "
+    "when where which there here me us please help".split()
+)
+
+_index: dict[str, list[dict]] | None = None
+_index_mtime: float | None = None
+_index_lock = threading.Lock()
+
+# (domain, question, vector_store) -> (answer, meta); registered by src.agents.specialists.registry
+_answer_generator: Callable[[str, str, Any], tuple[str, dict]] | None = None
+_refresh_lock = threading.Lock()
+_timer: threading.Timer | None = None
+_timer_lock = threading.Lock()
+
+
+def question_tokens(text: str) -> frozenset[str]:
+    """Normalized content words of a question."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return frozenset(w for w in words if w not in _STOPWORDS)
+
+
+def question_key(text: str) -> str:
+    """Order-insensitive normalized key for a question."""
+    return " ".join(sorted(question_tokens(text)))
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _get_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(ANSWER_STORE_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS precomputed_answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            domain TEXT NOT NULL,
+            question TEXT NOT NULL,
+            question_keys TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            kb_version TEXT NOT NULL,
+            cluster_size INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            UNIQUE (domain, question)
+        )
+    """)
+    return conn
+
+
+def save_answer(
+    domain: str,
+    question: str,
+    variants: list[str],
+    answer: str,
+    meta: dict,
+    kb_version: str,
+    cluster_size: int,
+) -> None:
+    """Insert or replace the precomputed answer for a question cluster."""
+    keys = sorted({question_key(q) for q in [question, *variants]} - {""})
+    conn = _get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO precomputed_answers (domain, question, question_keys, answer, meta, kb_version, cluster_size, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (domain, question) DO UPDATE SET
+                question_keys = excluded.question_keys,
+                answer = excluded.answer,
+                meta = excluded.meta,
+                kb_version = excluded.kb_version,
+                cluster_size = excluded.cluster_size,
+                created_at = excluded.created_at
+            """,
+            (domain, question, json.dumps(keys), answer, json.dumps(meta), kb_version, cluster_size,
+             datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def refresh_answer(domain: str, question: str, answer: str, meta: dict, kb_version: str) -> None:
+    """Replace the answer of a stored question, keeping its variants and cluster size."""
+    conn = _get_connection()
+    try:
+        conn.execute(
+            "UPDATE precomputed_answers SET answer = ?, meta = ?, kb_version = ?, created_at = ? "
+            "WHERE domain = ? AND question = ?",
+            (answer, json.dumps(meta), kb_version, datetime.utcnow().isoformat(), domain, question),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def list_answers(domain: str | None = None) -> list[dict]:
+    """All stored answers (optionally for one domain)."""
+    if not Path(ANSWER_STORE_PATH).exists():
+        return []
+    conn = _get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = "SELECT * FROM precomputed_answers"
+        rows = conn.execute(sql + " WHERE domain = ?", (domain,)) if domain else conn.execute(sql)
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def _load_index() -> dict[str, list[dict]]:
+    """Load (and reload when the store file changes) the in-memory lookup index."""
+    global _index, _index_mtime
+    try:
+        mtime = os.path.getmtime(ANSWER_STORE_PATH)
+    except OSError:
+        return {}
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            index: dict[str, list[dict]] = {}
+            for row in list_answers():
+                keys = json.loads(row["question_keys"])
+                entry = {
+                    "answer": row["answer"],
+                    "meta": json.loads(row["meta"]),
+                    "kb_version": row["kb_version"],
+                    "keys": set(keys),
+                    "token_sets": [frozenset(k.split()) for k in keys],
+                }
+                index.setdefault(row["domain"], []).append(entry)
+            _index, _index_mtime = index, mtime
+        return _index
+
+
+def lookup_answer(domain: str, question: str, kb_version: str) -> tuple[str, dict] | None:
+    """
+    Return a precomputed (answer, meta) for this question, or None.
+
+    Entries generated against a different knowledge base version are ignored, and
+    so are questions with fewer than LOOKUP_MIN_TOKENS content words.
+    """
+    key = question_key(question)
+    tokens = frozenset(key.split())
+    if len(tokens) < LOOKUP_MIN_TOKENS:
+        return None
+    entries = _load_index().get(domain)
+    if not entries:
+        return None
+    best, best_score = None, 0.0
+    for entry in entries:
+        if entry["kb_version"] != kb_version:
+            continue
+        if key in entry["keys"]:
+            return entry["answer"], dict(entry["meta"])
+        score = max((jaccard(tokens, t) for t in entry["token_sets"]), default=0.0)
+        if score > best_score:
+            best, best_score = entry, score
+    if best is not None and best_score >= LOOKUP_SIMILARITY:
+        return best["answer"], dict(best["meta"])
+    return None
+
+
+def set_answer_generator(generate: Callable[[str, str, Any], tuple[str, dict]]) -> None:
+    """Register how stored answers are regenerated: generate(domain, question, vector_store)."""
+    global _answer_generator
+    _answer_generator = generate
+
+
+def refresh_stale_answers(namespace: str = "manuals", vector_store=None) -> int:
+    """Regenerate stored answers made against an older knowledge base version; returns how many."""
+    from src.services.scheduler import call_priority
+    from src.services.vector_store import kb_version
+
+    generate = _answer_generator
+    if generate is None:
+        return 0
+    with _refresh_lock:
+        version = kb_version()
+        stale = [row for row in list_answers() if row["kb_version"] != version]
+        if not stale:
+            return 0
+        if vector_store is None:
+            # Shared store: Chroma must not be opened twice in one process
+            from src.services.resources import get_shared_vector_store
+
+            vector_store = get_shared_vector_store(namespace)
+        refreshed = 0
+        # Background work, so it yields to interactive traffic on the provider quota
+        with call_priority("ingest"):
+            for row in stale:
+                try:
+                    answer, meta = generate(row["domain"], row["question"], vector_store)
+                except Exception as e:
+                    print(f"Warning: Could not refresh '{row['question'][:60]}': {e}", file=sys.stderr)
+                    continue
+                refresh_answer(row["domain"], row["question"], answer, meta, version)
+                refreshed += 1
+        return refreshed
+
+
+def _refresh_in_background() -> None:
+    try:
+        refreshed = refresh_stale_answers()
+        if refreshed:
+            print(f"Refreshed {refreshed} precomputed answer(s) after a knowledge base change.")
+    except Exception as e:
+        print(f"Warning: Precomputed answer refresh failed: {e}", file=sys.stderr)
+
+
+def schedule_refresh() -> None:
+    """Regenerate stale stored answers in the background once the knowledge base stops changing."""
+    global _timer
+    if not PRECOMPUTE_ON_KB_CHANGE or _answer_generator is None or not list_answers():
+        return
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(PRECOMPUTE_REFRESH_DELAY, _refresh_in_background)
+        _timer.daemon = True
+        _timer.start()
+
+
+def cancel_scheduled_refresh() -> None:
+    """Drop a pending background refresh (for callers that refresh synchronously)."""
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
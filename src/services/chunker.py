@@ -1,8 +1,8 @@
 """Semantic chunking with overlap."""
 
-import tiktoken
+from functools import lru_cache
 
-from src.services.document_loader import DocumentChunk
+from src.services.document_loader import ChunkBatch, DocumentChunk
 
 
 # ~4 chars per token for English; 512 tokens ≈ 2000 chars
@@ -10,41 +10,48 @@ CHUNK_SIZE = 512
 OVERLAP = 50
 
 
+@lru_cache(maxsize=1)
 def _get_encoding():
+    """Return the tiktoken encoding (imported and loaded once per process, on first use)."""
+    import tiktoken
+
     try:
         return tiktoken.get_encoding("cl100k_base")
     except Exception:
         return tiktoken.get_encoding("gpt2")
 
 
-def chunk_document(doc: DocumentChunk, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> list[DocumentChunk]:
-    """Split document content into overlapping chunks by token count."""
+def _split_text(text: str, chunk_size: int, overlap: int) -> list[str]:
+    """Overlapping windows of at most chunk_size tokens, decoded back to text."""
     enc = _get_encoding()
-    tokens = enc.encode(doc.content)
-    chunks: list[DocumentChunk] = []
+    tokens = enc.encode(text)
+    pieces: list[str] = []
 
     start = 0
     while start < len(tokens):
         end = min(start + chunk_size, len(tokens))
-        chunk_tokens = tokens[start:end]
-        text = enc.decode(chunk_tokens)
-
-        chunks.append(
-            DocumentChunk(
-                content=text,
-                source=doc.source,
-                source_type=doc.source_type,
-                domain=doc.domain,
-                page=doc.page,
-                section=doc.section,
-            )
-        )
+        pieces.append(enc.decode(tokens[start:end]))
 
         if end >= len(tokens):
             break
         start = end - overlap
 
-    return chunks
+    return pieces
+
+
+def chunk_document(doc: DocumentChunk, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> list[DocumentChunk]:
+    """Split document content into overlapping chunks by token count."""
+    return [
+        DocumentChunk(
+            content=text,
+            source=doc.source,
+            source_type=doc.source_type,
+            domain=doc.domain,
+            page=doc.page,
+            section=doc.section,
+        )
+        for text in _split_text(doc.content, chunk_size, overlap)
+    ]
 
 
 def chunk_documents(docs: list[DocumentChunk], chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> list[DocumentChunk]:
@@ -53,3 +60,36 @@ def chunk_documents(docs: list[DocumentChunk], chunk_size: int = CHUNK_SIZE, ove
     for doc in docs:
         result.extend(chunk_document(doc, chunk_size=chunk_size, overlap=overlap))
     return result
+
+
+def chunk_batch(batch: ChunkBatch, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> ChunkBatch:
+    """Chunk every document in a batch; same chunks as chunk_documents, without per-chunk objects."""
+    result = ChunkBatch()
+    for content, source, source_type, domain, page, section in zip(
+        batch.texts, batch.sources, batch.source_types, batch.domains, batch.pages, batch.sections
+    ):
+        for text in _split_text(content, chunk_size, overlap):
+            # Sources are already interned in the input batch
+            result.texts.append(text)
+            result.sources.append(source)
+            result.source_types.append(source_type)
+            result.domains.append(domain)
+            result.pages.append(page)
+            result.sections.append(section)
+    return result
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text with the cached encoding."""
+    if not text:
+        return 0
+    return len(_get_encoding().encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate text to at most max_tokens tokens (marked with a trailing ellipsis)."""
+    enc = _get_encoding()
+    tokens = enc.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens]).rstrip() + " ..."
@@ -0,0 +1,150 @@
+"""Token-budgeted prompt context assembly for RAG and specialist prompts."""
+
+import os
+from dataclasses import dataclass, field
+
+from langchain_core.documents import Document
+
+from src.services.chunker import OVERLAP, _get_encoding, count_tokens, truncate_to_tokens
+
+
+# Total input budget (context + question) per request, in tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Upper bound for the vision description within that budget
+IMAGE_CONTEXT_MAX_TOKENS = int(os.getenv("IMAGE_CONTEXT_MAX_TOKENS", "600"))
+# Upper bound for conversation history (summary + recent turns)
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "900"))
+# Don't keep a truncated document if less than this many tokens of it would fit
+MIN_DOC_TOKENS = 64
+
+DOC_TEMPLATE = "[Source: {source}]\n{content}"
+
+
+@dataclass
+class AssembledContext:
+    """Result of assembling a prompt context within a token budget."""
+
+    user_query: str
+    rag_context: str = ""
+    image_context: str | None = None
+    history: str | None = None
+    docs_used: int = 0
+    tokens: dict = field(default_factory=dict)
+
+
+def _overlap_chars(previous: str, current: str, max_chars: int, min_chars: int = 40) -> int:
+    """Return how many leading chars of current repeat the tail of previous."""
+    tail = previous[-max_chars:]
+    for start in range(len(tail) - min_chars + 1):
+        candidate = tail[start:].rstrip()
+        if len(candidate) >= min_chars and current.startswith(candidate):
+            return len(candidate)
+    return 0
+
+
+def _dedupe_docs(docs: list[Document]) -> tuple[list[tuple[Document, list[int]]], int]:
+    """
+    Drop repeated chunks and strip text shared with an already kept chunk.
+
+    Neighbouring chunks of the same source overlap by up to OVERLAP tokens
+    (see chunker.py); the shared span is only sent once.
+    Returns ([(doc, tokens), ...], overlap_tokens_removed).
+    """
+    enc = _get_encoding()
+    kept: list[tuple[Document, str]] = []
+    seen: set[str] = set()
+    removed = 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or text in seen:
+            continue
+        seen.add(text)
+        source = doc.metadata.get("source")
+        for prev_doc, prev_text in kept:
+            if prev_doc.metadata.get("source") != source:
+                continue
+            cut = _overlap_chars(prev_text, text, max_chars=OVERLAP * 12)
+            if cut:
+                removed += count_tokens(text) - count_tokens(text[cut:].lstrip())
+                text = text[cut:].lstrip()
+                break
+        if text:
+            kept.append((doc, text))
+    return [(doc, enc.encode(text)) for doc, text in kept], removed
+
+
+def assemble_context(
+    user_query: str,
+    docs: list[Document] | None = None,
+    image_context: str | None = None,
+    budget: int | None = None,
+    doc_template: str = DOC_TEMPLATE,
+    history: str | None = None,
+) -> AssembledContext:
+    """
+    Fit the question, conversation history, vision description and retrieved docs into a token budget.
+
+    The question is always kept in full. History is capped at HISTORY_MAX_TOKENS and
+    the image description at IMAGE_CONTEXT_MAX_TOKENS, then docs are added in rank order until the budget
+    is spent, so the lowest-ranked material is trimmed first.
+
+    Returns:
+        AssembledContext; .tokens holds per-section token counts for response meta
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    enc = _get_encoding()
+
+    question_tokens = count_tokens(user_query)
+    remaining = max(budget - question_tokens, 0)
+
+    history_text = None
+    history_tokens = 0
+    if history and remaining > 0:
+        # Keep the most recent end of the history
+        enc_history = enc.encode(history)
+        limit = min(HISTORY_MAX_TOKENS, remaining)
+        history_text = enc.decode(enc_history[-limit:]) if len(enc_history) > limit else history
+        history_tokens = count_tokens(history_text)
+        remaining -= history_tokens
+
+    image_text = None
+    image_tokens = 0
+    if image_context and remaining > 0:
+        image_text = truncate_to_tokens(image_context, min(IMAGE_CONTEXT_MAX_TOKENS, remaining))
+        image_tokens = count_tokens(image_text)
+        remaining -= image_tokens
+
+    kept, overlap_removed = _dedupe_docs(docs or [])
+    parts: list[str] = []
+    kb_tokens = 0
+    for doc, tokens in kept:
+        header = doc_template.format(source=doc.metadata.get("source", "unknown"), content="")
+        header_tokens = count_tokens(header)
+        available = remaining - header_tokens
+        if available < MIN_DOC_TOKENS and available < len(tokens):
+            break
+        if len(tokens) > available:
+            tokens = tokens[:available]
+        content = enc.decode(tokens)
+        parts.append(doc_template.format(source=doc.metadata.get("source", "unknown"), content=content))
+        used = header_tokens + len(tokens)
+        kb_tokens += used
+        remaining -= used
+
+    return AssembledContext(
+        user_query=user_query,
+        rag_context="\n\n".join(parts),
+        image_context=image_text,
+        history=history_text,
+        docs_used=len(parts),
+        tokens={
+            "budget": budget,
+            "question": question_tokens,
+            "history": history_tokens,
+            "image": image_tokens,
+            "knowledge_base": kb_tokens,
+            "total": question_tokens + history_tokens + image_tokens + kb_tokens,
+            "docs_dropped": len(docs or []) - len(parts),
+            "overlap_removed": overlap_removed,
+        },
+    )
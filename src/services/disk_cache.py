@@ -0,0 +1,172 @@
+"""Small content-addressed on-disk cache shared by services (vision, TTS, extraction).
+
+The cache is capped at CACHE_MAX_MB: once a process has written past the cap,
+the least recently used entries (by mtime, which reads refresh) are deleted
+until it is back under 90% of it.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", "2048"))
+# Writes between full size scans, so other processes' writes are counted too
+_RESCAN_WRITES = 256
+
+_size_lock = threading.Lock()
+_estimated_bytes: int | None = None
+_writes_since_scan = 0
+
+
+def cache_key(*parts: str | bytes) -> str:
+    """sha256 over the given parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def cache_path(namespace: str, key: str, suffix: str = "") -> Path:
+    """Path for a cache entry; entries are sharded by key prefix."""
+    return Path(CACHE_DIR) / namespace / key[:2] / f"{key}{suffix}"
+
+
+def _touch(path: Path) -> None:
+    """Mark an entry as recently used."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def read_cache(namespace: str, key: str, suffix: str = "") -> bytes | None:
+    path = cache_path(namespace, key, suffix)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    _touch(path)
+    return data
+
+
+def cached_path(namespace: str, key: str, suffix: str = "") -> Path | None:
+    """Path of an existing entry (marked as used), or None."""
+    path = cache_path(namespace, key, suffix)
+    if not path.exists():
+        return None
+    _touch(path)
+    return path
+
+
+def _entries() -> list[tuple[float, int, Path]]:
+    """(mtime, size, path) of every entry under CACHE_DIR."""
+    entries = []
+    for dirpath, _, names in os.walk(CACHE_DIR):
+        for name in names:
+            if name.startswith(".tmp-"):
+                continue
+            path = Path(dirpath) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def prune_cache(max_bytes: int | None = None) -> int:
+    """Delete least recently used entries until the cache is under 90% of max_bytes; returns the size left."""
+    max_bytes = int(CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return total
+    target = int(max_bytes * 0.9)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= target:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def _account(size: int) -> None:
+    """Track bytes written by this process and prune once the cap is passed."""
+    global _estimated_bytes, _writes_since_scan
+    if CACHE_MAX_MB <= 0:
+        return
+    max_bytes = int(CACHE_MAX_MB * 1024 * 1024)
+    with _size_lock:
+        _writes_since_scan += 1
+        if _estimated_bytes is not None and _writes_since_scan < _RESCAN_WRITES:
+            _estimated_bytes += size
+            if _estimated_bytes <= max_bytes:
+                return
+        _estimated_bytes = prune_cache(max_bytes)
+        _writes_since_scan = 0
+
+
+def write_cache(namespace: str, key: str, data: bytes, suffix: str = "") -> Path | None:
+    """Atomically write an entry; returns its path, or None if the cache dir is not writable."""
+    path = cache_path(namespace, key, suffix)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        return None
+    _account(len(data))
+    return path
+
+
+class CacheWriter:
+    """An entry written incrementally to a temp file; commit() publishes it atomically."""
+
+    def __init__(self, path: Path, tmp: str, file: BinaryIO):
+        self.path = path
+        self.file = file
+        self._tmp = tmp
+
+    def commit(self) -> Path | None:
+        """Publish the entry; returns its path, or None if that failed (the entry is dropped)."""
+        try:
+            self.file.close()
+            size = os.path.getsize(self._tmp)
+            os.replace(self._tmp, self.path)
+        except OSError:
+            self.discard()
+            return None
+        _account(size)
+        return self.path
+
+    def discard(self) -> None:
+        """Drop the partial entry."""
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        try:
+            os.unlink(self._tmp)
+        except OSError:
+            pass
+
+
+def open_cache_writer(namespace: str, key: str, suffix: str = "") -> CacheWriter | None:
+    """Start streaming an entry (for results too large to buffer); None if the cache dir is not writable."""
+    path = cache_path(namespace, key, suffix)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    except OSError:
+        return None
+    return CacheWriter(path, tmp, os.fdopen(fd, "wb"))
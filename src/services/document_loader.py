@@ -1,10 +1,29 @@
 """Document loading: PDF and text parsing."""
 
+import gzip
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Iterable, Iterator
 
 from pydantic import BaseModel
 
+from src.services.disk_cache import cache_key, cached_path, open_cache_writer
+
+PDF_EXTRACT_CACHE = os.getenv("PDF_EXTRACT_CACHE", "1").strip() not in ("0", "false", "False", "no")
+PDF_CACHE_NAMESPACE = "pdf_text"
+# Bump when the shape of cached pages or the extraction flags change
+EXTRACT_FORMAT_VERSION = 3
+# PDFs longer than this many pages are split into ranges extracted in parallel processes
+PDF_PAGE_RANGE_SIZE = int(os.getenv("PDF_PAGE_RANGE_SIZE", "250"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
 
 class DocumentChunk(BaseModel):
     """A chunk of document content with metadata."""
@@ -17,37 +36,273 @@ class DocumentChunk(BaseModel):
     section: str | None = None
 
 
-def load_pdf(path: str | Path) -> Iterator[DocumentChunk]:
-    """Load a PDF file and yield page-by-page chunks (raw pages; chunking applied separately)."""
+class ChunkBatch:
+    """
+    Many chunks as parallel lists (columns) instead of one object per chunk.
+
+    The bulk ingestion path (load_document_batch -> chunk_batch ->
+    add_chunks_to_store) uses this so a chunk costs its text plus a few list
+    slots: no per-chunk model validation, and repeated source names are
+    interned so every chunk of a file shares one string. Metadata dicts are
+    built only when the batch is handed to the vector store.
+    """
+
+    __slots__ = ("texts", "sources", "source_types", "domains", "pages", "sections")
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.sources: list[str] = []
+        self.source_types: list[str] = []
+        self.domains: list[str | None] = []
+        self.pages: list[int | None] = []
+        self.sections: list[str | None] = []
+
+    def append(
+        self,
+        content: str,
+        source: str,
+        source_type: str,
+        domain: str | None = None,
+        page: int | None = None,
+        section: str | None = None,
+    ) -> None:
+        self.texts.append(content)
+        self.sources.append(sys.intern(source))
+        self.source_types.append(sys.intern(source_type))
+        self.domains.append(domain)
+        self.pages.append(page)
+        self.sections.append(section)
+
+    def extend(self, other: "ChunkBatch") -> None:
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: slice) -> "ChunkBatch":
+        """A slice of the batch (e.g. batch[i:i + 500] for store-sized writes)."""
+        if not isinstance(index, slice):
+            raise TypeError("ChunkBatch supports slicing only; iterate for single chunks")
+        part = ChunkBatch()
+        for name in self.__slots__:
+            setattr(part, name, getattr(self, name)[index])
+        return part
+
+    def __iter__(self) -> Iterator[DocumentChunk]:
+        for content, source, source_type, domain, page, section in zip(
+            self.texts, self.sources, self.source_types, self.domains, self.pages, self.sections
+        ):
+            yield DocumentChunk(
+                content=content, source=source, source_type=source_type, domain=domain, page=page, section=section
+            )
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[DocumentChunk]) -> "ChunkBatch":
+        batch = cls()
+        for c in chunks:
+            batch.append(c.content, c.source, c.source_type, c.domain, c.page, c.section)
+        return batch
+
+    def metadatas(self) -> list[dict[str, Any]]:
+        """Per-chunk metadata dicts in the shape the vector stores filter on (unset fields omitted)."""
+        result = []
+        for source, source_type, domain, page, section in zip(
+            self.sources, self.source_types, self.domains, self.pages, self.sections
+        ):
+            metadata: dict[str, Any] = {"source": source, "source_type": source_type}
+            if domain:
+                metadata["domain"] = domain
+            if page is not None:
+                metadata["page"] = page
+            if section:
+                metadata["section"] = section
+            result.append(metadata)
+        return result
+
+
+def _extractor_version() -> str:
+    """Cache key part: changes when PyMuPDF or the extracted format changes."""
     import fitz  # PyMuPDF
 
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"PDF not found: {path}")
+    return f"pymupdf-{fitz.VersionBind}-{EXTRACT_FORMAT_VERSION}"
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _iter_pages(doc, start: int, end: int) -> Iterator[dict]:
+    """{"page", "text", "blocks"} for each page with text in [start, end) of an open PyMuPDF document."""
+    import fitz  # PyMuPDF
+
+    for page_num in range(start, end):
+        page = doc.load_page(page_num)
+        # One text page parse serves both the plain text and the layout blocks. get_textpage()
+        # defaults to flags=0; get_text() uses TEXTFLAGS_TEXT (ligatures, whitespace, mediabox clip)
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        text = page.get_text("text", textpage=textpage)
+        if text.strip():
+            blocks = [
+                [round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1), block_text, block_type]
+                for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks", textpage=textpage)
+            ]
+            yield {"page": page_num + 1, "text": text, "blocks": blocks}
+
+
+def _extract_range(path: str, start: int, end: int) -> list[dict]:
+    """Worker process: open the PDF independently and extract one page range."""
+    import fitz  # PyMuPDF
 
     doc = fitz.open(path)
     try:
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            if text.strip():
-                yield DocumentChunk(
-                    content=text,
-                    source=str(path.name),
-                    source_type="manual",
-                    page=page_num + 1,
-                )
+        return list(_iter_pages(doc, start, end))
     finally:
         doc.close()
 
 
-def load_text(path: str | Path, source_type: str = "transcript") -> Iterator[DocumentChunk]:
-    """Load a plain text file."""
+def _extract_pdf(path: Path, range_size: int, workers: int) -> Iterator[dict]:
+    """
+    Parse a PDF with PyMuPDF, yielding pages in order.
+
+    Documents longer than range_size pages are split into page ranges that
+    run in up to `workers` processes; results stream back in page order as
+    each range finishes, with at most two ranges per worker in flight.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(path)
+    try:
+        page_count = len(doc)
+        ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+        workers = min(workers, len(ranges))
+        if workers <= 1:
+            yield from _iter_pages(doc, 0, page_count)
+            return
+    finally:
+        doc.close()
+
+    # spawn: the callers (Streamlit, the API, ingest workers) are multi-threaded, which fork does not suit
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        todo = iter(ranges)
+        in_flight = deque(pool.submit(_extract_range, str(path), *r) for r in itertools.islice(todo, workers * 2))
+        while in_flight:
+            pages = in_flight.popleft().result()
+            next_range = next(todo, None)
+            if next_range is not None:
+                in_flight.append(pool.submit(_extract_range, str(path), *next_range))
+            yield from pages
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def load_pdf_pages(
+    path: str | Path, range_size: int | None = None, workers: int | None = None
+) -> Iterator[dict]:
+    """
+    Extracted pages of a PDF: {"page", "text", "blocks"}, blocks being
+    [x0, y0, x1, y1, text, type] in reading order (type 1 is an image).
+
+    Pages are yielded in order as they are extracted; PDFs longer than
+    range_size (PDF_PAGE_RANGE_SIZE) pages are extracted in parallel by up to
+    `workers` (PDF_EXTRACT_WORKERS) processes. Results are cached per file
+    content and extractor version (PDF_EXTRACT_CACHE=0 disables), so
+    re-chunking or re-indexing the same manuals does not parse them again.
+    The entry is streamed to disk page by page and published only once the
+    whole file has been extracted.
+    """
     path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF not found: {path}")
+    range_size = max(range_size or PDF_PAGE_RANGE_SIZE, 1)
+    workers = workers or PDF_EXTRACT_WORKERS
+    if not PDF_EXTRACT_CACHE:
+        yield from _extract_pdf(path, range_size, workers)
+        return
+
+    key = cache_key(_extractor_version(), _file_hash(path))
+    # One JSON page per line, read and written as the pages go, so no file is held in memory
+    last_page = 0
+    cached = cached_path(PDF_CACHE_NAMESPACE, key, ".jsonl.gz")
+    if cached is not None:
+        try:
+            with gzip.open(cached, "rt", encoding="utf-8") as f:
+                for line in f:
+                    page = json.loads(line)
+                    yield page
+                    last_page = page["page"]
+            return
+        except (OSError, EOFError, ValueError, KeyError):
+            pass  # Corrupt entry: extract the remaining pages again and overwrite it
+
+    writer = open_cache_writer(PDF_CACHE_NAMESPACE, key, ".jsonl.gz")
+    out = gzip.open(writer.file, "wt", encoding="utf-8", compresslevel=6) if writer else None
+
+    def drop_entry() -> None:
+        nonlocal out, writer
+        try:
+            out.close()
+        except (OSError, ValueError):
+            pass
+        writer.discard()
+        out = writer = None
+
+    try:
+        for page in _extract_pdf(path, range_size, workers):
+            if out is not None:
+                try:
+                    out.write(json.dumps(page, ensure_ascii=False) + "\n")
+                except OSError:
+                    drop_entry()
+            if page["page"] > last_page:
+                yield page
+    except BaseException:
+        # Extraction failed or the caller stopped early: never publish a partial entry
+        if writer is not None:
+            drop_entry()
+        raise
+    if writer is not None:
+        try:
+            out.close()
+        except OSError:
+            drop_entry()
+        else:
+            writer.commit()
+
+
+def _pdf_pages(path: Path) -> Iterator[tuple[int, str]]:
+    """(page number, text) for each PDF page with text."""
+    for page in load_pdf_pages(path):
+        yield page["page"], page["text"]
+
+
+def _read_text(path: Path) -> str:
     if not path.exists():
         raise FileNotFoundError(f"Text file not found: {path}")
+    return path.read_text(encoding="utf-8", errors="replace")
+
 
-    content = path.read_text(encoding="utf-8", errors="replace")
+def load_pdf(path: str | Path) -> Iterator[DocumentChunk]:
+    """Load a PDF file and yield page-by-page chunks (raw pages; chunking applied separately)."""
+    path = Path(path)
+    for page_num, text in _pdf_pages(path):
+        yield DocumentChunk(
+            content=text,
+            source=str(path.name),
+            source_type="manual",
+            page=page_num,
+        )
+
+
+def load_text(path: str | Path, source_type: str = "transcript") -> Iterator[DocumentChunk]:
+    """Load a plain text file."""
+    path = Path(path)
+    content = _read_text(path)
     if content.strip():
         yield DocumentChunk(
             content=content,
@@ -67,3 +322,22 @@ def load_document(path: str | Path, source_type: str = "manual") -> Iterator[Doc
         yield from load_text(path, source_type=source_type)
     else:
         raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def load_document_batch(path: str | Path, source_type: str = "manual") -> ChunkBatch:
+    """Load a document (PDF or text) into a ChunkBatch of raw pages, same content as load_document."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    batch = ChunkBatch()
+
+    if suffix == ".pdf":
+        # PDFs are always manuals, as in load_pdf
+        for page_num, text in _pdf_pages(path):
+            batch.append(text, path.name, "manual", page=page_num)
+    elif suffix in (".txt", ".text"):
+        content = _read_text(path)
+        if content.strip():
+            batch.append(content, path.name, source_type)
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+    return batch
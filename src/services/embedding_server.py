@@ -0,0 +1,394 @@
+"""Local embedding server: one sentence-transformers model per host, shared over a Unix socket.
+
+    python -m src.services.embedding_server serve            # usually auto-started by a client
+    python -m src.services.embedding_server status
+
+With EMBEDDING_MODEL=server, get_embeddings_model() returns an
+EmbeddingServerClient instead of loading HF_EMBEDDING_MODEL in-process, so the
+Streamlit app, API replicas and ingest workers on a host share one copy of
+the model (and its CPU threads). The first client to find no server starts
+one in the background and waits for it to load.
+
+Requests from all connections go through one batcher thread: it takes
+whatever is queued, waits up to EMBEDDING_SERVER_MAX_WAIT_MS for more, and
+embeds up to EMBEDDING_SERVER_MAX_BATCH texts per model call, so concurrent
+small requests (one query each) are embedded together.
+
+Wire format: each message is a 4-byte big-endian length and a body. A
+request is a JSON body {"op": "embed", "texts": [...], "kind": "documents"|"query"}
+or {"op": "stats"}; an embed response is a JSON header {"count", "dims"} (or
+{"error"}) followed by a body of count*dims little-endian float32s.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+# Ensure project root on path
+_project_root = Path(__file__).resolve().parent.parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+
+def _default_socket() -> str:
+    """A per-user location: $XDG_RUNTIME_DIR (private to the user) or the project directory, never /tmp."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    base = Path(runtime_dir) if runtime_dir and os.path.isdir(runtime_dir) else _project_root
+    return str(base / "fixpal-embeddings.sock")
+
+
+EMBEDDING_SOCKET = os.getenv("EMBEDDING_SOCKET") or _default_socket()
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "64"))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "5"))
+# Seconds a client waits for an auto-started server to load its model
+EMBEDDING_SERVER_START_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_START_TIMEOUT", "180"))
+# Seconds an embed request may take; the client waits a little longer for the server's reply
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "120"))
+
+_HEADER = struct.Struct(">I")
+
+
+def _send(sock: socket.socket, body: bytes) -> None:
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        part = sock.recv(min(size - len(buf), 1 << 20))
+        if not part:
+            raise ConnectionError("embedding server connection closed")
+        buf += part
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket) -> bytes:
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return _recv_exactly(sock, size)
+
+
+def _to_bytes(vectors: list[list[float]]) -> bytes:
+    flat = array("f")
+    for vector in vectors:
+        flat.extend(vector)
+    if sys.byteorder != "little":
+        flat.byteswap()
+    return flat.tobytes()
+
+
+def _from_bytes(data: bytes, count: int, dims: int) -> list[list[float]]:
+    flat = array("f")
+    flat.frombytes(data)
+    if sys.byteorder != "little":
+        flat.byteswap()
+    values = flat.tolist()
+    return [values[i * dims:(i + 1) * dims] for i in range(count)]
+
+
+# ---- Server ----
+
+
+class _Batcher:
+    """Collects embed requests from all connections and runs them through the model in batches."""
+
+    def __init__(self, model: Embeddings, max_batch: int, max_wait: float):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue[tuple[str, list[str], Future]] = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "model_seconds": 0.0, "started_at": time.time()}
+        threading.Thread(target=self._loop, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, kind: str, texts: list[str]) -> Future:
+        future: Future = Future()
+        self._queue.put((kind, texts, future))
+        return future
+
+    def _take_batch(self) -> list[tuple[str, list[str], Future]]:
+        batch = [self._queue.get()]
+        size = len(batch[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                for kind in ("documents", "query"):
+                    items = [item for item in batch if item[0] == kind]
+                    if items:
+                        self._run(kind, items)
+            except Exception as e:
+                # Keep the batcher alive; fail whatever in this batch was not answered
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run(self, kind: str, items: list[tuple[str, list[str], Future]]) -> None:
+        texts = [t for _, item_texts, _ in items for t in item_texts]
+        start = time.perf_counter()
+        try:
+            if kind == "query" and getattr(self.model, "query_encode_kwargs", None):
+                # The model encodes queries differently (e.g. an instruction prefix)
+                vectors = [self.model.embed_query(t) for t in texts]
+            else:
+                vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        with self._stats_lock:
+            self.stats["requests"] += len(items)
+            self.stats["texts"] += len(texts)
+            self.stats["batches"] += 1
+            self.stats["model_seconds"] += time.perf_counter() - start
+        offset = 0
+        for _, item_texts, future in items:
+            future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        batcher: _Batcher = self.server.batcher
+        while True:
+            try:
+                request = json.loads(_recv(self.request))
+            except (ConnectionError, OSError):
+                return
+            try:
+                if request.get("op") == "stats":
+                    with batcher._stats_lock:
+                        _send(self.request, json.dumps({**batcher.stats, "pid": os.getpid()}).encode("utf-8"))
+                    continue
+                texts = request["texts"]
+                vectors = []
+                if texts:
+                    future = batcher.submit(request.get("kind", "documents"), texts)
+                    try:
+                        vectors = future.result(timeout=EMBEDDING_SERVER_TIMEOUT)
+                    except FutureTimeoutError:
+                        # Caught here: on 3.11+ it is the builtin TimeoutError, an OSError
+                        raise RuntimeError(f"no result within {EMBEDDING_SERVER_TIMEOUT:.0f} s") from None
+                dims = len(vectors[0]) if vectors else 0
+                _send(self.request, json.dumps({"count": len(vectors), "dims": dims}).encode("utf-8"))
+                _send(self.request, _to_bytes(vectors))
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                _send(self.request, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8"))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _load_model() -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    )
+
+
+def serve(socket_path: str = EMBEDDING_SOCKET, max_batch: int = EMBEDDING_SERVER_MAX_BATCH,
+          max_wait_ms: float = EMBEDDING_SERVER_MAX_WAIT_MS, model: Embeddings | None = None) -> None:
+    """Run the server until interrupted; returns at once if another server owns socket_path."""
+    # One server per socket path: the lock is held for the server's lifetime
+    lock_file = os.fdopen(os.open(socket_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        print(f"Embedding server already running on {socket_path}")
+        return
+
+    model = model or _load_model()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Left behind by a server that died
+    # Only this user may connect: the socket is created 0600, not umask-dependent
+    umask = os.umask(0o177)
+    try:
+        server = _Server(socket_path, _Handler)
+    finally:
+        os.umask(umask)
+    os.chmod(socket_path, 0o600)
+    server.batcher = _Batcher(model, max_batch, max_wait_ms / 1000)
+    print(f"Embedding server (pid {os.getpid()}) listening on {socket_path}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        lock_file.close()
+
+
+# ---- Client ----
+
+
+class EmbeddingServerClient(Embeddings):
+    """Embeddings from the host's embedding server; starts the server if it is not running."""
+
+    def __init__(self, socket_path: str = EMBEDDING_SOCKET, autostart: bool = True):
+        self.socket_path = socket_path
+        self.autostart = autostart
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        # Set after connecting: with a timeout, connect fails at once (EAGAIN) on a full backlog
+        sock.settimeout(EMBEDDING_SERVER_TIMEOUT + 5)
+        return sock
+
+    def _start_server(self) -> socket.socket:
+        with self._start_lock:
+            try:
+                return self._connect()
+            except OSError:
+                pass
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "src.services.embedding_server", "serve", "--socket", self.socket_path],
+                cwd=_project_root,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            # Reap the child whenever it exits (at once if another server won the lock), so it is no zombie
+            threading.Thread(target=proc.wait, name="embedding-server-reaper", daemon=True).start()
+            deadline = time.monotonic() + EMBEDDING_SERVER_START_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.2)
+                try:
+                    return self._connect()
+                except OSError:
+                    # Exit code 0: another process's server won the lock and is still loading
+                    if proc.returncode not in (None, 0):
+                        raise ConnectionError(f"Embedding server failed to start (exit code {proc.returncode})")
+            raise ConnectionError(f"Embedding server did not start on {self.socket_path}")
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            try:
+                sock = self._connect()
+            except OSError:
+                if not self.autostart:
+                    raise
+                sock = self._start_server()
+            self._local.sock = sock
+        return sock
+
+    def _drop(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _request(self, body: dict) -> tuple[dict, socket.socket]:
+        # A connection from before a server restart fails on first use; reconnect once
+        for attempt in (0, 1):
+            sock = self._socket()
+            try:
+                _send(sock, json.dumps(body).encode("utf-8"))
+                return json.loads(_recv(sock)), sock
+            except TimeoutError:
+                # The server is stuck on this request; resending it would wait again
+                self._drop()
+                raise
+            except OSError:
+                self._drop()
+                if attempt:
+                    raise
+
+    def _embed(self, texts: list[str], kind: str) -> list[list[float]]:
+        header, sock = self._request({"op": "embed", "texts": texts, "kind": kind})
+        if "error" in header:
+            raise RuntimeError(f"Embedding server: {header['error']}")
+        try:
+            data = _recv(sock)
+        except OSError:
+            self._drop()
+            raise
+        return _from_bytes(data, header["count"], header["dims"])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(list(texts), "documents")
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries in one request (batch retrieval)."""
+        return self._embed(list(texts), "query")
+
+    def stats(self) -> dict:
+        return self._request({"op": "stats"})[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local embedding server.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="Run the server")
+    serve_cmd.add_argument("--socket", default=EMBEDDING_SOCKET)
+    serve_cmd.add_argument("--max-batch", type=int, default=EMBEDDING_SERVER_MAX_BATCH, help="Texts per model call")
+    serve_cmd.add_argument("--max-wait-ms", type=float, default=EMBEDDING_SERVER_MAX_WAIT_MS,
+                           help="How long a batch waits for more requests")
+    status = sub.add_parser("status", help="Show server statistics")
+    status.add_argument("--socket", default=EMBEDDING_SOCKET)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        try:
+            serve(args.socket, args.max_batch, args.max_wait_ms)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "status":
+        try:
+            stats = EmbeddingServerClient(args.socket, autostart=False).stats()
+        except OSError as e:
+            print(f"No embedding server on {args.socket}: {e}", file=sys.stderr)
+            return 1
+        batches = stats["batches"] or 1
+        print(f"pid {stats['pid']}, up {time.time() - stats['started_at']:.0f} s: {stats['requests']} requests, "
+              f"{stats['texts']} texts in {stats['batches']} batches ({stats['texts'] / batches:.1f} texts/batch), "
+              f"model time {stats['model_seconds']:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,42 @@ Set EMBEDDING_MODEL=google or leave unset for fast startup; use sentence-transfo
 import os
 from langchain_core.embeddings import Embeddings
 
+from src.services.scheduler import get_scheduler, request_key
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Route a remote embeddings provider through the shared outbound scheduler."""
+
+    def __init__(self, inner: Embeddings, provider: str = "embeddings"):
+        self.inner = inner
+        self.provider = provider
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return get_scheduler().call(
+            self.provider,
+            lambda: self.inner.embed_documents(texts),
+            key=request_key(self.provider, "documents", texts),
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        return get_scheduler().call(
+            self.provider,
+            lambda: self.inner.embed_query(text),
+            key=request_key(self.provider, "query", text),
+        )
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several queries in one request (batch retrieval)."""
+
+        def _call() -> list[list[float]]:
+            try:
+                return self.inner.embed_documents(texts, task_type="retrieval_query")
+            except TypeError:
+                # Provider without query/document task types: one request per query
+                return [self.inner.embed_query(t) for t in texts]
+
+        return get_scheduler().call(self.provider, _call, key=request_key(self.provider, "queries", texts))
+
 
 def get_embeddings_model() -> Embeddings:
     """Return embeddings model. Defaults to Google when GOOGLE_API_KEY is set (fast startup)."""
@@ -15,7 +51,12 @@ def get_embeddings_model() -> Embeddings:
         model = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004").strip()
         if not model.startswith("models/"):
             model = "models/text-embedding-004"
-        return GoogleGenerativeAIEmbeddings(model=model)
+        return ScheduledEmbeddings(GoogleGenerativeAIEmbeddings(model=model))
+
+    # Local model in the host's shared embedding server (one copy for all processes)
+    if env == "server":
+        from src.services.embedding_server import EmbeddingServerClient
+        return EmbeddingServerClient()
 
     # Explicit HuggingFace / sentence-transformers (loads local model, slower startup)
     if env in ("huggingface", "sentence-transformers", "hf"):
@@ -27,7 +68,7 @@ def get_embeddings_model() -> Embeddings:
     # Default: use Google when API key is set (no local model, fast startup)
     if os.getenv("GOOGLE_API_KEY"):
         from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+        return ScheduledEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
 
     # Fallback: HuggingFace (set HF_TOKEN in .env for higher rate limits and faster downloads)
     from langchain_huggingface import HuggingFaceEmbeddings
@@ -0,0 +1,87 @@
+"""Image front stage for vision analysis: downsize, strip EXIF, re-encode, hash."""
+
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+
+# Longest edge sent to the vision model; phone photos are typically 3000-4000 px
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1568"))
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "webp").lower()
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+
+_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg"), "jpg": ("JPEG", "image/jpeg")}
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes ready to upload, plus hashes for caching."""
+
+    data: bytes
+    mime_type: str
+    content_hash: str
+    perceptual_hash: str | None = None
+    original_size: int = 0
+
+
+def _detect_mime_type(image_bytes: bytes) -> str:
+    """Detect image MIME type from magic bytes."""
+    if image_bytes[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _dhash(img, size: int = 8) -> str:
+    """64-bit difference hash: stable across re-encoding and resizing of the same photo."""
+    gray = img.convert("L").resize((size + 1, size))
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def prepare_image(image_bytes: bytes, max_edge: int | None = None) -> PreparedImage:
+    """
+    Downsize to max_edge, apply and strip EXIF, and re-encode (WebP by default).
+
+    The original bytes are passed through unchanged without Pillow installed, and
+    when re-encoding would make a JPEG, PNG or WebP without EXIF data larger
+    (e.g. a small, already compressed screenshot).
+    """
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return PreparedImage(image_bytes, _detect_mime_type(image_bytes), content_hash, None, len(image_bytes))
+
+    max_edge = max_edge or VISION_MAX_EDGE
+    fmt, mime_type = _FORMATS.get(VISION_IMAGE_FORMAT, _FORMATS["webp"])
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.seek(0)  # first frame of animated images
+            # The original can be sent as is if it is smaller and has nothing to strip
+            keep_original = img.format in ("JPEG", "PNG", "WEBP") and not img.getexif()
+            # Bake the EXIF orientation into the pixels, since the EXIF block is dropped on save
+            img = ImageOps.exif_transpose(img)
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            img = img.convert("RGBA" if has_alpha and fmt == "WEBP" else "RGB")
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            perceptual_hash = _dhash(img)
+            buf = io.BytesIO()
+            img.save(buf, format=fmt, quality=VISION_IMAGE_QUALITY)
+    except Exception:
+        # Undecodable input: let the provider try the original bytes
+        return PreparedImage(image_bytes, _detect_mime_type(image_bytes), content_hash, None, len(image_bytes))
+    if keep_original and buf.tell() >= len(image_bytes):
+        return PreparedImage(image_bytes, _detect_mime_type(image_bytes), content_hash, perceptual_hash, len(image_bytes))
+    return PreparedImage(buf.getvalue(), mime_type, content_hash, perceptual_hash, len(image_bytes))
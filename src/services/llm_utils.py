@@ -1,14 +1,23 @@
 """LLM model utilities - Gemini and Dedalus integration."""
 
+import asyncio
+import importlib.util
 import os
+import threading
 from typing import Sequence
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
+from src.services.resilience import call_with_fallback
+from src.services.resources import get_shared_dedalus, get_shared_llm, invalidate
+from src.services.scheduler import get_scheduler, request_key
+from src.services.telemetry import current_trace, span
+
 
 def get_llm(model_name: str | None = None, temperature: float = 0.7):
     """Get Gemini LLM instance."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     model = model_name or os.getenv("LLM_MODEL", "gemini-2.5-flash")
     
     return ChatGoogleGenerativeAI(
@@ -19,6 +28,8 @@ def get_llm(model_name: str | None = None, temperature: float = 0.7):
 
 def get_vision_llm(temperature: float = 0.7):
     """Get Gemini vision-capable LLM."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     model = os.getenv("VISION_MODEL", "gemini-2.5-flash")
     
     return ChatGoogleGenerativeAI(
@@ -26,25 +37,46 @@ def get_vision_llm(temperature: float = 0.7):
         temperature=temperature,
     )
 
+class DedalusSession:
+    """One AsyncDedalus client with its own event loop thread, shared by all callers.
+
+    The async client is bound to the loop it was created on, so calls from any
+    thread are handed to that loop instead of each starting a loop and a client.
+    """
+
+    def __init__(self):
+        try:
+            from dedalus_labs import AsyncDedalus, DedalusRunner
+        except ImportError:
+            raise ImportError("Dedalus requires the 'dedalus_labs' package. Install with: pip install dedalus-labs")
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="dedalus-loop", daemon=True).start()
+
+        async def _connect():
+            client = AsyncDedalus(api_key=os.getenv("DEDALUS_API_KEY"))
+            return client, DedalusRunner(client)
+
+        self.client, self.runner = self._submit(_connect())
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def run(self, prompt: str) -> str:
+        async def _run():
+            response = await self.runner.run(
+                input=prompt,
+                model=os.getenv("DEDALUS_MODEL"),
+                max_tokens=4096,
+            )
+            return response.final_output or ""
+
+        return self._submit(_run())
+
+
 def get_dedalus_llm(prompt: str, temperature: float = 0.7):
     """Run Dedalus with the given prompt. Returns the model output string. Requires: pip install dedalus-labs."""
-    import asyncio
-    try:
-        from dedalus_labs import AsyncDedalus, DedalusRunner
-    except ImportError:
-        raise ImportError("Dedalus requires the 'dedalus_labs' package. Install with: pip install dedalus-labs")
-
-    async def main():
-        client = AsyncDedalus(api_key=os.getenv("DEDALUS_API_KEY"))
-        runner = DedalusRunner(client)
-        response = await runner.run(
-            input=prompt,
-            model=os.getenv("DEDALUS_MODEL"),
-            max_tokens=4096,
-        )
-        return response.final_output or ""
-
-    return asyncio.run(main())
+    return get_shared_dedalus().run(prompt)
 
 
 def _messages_to_prompt(messages: Sequence[BaseMessage]) -> str:
@@ -63,27 +95,114 @@ def _messages_to_prompt(messages: Sequence[BaseMessage]) -> str:
     return "\n\n".join(parts)
 
 
+def _dedalus_configured() -> bool:
+    """Dedalus credentials and model are set in the environment."""
+    return bool(os.getenv("DEDALUS_API_KEY") and os.getenv("DEDALUS_MODEL"))
+
+
+def _use_dedalus() -> bool:
+    """USE_DEDALUS asks for Dedalus as the primary provider."""
+    return os.getenv("USE_DEDALUS", "").strip() in ("1", "true", "True", "yes")
+
+
+def _dedalus_installed() -> bool:
+    return importlib.util.find_spec("dedalus_labs") is not None
+
+
+def _call_dedalus(messages: Sequence[BaseMessage], temperature: float) -> str:
+    prompt = _messages_to_prompt(messages)
+
+    def _call() -> str:
+        try:
+            return get_dedalus_llm(prompt, temperature=temperature)
+        except Exception as e:
+            # Same rule as Gemini: reconnect only on connection or auth failures
+            if _client_broken(e):
+                invalidate("dedalus")
+            raise
+
+    return get_scheduler().call(
+        "dedalus",
+        _call,
+        key=request_key("dedalus", os.getenv("DEDALUS_MODEL"), temperature, prompt),
+    )
+
+
+# Errors after which the shared client is rebuilt; rate limits and bad requests are not among them
+_CLIENT_ERROR_NAMES = {
+    "Unauthenticated", "PermissionDenied", "DefaultCredentialsError",
+    "ConnectError", "RemoteProtocolError", "TransportError",
+}
+
+
+def _client_broken(error: BaseException) -> bool:
+    """Connection or auth failure anywhere in the exception chain."""
+    while error is not None:
+        if isinstance(error, ConnectionError) or type(error).__name__ in _CLIENT_ERROR_NAMES:
+            return True
+        if getattr(error, "code", None) in (401, 403) or getattr(error, "status_code", None) in (401, 403):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _call_gemini(messages: Sequence[BaseMessage], temperature: float, model_name: str | None) -> str:
+    model = model_name or os.getenv("LLM_MODEL", "gemini-2.5-flash")
+
+    def _call() -> str:
+        try:
+            response = get_shared_llm(model, temperature).invoke(messages)
+        except Exception as e:
+            # Rebuild the shared client on the next call if its connection or credentials are broken
+            if _client_broken(e):
+                invalidate(f"llm:{model}:{temperature}")
+            raise
+        return response.content if hasattr(response, "content") else str(response)
+
+    return get_scheduler().call(
+        "gemini",
+        _call,
+        key=request_key("gemini", model, temperature, [(type(m).__name__, m.content) for m in messages]),
+    )
+
+
 def invoke_llm(
     messages: Sequence[BaseMessage],
     temperature: float = 0.7,
     model_name: str | None = None,
+    stage: str = "generation",
+    timeout: float | None = None,
 ) -> str:
     """
     Invoke LLM with the given messages.
     Uses Dedalus if USE_DEDALUS is set and dedalus_labs is installed; otherwise Gemini.
-    Returns the model output as a string. Gemini code path is unchanged when not using Dedalus.
+    The other provider (when configured) is the fallback, and with LLM_HEDGE=1 it also
+    receives a hedged request once the first one runs past its p95 latency.
+    Raises TimeoutError if the stage deadline (LLM_TIMEOUT_<STAGE>, or timeout) passes.
+    Returns the model output as a string.
     """
-    if os.getenv("USE_DEDALUS", "").strip() in ("1", "true", "True", "yes") and os.getenv("DEDALUS_API_KEY") and os.getenv("DEDALUS_MODEL"):
-        try:
-            prompt = _messages_to_prompt(messages)
-            return get_dedalus_llm(prompt, temperature=temperature)
-        except ImportError:
-            import warnings
-            warnings.warn(
-                "USE_DEDALUS is set but 'dedalus_labs' is not installed. Install with: pip install dedalus-labs. Using Gemini.",
-                UserWarning,
-                stacklevel=2,
-            )
-    llm = get_llm(model_name=model_name, temperature=temperature)
-    response = llm.invoke(messages)
-    return response.content if hasattr(response, "content") else str(response)
\ No newline at end of file
+    dedalus_ok = _dedalus_configured() and _dedalus_installed()
+    if _use_dedalus() and _dedalus_configured() and not dedalus_ok:
+        import warnings
+        warnings.warn(
+            "USE_DEDALUS is set but 'dedalus_labs' is not installed. Install with: pip install dedalus-labs. Using Gemini.",
+            UserWarning,
+            stacklevel=2,
+        )
+
+    calls = {
+        "dedalus": lambda: _call_dedalus(messages, temperature),
+        "gemini": lambda: _call_gemini(messages, temperature, model_name),
+    }
+    if not dedalus_ok:
+        del calls["dedalus"]
+    elif not _use_dedalus():
+        calls = {"gemini": calls["gemini"], "dedalus": calls["dedalus"]}
+
+    with span(f"llm.{stage}") as s:
+        answer, provider = call_with_fallback(calls, stage=stage, timeout=timeout)
+        s.set(provider=provider)
+        if current_trace() is not None:
+            from src.services.chunker import count_tokens
+            s.set(tokens_in=count_tokens(_messages_to_prompt(messages)), tokens_out=count_tokens(answer))
+    return answer
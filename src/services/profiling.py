@@ -0,0 +1,104 @@
+"""Opt-in per-request profiling (cProfile) with rotating dumps and a self-time summary."""
+
+import cProfile
+import os
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".profiles")
+# Newest dumps kept; older ones are deleted when a new one is written
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP = 15
+
+
+def profiling_enabled() -> bool:
+    """PROFILE_REQUESTS=1 profiles every request."""
+    return os.getenv("PROFILE_REQUESTS", "").strip() in ("1", "true", "True", "yes")
+
+
+@dataclass
+class ProfileReport:
+    """Filled in when the profiled block exits."""
+
+    request_id: str
+    path: str | None = None
+    total_ms: float = 0.0
+    top: list[dict] = field(default_factory=list)
+
+
+def top_self_time(stats: pstats.Stats, limit: int = PROFILE_TOP) -> list[dict]:
+    """Functions with the most self time (excluding callees)."""
+    rows = []
+    for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{Path(filename).name}:{line}({name})" if line else name,
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 2),
+            "cumulative_ms": round(cumulative * 1000, 2),
+        })
+    rows.sort(key=lambda r: r["self_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _rotate(directory: Path, keep: int) -> None:
+    dumps = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in dumps[keep:]:
+        for path in (old, old.with_suffix(".txt")):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+@contextmanager
+def profile_request(request_id: str | None = None, force: bool = False) -> Iterator[ProfileReport | None]:
+    """
+    Profile the enclosed block if PROFILE_REQUESTS is set or force is True.
+
+    When disabled this yields None and adds no profiling overhead. When enabled,
+    the profile is written to PROFILE_DIR/<timestamp>-<request_id>.prof (open
+    with pstats or snakeviz) along with a .txt summary, and the yielded report
+    is filled in on exit.
+
+    cProfile sees the calling thread only; time spent in provider calls on worker
+    threads shows up as waiting (e.g. Future.result). The per-stage telemetry
+    spans cover those. On Python 3.12+ only one profile can run at a time, so a
+    request that overlaps another profiled one is not profiled (yields None).
+    """
+    if not (force or profiling_enabled()):
+        yield None
+        return
+
+    report = ProfileReport(request_id=request_id or uuid.uuid4().hex)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+ allows one active profiler per process; another request holds it
+        print(f"Profiling skipped for {report.request_id}: {e}")
+        yield None
+        return
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        report.total_ms = round((time.perf_counter() - started) * 1000, 1)
+        try:
+            stats = pstats.Stats(profiler)
+            report.top = top_self_time(stats)
+            directory = Path(PROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{report.request_id}.prof"
+            stats.dump_stats(str(path))
+            with open(path.with_suffix(".txt"), "w", encoding="utf-8") as f:
+                pstats.Stats(str(path), stream=f).sort_stats("tottime").print_stats(40)
+            report.path = str(path)
+            _rotate(directory, PROFILE_KEEP)
+        except Exception as e:
+            print(f"Could not write profile: {e}")
@@ -0,0 +1,259 @@
+"""Deadlines, hedged requests and circuit breakers for provider calls."""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# Per-stage deadlines in seconds; override with LLM_TIMEOUT_<STAGE>
+DEFAULT_STAGE_TIMEOUTS = {
+    "classification": 4.0,
+    "generation": 60.0,
+    "safety": 20.0,
+    "vision": 60.0,
+    "summary": 15.0,
+}
+
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Hedge delay used until a provider has enough latency samples for a p95
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))
+HEDGE_MIN_SAMPLES = 20
+
+# Calls abandoned at their deadline keep a worker until the provider returns, so a
+# provider that hangs can use up the pool; size LLM_CALL_WORKERS for that headroom
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CALL_WORKERS", "16")), thread_name_prefix="llm-call")
+
+
+def stage_timeout(stage: str) -> float:
+    """Deadline in seconds for a pipeline stage."""
+    raw = os.getenv(f"LLM_TIMEOUT_{stage.upper()}")
+    if raw:
+        return float(raw)
+    return DEFAULT_STAGE_TIMEOUTS.get(stage, DEFAULT_STAGE_TIMEOUTS["generation"])
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGE", "").strip() in ("1", "true", "True", "yes")
+
+
+class CircuitBreaker:
+    """Skip a provider after consecutive failures; retry one call after a cooldown."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one provider."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_latencies: dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        return _breakers.setdefault(provider, CircuitBreaker())
+
+
+def get_latency_tracker(provider: str) -> LatencyTracker:
+    with _registry_lock:
+        return _latencies.setdefault(provider, LatencyTracker())
+
+
+def provider_health() -> dict[str, dict]:
+    """Breaker state and p95 latency per provider."""
+    with _registry_lock:
+        names = set(_breakers) | set(_latencies)
+    return {
+        name: {
+            "breaker": get_breaker(name).state,
+            "p95_s": get_latency_tracker(name).p95(),
+        }
+        for name in sorted(names)
+    }
+
+
+def _submit(fn: Callable[[], T]) -> Future:
+    """Run fn on the shared pool, carrying over context variables (e.g. call priority)."""
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, fn)
+
+
+def run_with_deadline(fn: Callable[[], T], timeout: float, stage: str = "call") -> T:
+    """Run fn() and raise TimeoutError if it does not finish within timeout seconds.
+
+    The underlying call is abandoned, not cancelled; its result is discarded and
+    it holds a pool worker until it returns.
+    """
+    future = _submit(fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"{stage} exceeded its {timeout:.1f}s deadline") from None
+
+
+def call_with_fallback(
+    calls: dict[str, Callable[[], T]],
+    stage: str,
+    timeout: float | None = None,
+    hedge: bool | None = None,
+) -> tuple[T, str]:
+    """
+    Call providers in ladder order within a stage deadline.
+
+    The first provider whose breaker allows it is called. If it fails, the next
+    one is tried while time remains. With hedging enabled, the next provider is
+    also started once the first has run longer than its p95 latency, and the
+    first successful response wins.
+
+    Args:
+        calls: Ordered {provider: zero-argument callable}
+        stage: Pipeline stage name (selects the default deadline)
+        timeout: Deadline override in seconds
+        hedge: Hedging override; defaults to LLM_HEDGE
+
+    Returns:
+        (result, provider that produced it)
+
+    Raises:
+        TimeoutError when the deadline passes; the last provider error otherwise.
+    """
+    timeout = timeout if timeout is not None else stage_timeout(stage)
+    hedge = hedging_enabled() if hedge is None else hedge
+    deadline = time.monotonic() + timeout
+
+    ladder = list(calls)
+    launched: list[str] = []
+    pending: dict[Future, str] = {}
+    last_error: BaseException | None = None
+    # Each provider's outcome is recorded once: by the call itself, or as a
+    # failure at the deadline (the abandoned call's later result is then ignored)
+    recorded: set[str] = set()
+    recorded_lock = threading.Lock()
+
+    def _record(provider: str, seconds: float | None) -> None:
+        with recorded_lock:
+            if provider in recorded:
+                return
+            recorded.add(provider)
+        if seconds is None:
+            get_breaker(provider).record_failure()
+        else:
+            get_breaker(provider).record_success()
+            get_latency_tracker(provider).record(seconds)
+
+    def _tracked(provider: str) -> Callable[[], T]:
+        def run() -> T:
+            start = time.monotonic()
+            try:
+                result = calls[provider]()
+            except BaseException:
+                _record(provider, None)
+                raise
+            _record(provider, time.monotonic() - start)
+            return result
+        return run
+
+    def _launch_next() -> bool:
+        while ladder:
+            provider = ladder.pop(0)
+            if get_breaker(provider).allow():
+                break
+        else:
+            if launched:
+                return False
+            # Every breaker is open: still try the primary rather than fail outright
+            provider = next(iter(calls))
+        launched.append(provider)
+        pending[_submit(_tracked(provider))] = provider
+        return True
+
+    _launch_next()
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait_for = remaining
+        if hedge and ladder and len(pending) == 1:
+            first = next(iter(pending.values()))
+            hedge_after = get_latency_tracker(first).p95() or HEDGE_DEFAULT_DELAY
+            wait_for = min(remaining, hedge_after)
+        done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            if hedge and ladder and len(pending) == 1:
+                _launch_next()
+            continue
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                return future.result(), provider
+            except Exception as e:
+                last_error = e
+        if not pending:
+            _launch_next()
+
+    if pending or time.monotonic() >= deadline:
+        for provider in pending.values():
+            _record(provider, None)
+        raise TimeoutError(f"{stage} exceeded its {timeout:.1f}s deadline")
+    raise last_error or RuntimeError(f"No provider available for {stage}")
@@ -0,0 +1,180 @@
+"""Process-wide shared resources: vector stores, embeddings, LLM clients (Gemini and Dedalus), safety matcher.
+
+Each resource is created once per process on first use and shared by all
+sessions and threads (the Streamlit app, the API, CLI jobs), instead of once
+per browser session or per call. A resource with a health check is
+re-checked at most every RESOURCE_HEALTH_INTERVAL seconds when handed out
+and rebuilt if the check fails; callers that see a connection error can
+call invalidate() so the next get() reconnects.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+RESOURCE_HEALTH_INTERVAL = float(os.getenv("RESOURCE_HEALTH_INTERVAL", "30"))
+
+
+class SharedResource(Generic[T]):
+    """A lazily created shared object with an optional health check and reconnect."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], T],
+        health_check: Callable[[T], Any] | None = None,
+        check_interval: float = RESOURCE_HEALTH_INTERVAL,
+    ):
+        self.name = name
+        self.factory = factory
+        self.health_check = health_check
+        self.check_interval = check_interval
+        self._value: T | None = None
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.created_at: float | None = None
+        self.builds = 0
+        self.last_error: str | None = None
+        self.healthy: bool | None = None
+
+    def _build(self) -> T:
+        try:
+            value = self.factory()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.healthy = False
+            raise
+        self._value = value
+        self.builds += 1
+        self.created_at = self._checked_at = time.monotonic()
+        self.healthy = True
+        return value
+
+    def _check(self, value: T) -> bool:
+        try:
+            self.health_check(value)
+            return True
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+
+    def get(self) -> T:
+        """Return the shared instance, creating or reconnecting it if needed."""
+        value = self._value
+        if value is not None and (
+            self.health_check is None or time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return value
+        with self._lock:
+            if self._value is None:
+                return self._build()
+            if self.health_check is not None and time.monotonic() - self._checked_at >= self.check_interval:
+                if self._check(self._value):
+                    self._checked_at = time.monotonic()
+                    self.healthy = True
+                else:
+                    print(f"Shared resource '{self.name}' failed its health check ({self.last_error}), reconnecting")
+                    self._value = None
+                    return self._build()
+            return self._value
+
+    def invalidate(self) -> None:
+        """Drop the instance; the next get() builds a new one."""
+        with self._lock:
+            self._value = None
+            self.healthy = None
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "created": self._value is not None,
+            "healthy": self.healthy,
+            "builds": self.builds,
+            "age_s": round(time.monotonic() - self.created_at, 1) if self.created_at else None,
+            "last_error": self.last_error,
+        }
+
+
+_registry: dict[str, SharedResource] = {}
+_registry_lock = threading.Lock()
+
+
+def shared(name: str, factory: Callable[[], T], health_check: Callable[[T], Any] | None = None) -> SharedResource[T]:
+    """Get or register the shared resource called name."""
+    resource = _registry.get(name)
+    if resource is None:
+        with _registry_lock:
+            resource = _registry.get(name)
+            if resource is None:
+                resource = _registry[name] = SharedResource(name, factory, health_check)
+    return resource
+
+
+def invalidate(name: str) -> None:
+    resource = _registry.get(name)
+    if resource is not None:
+        resource.invalidate()
+
+
+def resource_status() -> list[dict]:
+    """Status of every registered resource (for the sidebar / health endpoint)."""
+    return [r.status() for r in list(_registry.values())]
+
+
+def _check_vector_store(vs) -> None:
+    """Cheap liveness check that does not embed anything."""
+    client = getattr(vs, "_client", None)
+    if client is not None and hasattr(client, "heartbeat"):
+        client.heartbeat()
+    elif hasattr(vs, "_collection"):
+        vs._collection.count()
+    elif hasattr(vs, "_index") and hasattr(vs._index, "describe_index_stats"):
+        vs._index.describe_index_stats()
+
+
+def get_shared_embeddings():
+    """The process-wide embeddings model (loaded once; local models are large)."""
+    from src.services.embeddings import get_embeddings_model
+
+    return shared("embeddings", get_embeddings_model).get()
+
+
+def get_shared_vector_store(namespace: str = "manuals"):
+    """The process-wide vector store for a namespace (one Chroma client / Pinecone index handle)."""
+    from src.services import vector_store
+
+    return shared(
+        f"vector_store:{namespace}",
+        lambda: vector_store.get_vector_store(namespace=namespace)[0],
+        _check_vector_store,
+    ).get()
+
+
+def vector_store_ready(namespace: str = "manuals") -> bool:
+    """The shared store for namespace has been created and passed its last check."""
+    resource = _registry.get(f"vector_store:{namespace}")
+    return bool(resource and resource.status()["created"] and resource.healthy)
+
+
+def get_shared_llm(model: str, temperature: float):
+    """A shared Gemini chat client per (model, temperature)."""
+    from src.services.llm_utils import get_llm
+
+    return shared(f"llm:{model}:{temperature}", lambda: get_llm(model_name=model, temperature=temperature)).get()
+
+
+def get_shared_dedalus():
+    """The shared Dedalus client and its event loop."""
+    from src.services.llm_utils import DedalusSession
+
+    return shared("dedalus", DedalusSession).get()
+
+
+def get_shared_safety_matcher():
+    """The compiled hazard keyword matcher."""
+    from src.agents.safety_matcher import get_safety_matcher
+
+    return shared("safety_matcher", get_safety_matcher).get()
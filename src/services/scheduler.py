@@ -0,0 +1,241 @@
+"""Shared outbound-call scheduler: single-flight coalescing, per-provider rate limits, priorities.
+
+Every call to a model provider (LLM, vision, remote embeddings) goes through one
+process-wide scheduler so that concurrent Streamlit sessions and bulk ingestion
+share the provider quota instead of racing each other into 429s.
+
+Rate limits are configured per provider with RATE_LIMIT_<PROVIDER>="<rps>[:<burst>]"
+(e.g. RATE_LIMIT_GEMINI=4:8); a rate of 0 disables limiting for that provider.
+"""
+
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Lower value = served first
+PRIORITIES = {"interactive": 0, "ingest": 1}
+
+# Default (requests per second, burst) per provider
+DEFAULT_RATE_LIMITS = {
+    "gemini": (4.0, 8),
+    "dedalus": (4.0, 8),
+    "embeddings": (10.0, 20),
+}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("outbound_priority", default="interactive")
+
+
+@contextmanager
+def call_priority(name: str):
+    """Run the enclosed outbound calls with the given priority ("interactive" or "ingest")."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def request_key(*parts: Any) -> str:
+    """Build a stable single-flight key from request parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _rate_limit_for(provider: str) -> tuple[float, float]:
+    """Read (rate, burst) for a provider from the environment, falling back to defaults."""
+    raw = os.getenv(f"RATE_LIMIT_{provider.upper().replace('-', '_')}", "").strip()
+    if not raw:
+        return DEFAULT_RATE_LIMITS.get(provider, (0.0, 1))
+    rate, _, burst = raw.partition(":")
+    rate_f = float(rate)
+    return rate_f, float(burst) if burst else max(rate_f, 1.0)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (guarded by the provider lock)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, cost: float) -> float:
+        """Seconds until `cost` tokens are available (0 if available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float) -> None:
+        if self.rate > 0:
+            self.tokens -= cost
+
+
+class _ProviderQueue:
+    """Waiters for one provider, ordered by (priority, arrival)."""
+
+    def __init__(self, provider: str):
+        rate, burst = _rate_limit_for(provider)
+        self.bucket = TokenBucket(rate, burst)
+        self.cond = threading.Condition()
+        self.waiters: list[tuple[int, int]] = []
+        self.calls = 0
+        self.coalesced = 0
+        self.waits_ms: deque[float] = deque(maxlen=500)
+
+
+class OutboundScheduler:
+    """Process-wide scheduler for outbound model calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._queues: dict[str, _ProviderQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        with self._lock:
+            q = self._queues.get(provider)
+            if q is None:
+                q = self._queues[provider] = _ProviderQueue(provider)
+            return q
+
+    def _acquire(self, q: _ProviderQueue, cost: float, priority: str) -> None:
+        """Block until this caller is first in line and the bucket has capacity."""
+        entry = (PRIORITIES[priority], next(self._seq))
+        start = time.monotonic()
+        with q.cond:
+            heapq.heappush(q.waiters, entry)
+            try:
+                while True:
+                    if q.waiters[0] == entry:
+                        wait = q.bucket.time_until(cost)
+                        if wait <= 0:
+                            q.bucket.take(cost)
+                            heapq.heappop(q.waiters)
+                            break
+                        q.cond.wait(wait)
+                    else:
+                        q.cond.wait()
+            except BaseException:
+                # An interrupted waiter (e.g. KeyboardInterrupt) must not block everyone queued behind it
+                q.waiters.remove(entry)
+                heapq.heapify(q.waiters)
+                q.cond.notify_all()
+                raise
+            q.calls += 1
+            q.waits_ms.append((time.monotonic() - start) * 1000)
+            q.cond.notify_all()
+
+    def call(
+        self,
+        provider: str,
+        fn: Callable[[], T],
+        key: str | None = None,
+        cost: float = 1.0,
+        priority: str | None = None,
+    ) -> T:
+        """
+        Run fn() against a provider under its rate limit.
+
+        Args:
+            provider: Rate-limit bucket name (e.g. "gemini", "dedalus", "embeddings")
+            fn: Zero-argument callable performing the actual request
+            key: Optional single-flight key; identical in-flight calls share one result
+            cost: Tokens taken from the provider bucket
+            priority: "interactive" or "ingest"; defaults to the current call_priority()
+        """
+        q = self._queue(provider)
+        leader = True
+        if key is not None:
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                else:
+                    leader = False
+            if not leader:
+                with q.cond:
+                    q.coalesced += 1
+                return future.result()
+
+        try:
+            self._acquire(q, cost, priority or _priority.get())
+            result = fn()
+        except BaseException as e:
+            if key is not None:
+                future.set_exception(e)
+            raise
+        else:
+            if key is not None:
+                future.set_result(result)
+            return result
+        finally:
+            if key is not None:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def metrics(self) -> dict[str, dict]:
+        """Queue depth, coalescing and wait-time stats per provider."""
+        with self._lock:
+            queues = dict(self._queues)
+            inflight = len(self._inflight)
+        out: dict[str, dict] = {}
+        for provider, q in queues.items():
+            with q.cond:
+                waits = sorted(q.waits_ms)
+                depth = {name: 0 for name in PRIORITIES}
+                by_value = {v: k for k, v in PRIORITIES.items()}
+                for prio, _ in q.waiters:
+                    depth[by_value[prio]] += 1
+                out[provider] = {
+                    "queue_depth": len(q.waiters),
+                    "queue_depth_by_priority": depth,
+                    "calls": q.calls,
+                    "coalesced": q.coalesced,
+                    "wait_ms_avg": sum(waits) / len(waits) if waits else 0.0,
+                    "wait_ms_p95": waits[int(len(waits) * 0.95) - 1] if waits else 0.0,
+                    "wait_ms_max": waits[-1] if waits else 0.0,
+                    "inflight_keys": inflight,
+                }
+        return out
+
+
+_scheduler: OutboundScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> OutboundScheduler:
+    """Return the process-wide outbound scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = OutboundScheduler()
+    return _scheduler
+
+
+def scheduler_metrics() -> dict[str, dict]:
+    """Metrics for all providers seen so far."""
+    return get_scheduler().metrics()
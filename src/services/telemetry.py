@@ -0,0 +1,109 @@
+"""Per-request stage telemetry: wall time, tokens, cache hits and provider per pipeline stage."""
+
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+
+@dataclass
+class Span:
+    """One timed stage of a request (vision, classification, retrieval, llm.<stage>, safety...)."""
+
+    stage: str
+    parent: str | None = None
+    start_ms: float = 0.0  # offset from the start of the trace
+    duration_ms: float = 0.0
+    provider: str | None = None
+    tokens_in: int | None = None
+    tokens_out: int | None = None
+    cache_hit: bool | None = None
+    error: str | None = None
+    attrs: dict = field(default_factory=dict)
+
+    def set(self, **values) -> None:
+        """Set known fields (provider, tokens_in, ...); anything else goes to attrs."""
+        for name, value in values.items():
+            if name in _SPAN_FIELDS:
+                setattr(self, name, value)
+            else:
+                self.attrs[name] = value
+
+
+_SPAN_FIELDS = {"provider", "tokens_in", "tokens_out", "cache_hit", "error"}
+
+
+class Trace:
+    """Spans recorded for one user request; spans may come from several threads."""
+
+    def __init__(self, request_id: str | None = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> list[dict]:
+        """Spans as plain dicts in start order (for meta / display)."""
+        with self._lock:
+            # Spans are added when they end, so children come before parents; parents first on ties
+            spans = sorted(self.spans, key=lambda s: (s.start_ms, s.parent is not None))
+        return [asdict(s) for s in spans]
+
+
+_current_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("telemetry_trace", default=None)
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(request_id: str | None = None) -> Iterator[Trace]:
+    """Collect spans recorded in this context (and in worker threads that copy it) into a Trace."""
+    trace = Trace(request_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str, **values) -> Iterator[Span]:
+    """
+    Time a stage. Outside a trace the span is still yielded but not recorded.
+
+    Usage:
+        with span("retrieval", provider="chroma") as s:
+            docs = search(...)
+            s.set(docs=len(docs))
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    s = Span(stage=stage, parent=parent.stage if parent else None)
+    s.set(**values)
+    started = time.perf_counter()
+    if trace is not None:
+        s.start_ms = round((started - trace.started) * 1000, 1)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        s.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        if trace is not None:
+            trace.add(s)
@@ -0,0 +1,143 @@
+"""Text-to-speech: sentence-chunked, concurrently synthesized, cached on disk by text hash."""
+
+import io
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+from src.services.disk_cache import cache_key, cached_path, write_cache
+
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "4000"))
+# Target size of one synthesized chunk; the first chunk is kept short so playback starts sooner
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "400"))
+TTS_FIRST_CHUNK_CHARS = 160
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=TTS_CONCURRENCY, thread_name_prefix="tts")
+# Separate pool: a background job waits on chunk tasks, so it must not occupy a chunk worker
+_presynth_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-presynth")
+
+
+def _gtts_backend(text: str, lang: str) -> bytes:
+    """Synthesize MP3 bytes with gTTS."""
+    from gtts import gTTS
+
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buf)
+    return buf.getvalue()
+
+
+_backend: Callable[[str, str], bytes] = _gtts_backend
+_backend_name = "gtts"
+
+
+def set_tts_backend(backend: Callable[[str, str], bytes] | None, name: str = "custom") -> None:
+    """Replace the synthesis backend ((text, lang) -> MP3 bytes); None restores gTTS."""
+    global _backend, _backend_name
+    _backend, _backend_name = (backend, name) if backend else (_gtts_backend, "gtts")
+
+
+def clean_for_speech(text: str, max_chars: int = TTS_MAX_CHARS) -> str:
+    """Drop markdown syntax that would be read out, and cap the length."""
+    clean = re.sub(r"[*_`#>|]+", "", text or "")
+    clean = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", clean)
+    clean = re.sub(r"[ \t]+", " ", clean).strip()
+    if len(clean) > max_chars:
+        clean = clean[: max_chars - 3] + "..."
+    return clean
+
+
+def split_sentences(text: str, max_chars: int = TTS_CHUNK_CHARS, first_chars: int = TTS_FIRST_CHUNK_CHARS) -> list[str]:
+    """Group sentences into chunks of at most max_chars (the first at most first_chars)."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?:;])\s+|\n+", text) if s.strip()]
+    chunks: list[str] = []
+    current = ""
+    for sentence in sentences:
+        limit = first_chars if not chunks else max_chars
+        while len(sentence) > limit:
+            # A single overlong sentence: break at the last space before the limit
+            cut = sentence.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+            limit = max_chars
+        if current and len(current) + 1 + len(sentence) > limit:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _chunk_key(text: str, lang: str) -> str:
+    return cache_key(_backend_name, lang, text)
+
+
+def synthesize_chunk(text: str, lang: str = "en") -> Path | None:
+    """Return the cached MP3 for a chunk, synthesizing it on a miss; None if synthesis fails."""
+    key = _chunk_key(text, lang)
+    path = cached_path("tts", key, ".mp3")
+    if path is not None:
+        return path
+    try:
+        audio = _backend(text, lang)
+    except Exception:
+        return None
+    return write_cache("tts", key, audio, ".mp3")
+
+
+def iter_speech(text: str, lang: str = "en") -> Iterator[Path | None]:
+    """
+    Synthesize all chunks of text concurrently and yield their MP3 paths in order.
+
+    The first path is yielded as soon as the first chunk is ready, so playback can
+    start while the rest is still being synthesized. A chunk whose synthesis
+    failed yields None in its place.
+    """
+    chunks = split_sentences(clean_for_speech(text))
+    futures = [_executor.submit(synthesize_chunk, chunk, lang) for chunk in chunks]
+    for future in futures:
+        yield future.result()
+
+
+def join_speech(paths: list[Path | None], text: str, lang: str = "en") -> Path | None:
+    """
+    Concatenate chunk MP3s into one cached file for the whole text (MP3 frames concatenate cleanly).
+
+    Returns None, and caches nothing, if any chunk is missing, so a failed chunk
+    is retried next time rather than leaving a permanent gap.
+    """
+    if not paths or any(p is None for p in paths):
+        return None
+    key = cache_key(_backend_name, lang, "full", text)
+    path = cached_path("tts", key, ".mp3")
+    if path is not None:
+        return path
+    try:
+        audio = b"".join(p.read_bytes() for p in paths)
+    except OSError:
+        # A chunk was evicted from the cache in the meantime
+        return None
+    return write_cache("tts", key, audio, ".mp3")
+
+
+def speech_file(text: str, lang: str = "en") -> Path | None:
+    """Synthesize (or load from cache) the whole text as one MP3 file."""
+    return join_speech(list(iter_speech(text, lang)), text, lang)
+
+
+def cached_speech_file(text: str, lang: str = "en") -> Path | None:
+    """The whole-text MP3 if it has already been synthesized, without synthesizing anything."""
+    return cached_path("tts", cache_key(_backend_name, lang, "full", text), ".mp3")
+
+
+def presynthesize(text: str, lang: str = "en") -> Future:
+    """Start synthesizing text in the background (e.g. while the user reads the answer)."""
+    return _presynth_executor.submit(speech_file, text, lang)
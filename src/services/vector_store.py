@@ -1,13 +1,19 @@
 """Vector store abstraction: Chroma (dev) and Pinecone (prod)."""
 
 import os
+import sys
+import time
+import uuid
+from pathlib import Path
 from typing import Any
 
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 
-from src.services.document_loader import DocumentChunk
+from src.services.document_loader import ChunkBatch, DocumentChunk
+from src.services.resources import get_shared_embeddings, get_shared_vector_store, invalidate
+from src.services.telemetry import span
 
 
 def _doc_chunk_to_langchain(chunk: DocumentChunk) -> Document:
@@ -25,6 +31,38 @@ def _doc_chunk_to_langchain(chunk: DocumentChunk) -> Document:
     return Document(page_content=chunk.content, metadata=metadata)
 
 
+def _kb_version_path() -> Path:
+    return Path(os.getenv("KB_VERSION_PATH") or Path(os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")) / "kb_version")
+
+
+def kb_version() -> str:
+    """Return the current knowledge base version (changes whenever chunks are added or removed)."""
+    try:
+        return _kb_version_path().read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def bump_kb_version() -> str:
+    """Mark the knowledge base as changed; invalidates answers generated against the old content."""
+    from src.services.answer_store import schedule_refresh
+
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    path = _kb_version_path()
+    # Readers must never see a half-written (empty) version
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(version, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        tmp.unlink(missing_ok=True)
+        print(f"Warning: Could not record knowledge base version in {path}; stored answers may be stale: {e}",
+              file=sys.stderr)
+    schedule_refresh()
+    return version
+
+
 def get_vector_store(
     collection_name: str = "fixpalai",
     namespace: str | None = None,
@@ -34,7 +72,7 @@ def get_vector_store(
     Uses Chroma for local dev (VECTOR_DB=chroma or unset), Pinecone for prod.
     """
     db_type = os.getenv("VECTOR_DB", "chroma").lower()
-    embeddings = __import__("src.services.embeddings", fromlist=["get_embeddings_model"]).get_embeddings_model()
+    embeddings = get_shared_embeddings()
 
     ns = namespace or "manuals"
 
@@ -61,11 +99,16 @@ def get_vector_store(
 
 def add_chunks_to_store(
     vector_store: VectorStore,
-    chunks: list[DocumentChunk],
+    chunks: list[DocumentChunk] | ChunkBatch,
 ) -> None:
     """Add document chunks to the vector store."""
-    docs = [_doc_chunk_to_langchain(c) for c in chunks]
-    vector_store.add_documents(docs)
+    if isinstance(chunks, ChunkBatch):
+        # Texts and metadata straight to the provider, no intermediate Document objects
+        vector_store.add_texts(chunks.texts, metadatas=chunks.metadatas())
+    else:
+        docs = [_doc_chunk_to_langchain(c) for c in chunks]
+        vector_store.add_documents(docs)
+    bump_kb_version()
 
 
 def search_vector_store(
@@ -84,21 +127,101 @@ def search_vector_store(
     return vector_store.similarity_search(query, k=k, filter=filter_dict)
 
 
+def embed_queries(embeddings: Embeddings, queries: list[str]) -> list[list[float]]:
+    """Embed many queries in one provider request where the embeddings support it."""
+    batch = getattr(embeddings, "embed_queries", None)
+    if batch is not None:
+        return batch(queries)
+    # Local sentence-transformers models embed queries and documents the same way
+    return embeddings.embed_documents(queries)
+
+
+def search_vector_store_batch(
+    vector_store: VectorStore,
+    queries: list[str],
+    k: int = 5,
+    filter_domains: list[str | None] | None = None,
+) -> list[list[Document]]:
+    """Search for many queries with one embedding request; results per query, in order."""
+    filter_domains = filter_domains or [None] * len(queries)
+    with span("retrieval", provider=os.getenv("VECTOR_DB", "chroma").lower(), cache_hit=False) as s:
+        try:
+            vectors = embed_queries(vector_store.embeddings, queries)
+            results = [
+                vector_store.similarity_search_by_vector(vec, k=k, filter={"domain": d} if d else None)
+                for vec, d in zip(vectors, filter_domains)
+            ]
+        except NotImplementedError:
+            results = [search_vector_store(vector_store, q, k=k, filter_domain=d) for q, d in zip(queries, filter_domains)]
+        s.set(queries=len(queries), docs=sum(len(r) for r in results))
+    return results
+
+
 def search_multiple_namespaces(
     query: str,
     namespaces: list[str] = ("manuals",),
     k_per_namespace: int = 3,
     filter_domain: str | None = None,
+    vector_store: VectorStore | None = None,
 ) -> list[Document]:
-    """Search multiple namespaces and merge results (deduplicated by content)."""
+    """
+    Search multiple namespaces and merge results (deduplicated by content).
+
+    vector_store, if given, is the caller's store for the first namespace; the
+    others (and the first, without one) use the shared per-process stores.
+    """
     seen: set[str] = set()
     merged: list[Document] = []
-    for ns in namespaces:
-        vs, _ = get_vector_store(namespace=ns)
-        docs = search_vector_store(vs, query, k=k_per_namespace, filter_domain=filter_domain)
-        for doc in docs:
-            key = doc.page_content[:200]
-            if key not in seen:
-                seen.add(key)
-                merged.append(doc)
-    return merged[: k_per_namespace * len(namespaces)]
+    with span("retrieval", provider=os.getenv("VECTOR_DB", "chroma").lower(), cache_hit=False) as s:
+        for i, ns in enumerate(namespaces):
+            if i == 0 and vector_store is not None:
+                docs = search_vector_store(vector_store, query, k=k_per_namespace, filter_domain=filter_domain)
+            else:
+                try:
+                    docs = search_vector_store(get_shared_vector_store(ns), query, k=k_per_namespace, filter_domain=filter_domain)
+                except Exception:
+                    # Reconnect once: the shared client may have gone stale
+                    invalidate(f"vector_store:{ns}")
+                    docs = search_vector_store(get_shared_vector_store(ns), query, k=k_per_namespace, filter_domain=filter_domain)
+            for doc in docs:
+                key = doc.page_content[:200]
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(doc)
+        merged = merged[: k_per_namespace * len(namespaces)]
+        s.set(docs=len(merged))
+    return merged
+
+
+def get_all_sources(vector_store: VectorStore) -> list[dict]:
+    """Unique sources in the store with chunk counts (Chroma only; [] otherwise)."""
+    try:
+        results = vector_store._collection.get(include=["metadatas"])
+    except Exception:
+        return []
+    source_map: dict[str, dict] = {}
+    for meta in (results.get("metadatas") or []):
+        if not meta or "source" not in meta:
+            continue
+        src = meta["source"]
+        if src not in source_map:
+            source_map[src] = {
+                "name": src,
+                "type": meta.get("source_type", "unknown"),
+                "domain": meta.get("domain", ""),
+                "chunks": 0,
+            }
+        source_map[src]["chunks"] += 1
+    return sorted(source_map.values(), key=lambda x: x["name"])
+
+
+def delete_source(vector_store: VectorStore, source_name: str) -> int:
+    """Delete all chunks belonging to a source. Returns count deleted (Chroma only)."""
+    collection = getattr(vector_store, "_collection", None)
+    if collection is None:
+        raise NotImplementedError(f"Removing sources is not supported for {type(vector_store).__name__}")
+    ids = collection.get(where={"source": source_name}, include=[]).get("ids", [])
+    if ids:
+        collection.delete(ids=ids)
+        bump_kb_version()
+    return len(ids)
@@ -0,0 +1,109 @@
+"""Background warm-up of heavy imports and shared clients.
+
+Entry points (the Streamlit app, the API) import only light modules at the
+top so the first page or health check is served quickly; the provider stacks
+(langchain, chromadb, langchain_google_genai, sentence-transformers, tiktoken)
+load on first use. start_warmup() does that first use in a daemon thread right
+after startup, so by the time the first question arrives the imports are done
+and the shared vector store, embeddings and LLM client exist. A request that
+comes earlier simply waits on the same import locks / shared resource locks.
+
+Set WARMUP=0 to load everything on first use instead (e.g. for short CLI runs).
+"""
+
+import importlib
+import os
+import threading
+import time
+
+# Imported in this order; each pulls in its provider stack
+WARMUP_MODULES = (
+    "src.services.chunker",
+    "src.services.llm_utils",
+    "src.agents.specialists.registry",
+    "src.agents.coordinator",
+    "src.agents.vision_analysis",
+    "src.services.vector_store",
+)
+
+_lock = threading.Lock()
+_thread: threading.Thread | None = None
+_steps: dict[str, dict] = {}
+_started_at: float | None = None
+_finished_at: float | None = None
+
+
+def _warm_tokenizer() -> None:
+    from src.services.chunker import _get_encoding
+
+    _get_encoding()
+
+
+def _warm_llm() -> None:
+    from src.services.resources import get_shared_llm
+
+    get_shared_llm(os.getenv("LLM_MODEL", "gemini-2.5-flash"), 0.7)
+
+
+def _step(name: str, fn) -> None:
+    start = time.perf_counter()
+    try:
+        fn()
+        _steps[name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "error": None}
+    except Exception as e:
+        # Not fatal: the first real use retries and reports the error there
+        _steps[name] = {"ms": round((time.perf_counter() - start) * 1000, 1), "error": f"{type(e).__name__}: {e}"}
+
+
+def _run(namespaces: tuple[str, ...]) -> None:
+    global _finished_at
+    from src.services.resources import get_shared_safety_matcher, get_shared_vector_store
+
+    for module in WARMUP_MODULES:
+        _step(f"import {module}", lambda m=module: importlib.import_module(m))
+    _step("tokenizer", _warm_tokenizer)
+    _step("safety matcher", get_shared_safety_matcher)
+    for ns in namespaces:
+        # Creates the shared embeddings too (loads the local model if one is configured)
+        _step(f"vector store {ns}", lambda ns=ns: get_shared_vector_store(ns))
+    if os.getenv("GOOGLE_API_KEY"):
+        _step("llm client", _warm_llm)
+    _finished_at = time.perf_counter()
+
+
+def start_warmup(namespaces: tuple[str, ...] = ("manuals",)) -> threading.Thread | None:
+    """Start the warm-up thread once per process; returns it (None if WARMUP=0)."""
+    global _thread, _started_at
+    if os.getenv("WARMUP", "1").strip() in ("0", "false", "False", "no"):
+        return None
+    with _lock:
+        if _thread is None:
+            _started_at = time.perf_counter()
+            _thread = threading.Thread(target=_run, args=(namespaces,), name="warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def warmup_status() -> dict:
+    """{"state": "off"|"running"|"done", "ms", "steps": {name: {"ms", "error"}}}."""
+    if _thread is None:
+        return {"state": "off", "ms": None, "steps": {}}
+    end = _finished_at or time.perf_counter()
+    return {
+        "state": "done" if _finished_at else "running",
+        "ms": round((end - _started_at) * 1000, 1),
+        "steps": dict(_steps),
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    thread = start_warmup()
+    if thread is not None:
+        thread.join()
+    status = warmup_status()
+    for name, step in status["steps"].items():
+        print(f"{step['ms']:>9.1f} ms  {name}" + (f"  ({step['error']})" if step["error"] else ""))
+    print(f"{status['ms']:>9.1f} ms  total")
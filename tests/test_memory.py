@@ -0,0 +1,49 @@
+"""Follow-up detection and retrieval reuse in ConversationMemory."""
+
+import pytest
+from langchain_core.documents import Document
+
+from src.agents.memory import ConversationMemory
+
+FAUCET_DOCS = [
+    Document(
+        page_content="To stop a dripping faucet, shut off the supply valves and replace the worn cartridge or washer.",
+        metadata={"source": "faucet.pdf"},
+    ),
+]
+GFCI_DOCS = [
+    Document(page_content="Press the GFCI reset button after clearing the fault.", metadata={"source": "gfci.pdf"}),
+]
+
+
+@pytest.fixture
+def memory():
+    memory = ConversationMemory()
+    question = "My kitchen faucet keeps dripping from the spout"
+    memory.remember_retrieval("plumbing", FAUCET_DOCS, question)
+    memory.record_exchange(question, "Replace the cartridge.")
+    return memory
+
+
+def test_on_topic_follow_up_reuses_documents(memory):
+    assert memory.reusable_docs("How do I replace this faucet cartridge?", "plumbing") == FAUCET_DOCS
+    assert memory.reusable_docs("What if it still drips?", "plumbing") == FAUCET_DOCS
+    assert memory.reusable_docs("What if that doesn't work?", "plumbing") == FAUCET_DOCS
+
+
+def test_new_question_with_reference_word_is_not_a_follow_up(memory):
+    question = "Is it safe to reset a GFCI outlet?"
+    assert memory.refers_back(question)
+    assert not memory.is_follow_up(question)
+    assert memory.reusable_docs(question, "plumbing") is None
+
+
+def test_previous_documents_follow_fresh_results(memory):
+    merged = memory.with_previous_docs("Is it safe to reset a GFCI outlet?", "plumbing", GFCI_DOCS)
+    assert merged == GFCI_DOCS + FAUCET_DOCS
+    assert memory.with_previous_docs("Where is the GFCI outlet usually located?", "plumbing", GFCI_DOCS) == GFCI_DOCS
+    assert memory.with_previous_docs("Is it safe to reset a GFCI outlet?", "electrical", GFCI_DOCS) == GFCI_DOCS
+
+
+def test_different_domain_is_never_reused(memory):
+    assert memory.reusable_docs("How do I replace this faucet cartridge?", "electrical") is None
@@ -0,0 +1,79 @@
+"""Hazard keyword matching, whole texts and streamed in batches."""
+
+import random
+
+import pytest
+
+from src.agents.safety_matcher import SafetyMatcher, get_safety_matcher
+
+TEXT = (
+    "Before you touch the electrical panel, switch off the circuit breaker. "
+    "Old furnaces near a gas line can leak carbon monoxide; the furnace-room wall may be structurally "
+    "load-bearing, and unstructured notes about 1220v gear are not hazards."
+)
+
+
+@pytest.fixture
+def matcher() -> SafetyMatcher:
+    return get_safety_matcher()
+
+
+def _spans(matches):
+    return [(m.keyword, m.start, m.end) for m in matches]
+
+
+def test_keywords_match_word_starts_with_suffixes(matcher):
+    found = set(matcher.keywords(text=TEXT))
+    assert {"furnace", "structural", "load-bearing", "gas line", "carbon monoxide"} <= found
+    assert "220v" not in found
+    hits = {TEXT[m.start:m.end] for m in matcher.scan(text=TEXT)}
+    assert {"furnaces", "furnace", "structurally"} <= hits
+    assert "unstructured" not in hits
+
+
+def test_locate_matches_scan_for_found_keywords(matcher):
+    assert matcher.locate(matcher.keywords(text=TEXT), text=TEXT) == matcher.scan(text=TEXT)
+    assert matcher.locate([], text=TEXT) == []
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_streamed_batches_find_the_same_hazards(matcher, seed):
+    rng = random.Random(seed)
+    scanner = matcher.stream()
+    i = 0
+    while i < len(TEXT):
+        size = rng.randint(1, 12)
+        scanner.feed(TEXT[i:i + size])
+        i += size
+    scanner.close()
+    assert sorted(_spans(scanner.matches), key=lambda s: s[1]) == _spans(matcher.scan(response=TEXT))
+
+
+def test_keyword_split_across_batches(matcher):
+    scanner = matcher.stream()
+    assert scanner.feed("Shut off the circuit bre") == []
+    assert _spans(scanner.feed("aker now.")) == [("circuit breaker", 13, 28)]
+
+
+def test_match_at_end_is_held_until_it_is_complete(matcher):
+    scanner = matcher.stream()
+    assert scanner.feed("Check the furnace") == []
+    assert _spans(scanner.close()) == [("furnace", 10, 17)]
+
+
+def test_word_longer_than_the_tail_is_kept_whole(matcher):
+    scanner = matcher.stream()
+    scanner.feed("the structural")
+    for _ in range(10):
+        assert scanner.feed("ly") == []
+    assert _spans(scanner.feed(" sound")) == [("structural", 4, 34)]
+
+
+def test_tail_starting_mid_word_is_not_a_word_start(matcher):
+    scanner = matcher.stream()
+    scanner.feed("x" * 30 + " unstructurally abc")
+    # The kept tail is "structurally abc", cut right after "un"
+    assert scanner._tail == "structurally abc"
+    scanner.feed("def")
+    assert scanner.close() == []
+    assert scanner.matches == []
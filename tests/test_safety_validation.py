@@ -0,0 +1,78 @@
+"""Reuse of the safety precheck verdict when validating an answer."""
+
+import json
+
+import pytest
+
+from src.agents import safety_validation
+
+QUESTION = "My circuit breaker keeps tripping when the microwave runs. What should I check?"
+CONTEXT = (
+    "A circuit breaker that trips under load usually means the circuit is overloaded. "
+    "Move the microwave to a dedicated circuit and reset the circuit breaker."
+)
+
+
+class FakeValidator:
+    """Stands in for invoke_llm, replying with a fixed verdict and recording each prompt."""
+
+    def __init__(self, verdict: dict):
+        self.verdict = verdict
+        self.prompts: list[str] = []
+
+    def __call__(self, messages, temperature=None, stage=None):
+        self.prompts.append(messages[-1].content)
+        return json.dumps(self.verdict)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    safety_validation._verdict_cache.clear()
+    yield
+    safety_validation._verdict_cache.clear()
+
+
+def _install(monkeypatch, verdict: dict) -> FakeValidator:
+    validator = FakeValidator(verdict)
+    monkeypatch.setattr(safety_validation, "invoke_llm", validator)
+    return validator
+
+
+def test_flagged_precheck_is_reused(monkeypatch):
+    validator = _install(monkeypatch, {
+        "is_safe": False,
+        "warnings": ["Work inside the panel can be lethal."],
+        "requires_professional": True,
+    })
+    precheck = safety_validation.start_safety_precheck(QUESTION, CONTEXT, "electrical")
+    answer = "Call an electrician to inspect the circuit breaker and the wiring behind it."
+
+    result = safety_validation.validate_safety(QUESTION, answer, "electrical", precheck=precheck)
+
+    assert len(validator.prompts) == 1  # the precheck only, no second call on the answer
+    assert not result["is_safe"]
+    assert "Work inside the panel can be lethal." in result["warnings"]
+    assert any("licensed professional" in w for w in result["warnings"])
+    assert any(w.startswith("ELECTRICAL HAZARD") for w in result["warnings"])
+
+
+def test_clean_precheck_covers_grounded_answer(monkeypatch):
+    validator = _install(monkeypatch, {"is_safe": True, "warnings": [], "requires_professional": False})
+    precheck = safety_validation.start_safety_precheck(QUESTION, CONTEXT, "electrical")
+    answer = "The circuit is overloaded. Move the microwave to a dedicated circuit, then reset the circuit breaker."
+
+    result = safety_validation.validate_safety(QUESTION, answer, "electrical", precheck=precheck)
+
+    assert len(validator.prompts) == 1
+    assert result["is_safe"]
+
+
+def test_clean_precheck_does_not_cover_new_instructions(monkeypatch):
+    validator = _install(monkeypatch, {"is_safe": True, "warnings": [], "requires_professional": False})
+    precheck = safety_validation.start_safety_precheck(QUESTION, CONTEXT, "electrical")
+    answer = "Open the cover and swap the circuit breaker for a larger 40 amp one yourself."
+
+    safety_validation.validate_safety(QUESTION, answer, "electrical", precheck=precheck)
+
+    assert len(validator.prompts) == 2
+    assert "Response to Validate" in validator.prompts[1]
@@ -0,0 +1,29 @@
+"""Outbound call scheduling: waiters that fail must leave the queue."""
+
+import threading
+
+import pytest
+
+from src.services.scheduler import OutboundScheduler, TokenBucket
+
+
+def test_interrupted_waiter_does_not_block_the_queue():
+    scheduler = OutboundScheduler()
+    q = scheduler._queue("test")
+    q.bucket = TokenBucket(rate=50, burst=1)
+    q.bucket.take(1)  # the next caller has to wait for a refill
+
+    def interrupted(timeout=None):
+        raise KeyboardInterrupt
+
+    q.cond.wait = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        scheduler._acquire(q, 1.0, "interactive")
+    del q.cond.wait
+    assert q.waiters == []
+
+    result = []
+    caller = threading.Thread(target=lambda: result.append(scheduler.call("test", lambda: 42)), daemon=True)
+    caller.start()
+    caller.join(timeout=5)
+    assert result == [42]
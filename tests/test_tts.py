@@ -0,0 +1,91 @@
+"""Read-aloud synthesis with a local stand-in for the gTTS backend."""
+
+import threading
+import time
+
+import pytest
+
+from src.services import disk_cache, tts
+
+
+class FakeBackend:
+    """Returns "<text>" as the MP3 bytes; chunks containing a fail word raise."""
+
+    def __init__(self, fail_on: str | None = None):
+        self.fail_on = fail_on
+        self.calls: list[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, lang: str) -> bytes:
+        with self._lock:
+            self.calls.append(text)
+        # Earlier chunks finish last, so ordering does not depend on completion order
+        time.sleep(0.02 if text.startswith("First") else 0)
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError("synthesis failed")
+        return f"<{text}>".encode("utf-8")
+
+
+ANSWER = (
+    "First, turn off the water at the shutoff valve under the sink. "
+    "Then remove the handle screw and lift off the handle. "
+    "Unscrew the packing nut and pull out the stem. "
+    "Replace the washer and the O-ring, then reassemble everything in reverse order."
+)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "CACHE_DIR", str(tmp_path))
+    # Small chunks, so a short answer is synthesized in several pieces
+    split = tts.split_sentences
+    monkeypatch.setattr(tts, "split_sentences", lambda text: split(text, max_chars=80, first_chars=40))
+    fake = FakeBackend()
+    tts.set_tts_backend(fake, name="fake")
+    yield fake
+    tts.set_tts_backend(None)
+
+
+def _chunks(text: str) -> list[str]:
+    return tts.split_sentences(tts.clean_for_speech(text))
+
+
+def test_chunks_are_joined_in_order(backend):
+    chunks = _chunks(ANSWER)
+    assert len(chunks) > 2
+
+    path = tts.speech_file(ANSWER)
+
+    assert path is not None
+    assert path.read_bytes() == b"".join(f"<{c}>".encode("utf-8") for c in chunks)
+    assert sorted(backend.calls) == sorted(chunks)
+
+
+def test_cached_chunks_and_full_file_are_reused(backend):
+    first = tts.speech_file(ANSWER)
+    calls = len(backend.calls)
+
+    assert tts.cached_speech_file(ANSWER) == first
+    assert tts.speech_file(ANSWER) == first
+    assert [p.read_bytes() for p in tts.iter_speech(ANSWER)] == [f"<{c}>".encode("utf-8") for c in _chunks(ANSWER)]
+    assert len(backend.calls) == calls
+
+
+def test_failed_chunk_is_not_joined_or_cached(backend):
+    backend.fail_on = "packing nut"
+
+    paths = list(tts.iter_speech(ANSWER))
+
+    failed = [i for i, c in enumerate(_chunks(ANSWER)) if "packing nut" in c]
+    assert [i for i, p in enumerate(paths) if p is None] == failed
+    assert tts.join_speech(paths, ANSWER) is None
+    assert tts.speech_file(ANSWER) is None
+    assert tts.cached_speech_file(ANSWER) is None
+
+    # Once the backend recovers only the failed chunk is synthesized again
+    backend.fail_on = None
+    backend.calls.clear()
+    path = tts.speech_file(ANSWER)
+    assert path is not None
+    assert backend.calls == [_chunks(ANSWER)[i] for i in failed]
+    assert path.read_bytes() == b"".join(f"<{c}>".encode("utf-8") for c in _chunks(ANSWER))